@@ -14,5 +14,13 @@ setup(
         "tqdm>=4.65.0",
         "python-dotenv>=0.19.0",
     ],
+    extras_require={
+        "parquet": ["pyarrow>=7.0.0"],
+    },
+    entry_points={
+        "console_scripts": [
+            "theme-categorize=theme_categorization.cli:main",
+        ],
+    },
     python_requires=">=3.8",
 ) 
\ No newline at end of file
@@ -1,11 +1,24 @@
 import logging
 
 from .settings import Settings
-from .llm_clients import HuggingFaceClient, LLMClient
+from .llm_clients import AsyncHuggingFaceClient, HuggingFaceClient, LLMClient, RequestStats
 from .prompt_engineer import ThemeCategorizationPrompt
 from .pipeline import ThemeCategorizationPipeline
+from .cache import ResponseCache
+from .retry import CircuitBreaker, RetryPolicy
+from .load_balancer import Endpoint, EndpointPool
+from .dedup import ReviewDeduplicator, normalize_review
+from .journal import JournaledRunner, ResultsJournal
+from .sharding import ShardedRunner, shard_for_id
+from .writers import ColumnarResultWriter, open_result_writer, read_results
+from .metrics import Histogram, HistogramSet
+from .exporter import MetricsExporter
+from .tracing import Tracer, enable_tracing, get_tracer
+from .rate_limiter import RateLimiter, TokenBucket
 from .constants import KEY_THEMES
 from .data_loader import DataLoader
+from .csv_cache import read_csv_cached
+from .row_index import RowIndex
 from .evaluator import (
     parse_ground_truth,
     parse_llm_themes,
@@ -24,10 +37,36 @@ __version__ = "0.1.0"
 __all__ = [
     "Settings",
     "HuggingFaceClient",
+    "AsyncHuggingFaceClient",
     "LLMClient",
+    "RequestStats",
     "ThemeCategorizationPrompt",
     "ThemeCategorizationPipeline",
+    "RateLimiter",
+    "ResponseCache",
+    "RetryPolicy",
+    "CircuitBreaker",
+    "Endpoint",
+    "EndpointPool",
+    "ReviewDeduplicator",
+    "normalize_review",
+    "ResultsJournal",
+    "JournaledRunner",
+    "ShardedRunner",
+    "shard_for_id",
+    "ColumnarResultWriter",
+    "open_result_writer",
+    "read_results",
+    "Histogram",
+    "HistogramSet",
+    "MetricsExporter",
+    "Tracer",
+    "get_tracer",
+    "enable_tracing",
+    "TokenBucket",
     "DataLoader",
+    "read_csv_cached",
+    "RowIndex",
     "KEY_THEMES",
     "parse_ground_truth",
     "parse_llm_themes",
@@ -0,0 +1,20 @@
+"""
+Benchmarks for the theme categorization pipeline.
+
+Run the throughput sweep with:
+
+    python -m theme_categorization.benchmarks --data Dataset_v6.csv --output bench.json
+
+and the ground-truth filtering micro-benchmark with:
+
+    python -m theme_categorization.benchmarks.data_loading --data Dataset_v6.csv
+"""
+from .throughput import BenchmarkCase, percentile, peak_rss_mb, run_case, run_sweep
+
+__all__ = [
+    "BenchmarkCase",
+    "percentile",
+    "peak_rss_mb",
+    "run_case",
+    "run_sweep",
+]
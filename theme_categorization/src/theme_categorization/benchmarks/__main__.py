@@ -0,0 +1,76 @@
+"""
+Command-line entry point for the throughput benchmark.
+
+    python -m theme_categorization.benchmarks --data Dataset_v6.csv \
+        --threads 1,4,16 --max-tokens 256,1000 --rate-limit-delay 0 --output bench.json
+"""
+import argparse
+import json
+import logging
+from typing import List, Optional
+
+from ..fake_server import LATENCY_DISTRIBUTIONS, FakeServerConfig
+from .throughput import run_sweep
+
+logger = logging.getLogger(__name__)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the benchmark sweep and write the JSON report."""
+    defaults = FakeServerConfig()
+    parser = argparse.ArgumentParser(description="Theme categorization throughput benchmark")
+    parser.add_argument("--data", default="Dataset_v6.csv", help="Dataset CSV")
+    parser.add_argument("--start", type=int, default=0, help="First review of the slice")
+    parser.add_argument("--limit", type=int, default=200, help="Reviews per run")
+    parser.add_argument("--threads", type=_int_list, default=[1, 4, 16], help="Comma-separated thread counts")
+    parser.add_argument("--max-tokens", type=_int_list, default=[1000], help="Comma-separated max_tokens values")
+    parser.add_argument("--rate-limit-delay", type=_float_list, default=[0.0],
+                        help="Comma-separated rate_limit_delay values")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Fake backend base latency")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS,
+                        default=defaults.latency_distribution)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread)
+    parser.add_argument("--token-latency", type=float, default=0.002,
+                        help="Fake backend seconds per completion token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--verbose", action="store_true", help="Show per-request pipeline logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+        logging.getLogger("theme_categorization.benchmarks").setLevel(logging.INFO)
+        logger.setLevel(logging.INFO)
+
+    server_config = FakeServerConfig(
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        token_latency=args.token_latency,
+        seed=args.seed,
+    )
+    report = run_sweep(
+        args.data,
+        threads=args.threads,
+        max_tokens=args.max_tokens,
+        rate_limit_delays=args.rate_limit_delay,
+        start=args.start,
+        limit=args.limit,
+        server_config=server_config,
+    )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote {len(report['results'])} benchmark results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Micro-benchmark of ground-truth filtering in DataLoader.
+
+Compares the original get_reviews_with_ground_truth filtering (repeated
+.astype(str) filters and a zipped list of tuples) with the single-mask
+implementation, both as the list get_reviews_with_ground_truth returns
+and as the lazy ReviewPairs view of get_review_pairs, on an already
+loaded frame so CSV parsing is excluded. Allocations are traced with tracemalloc.
+
+    python -m theme_categorization.benchmarks.data_loading --data Dataset_v6.csv
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ..data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+
+def legacy_reviews_with_ground_truth(df: pd.DataFrame) -> List[Tuple[str, str]]:
+    """
+    The previous get_reviews_with_ground_truth filtering, kept as the baseline.
+
+    Args:
+        df: Frame with Comment and ProcessedCode columns
+
+    Returns:
+        List of tuples: (review_text, processed_code_string)
+    """
+    df_filtered = df[df['Comment'].notna() & (df['Comment'].astype(str).str.strip() != '')]
+    df_filtered = df_filtered[df_filtered['ProcessedCode'].notna()]
+    df_filtered = df_filtered[df_filtered['ProcessedCode'].astype(str).str.strip() != '']
+    df_filtered = df_filtered[df_filtered['ProcessedCode'].astype(str).str.lower() != 'nan']
+    return list(zip(
+        df_filtered['Comment'].astype(str).tolist(),
+        df_filtered['ProcessedCode'].astype(str).tolist()
+    ))
+
+
+def measure(func: Callable[[], Any], repeat: int = 5) -> Dict[str, float]:
+    """
+    Time a function and trace its allocations.
+
+    Timing runs are separate from the traced run, since tracemalloc slows
+    allocation-heavy code down.
+
+    Args:
+        func: Function to call
+        repeat: Number of timed calls
+
+    Returns:
+        Dict with best and mean seconds, and peak and retained MiB allocated by one call
+    """
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return {
+        "best_seconds": min(times),
+        "mean_seconds": sum(times) / len(times),
+        "peak_mb": peak / (1024 * 1024),
+        "retained_mb": retained / (1024 * 1024),
+    }
+
+
+def run_benchmark(data_path: str, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Benchmark the legacy and vectorized ground-truth filtering on one dataset.
+
+    Args:
+        data_path: Dataset CSV
+        repeat: Number of timed calls per variant
+
+    Returns:
+        JSON-serializable report with one entry per variant
+    """
+    loader = DataLoader(data_path)
+    df = loader.load_data(['Comment', 'ProcessedCode'])
+
+    legacy = legacy_reviews_with_ground_truth(df)
+    view = loader.get_review_pairs()
+    if view != legacy or loader.get_reviews_with_ground_truth() != legacy:
+        raise AssertionError("Vectorized filtering does not match the legacy result")
+
+    previous_level = logging.getLogger("theme_categorization").level
+    logging.getLogger("theme_categorization").setLevel(logging.WARNING)
+    try:
+        variants = {
+            "legacy_list": lambda: legacy_reviews_with_ground_truth(df),
+            "vectorized_view": lambda: loader.get_review_pairs(),
+            "vectorized_list": lambda: loader.get_reviews_with_ground_truth(),
+        }
+        results = {name: measure(func, repeat) for name, func in variants.items()}
+    finally:
+        logging.getLogger("theme_categorization").setLevel(previous_level)
+
+    for name, result in results.items():
+        logger.info(f"{name}: {result['best_seconds'] * 1000:.1f} ms, "
+                   f"peak {result['peak_mb']:.1f} MiB, retained {result['retained_mb']:.1f} MiB")
+
+    return {"dataset": str(data_path), "rows": len(df), "reviews": len(view), "results": results}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the data loading micro-benchmark and print or write the JSON report."""
+    parser = argparse.ArgumentParser(description="Ground-truth filtering micro-benchmark")
+    parser.add_argument("--data", default="Dataset_v6.csv", help="Dataset CSV")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per variant")
+    parser.add_argument("--output", help="Where to write the JSON report (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.data, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote data loading benchmark to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
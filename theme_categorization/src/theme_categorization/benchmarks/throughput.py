@@ -0,0 +1,221 @@
+"""
+End-to-end throughput benchmark.
+
+Runs DataLoader -> ThemeCategorizationPrompt -> HuggingFaceClient ->
+evaluate_predictions over a slice of the dataset against an in-process
+FakeLLMServer, sweeping worker threads, max_tokens and rate_limit_delay.
+"""
+import itertools
+import logging
+import platform
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .. import __version__
+from ..data_loader import DataLoader
+from ..evaluator import evaluate_predictions, parse_ground_truth, parse_llm_themes
+from ..fake_server import FakeLLMServer, FakeServerConfig
+from ..llm_clients import HuggingFaceClient, RequestStats
+from ..pipeline import ThemeCategorizationPipeline
+from ..prompt_engineer import ThemeCategorizationPrompt
+from ..settings import Settings
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkCase:
+    """One point of the parameter sweep."""
+
+    threads: int
+    max_tokens: int
+    rate_limit_delay: float
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Compute a percentile with linear interpolation between closest ranks.
+
+    Args:
+        values: Sample values
+        q: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident set size of this process so far.
+
+    Returns:
+        Peak RSS in MiB, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def load_slice(data_path: str, start: int = 0, limit: int = 200) -> Tuple[List[str], List[str]]:
+    """
+    Load a slice of reviews that have ground truth.
+
+    Args:
+        data_path: Path to the dataset CSV (e.g. Dataset_v6.csv)
+        start: Index of the first review in the filtered dataset
+        limit: Number of reviews
+
+    Returns:
+        Tuple of (reviews, processed_codes)
+    """
+    rows = list(DataLoader(data_path).iter_reviews(with_ground_truth=True, limit=limit, start=start))
+    return [review for _, review, _ in rows], [code for _, _, code in rows]
+
+
+def run_case(
+    case: BenchmarkCase,
+    reviews: List[str],
+    processed_codes: List[str],
+    server: FakeLLMServer
+) -> Dict[str, Any]:
+    """
+    Process the reviews once with the given parameters and measure the run.
+
+    Args:
+        case: Sweep parameters
+        reviews: Review texts
+        processed_codes: Ground truth ProcessedCode values, aligned with reviews
+        server: Running fake backend
+
+    Returns:
+        Dict with the case parameters, throughput, latency percentiles, token
+        rates, peak RSS, pipeline metrics and evaluation metrics
+    """
+    settings = Settings(
+        hf_token="dummy_token",
+        vllm_base_url=server.url,
+        vllm_base_urls=[],
+        max_tokens=case.max_tokens,
+        rate_limit_delay=case.rate_limit_delay,
+        max_workers=case.threads,
+    )
+    client = HuggingFaceClient(settings)
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings)
+
+    latencies: List[float] = []
+    tokens = {"prompt": 0, "completion": 0}
+    tokens_lock = threading.Lock()
+
+    def on_request(stats: RequestStats):
+        with tokens_lock:
+            tokens["prompt"] += stats.prompt_tokens or 0
+            tokens["completion"] += stats.completion_tokens or 0
+
+    client.add_request_listener(on_request)
+
+    start_time = time.perf_counter()
+    results = pipeline.process_batch(
+        reviews,
+        show_progress=False,
+        rate_limit=case.rate_limit_delay > 0,
+        max_workers=case.threads,
+        on_result=lambda index, result, latency: latencies.append(latency),
+    )
+    elapsed = time.perf_counter() - start_time
+
+    evaluation = evaluate_predictions(
+        [parse_ground_truth(code) for code in processed_codes],
+        [parse_llm_themes(result) for result in results],
+    )
+
+    result = {
+        **asdict(case),
+        "reviews": len(reviews),
+        "elapsed_seconds": elapsed,
+        "reviews_per_second": len(reviews) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "prompt_tokens_per_second": tokens["prompt"] / elapsed if elapsed > 0 else 0.0,
+        "completion_tokens_per_second": tokens["completion"] / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "pipeline": pipeline.get_metrics(),
+        "evaluation": evaluation,
+    }
+    logger.info(f"threads={case.threads} max_tokens={case.max_tokens} "
+               f"rate_limit_delay={case.rate_limit_delay}: "
+               f"{result['reviews_per_second']:.1f} reviews/s, "
+               f"p50 {result['latency_p50']:.3f}s, p99 {result['latency_p99']:.3f}s")
+    return result
+
+
+def run_sweep(
+    data_path: str,
+    threads: Sequence[int] = (1, 4, 16),
+    max_tokens: Sequence[int] = (1000,),
+    rate_limit_delays: Sequence[float] = (0.0,),
+    start: int = 0,
+    limit: int = 200,
+    server_config: Optional[FakeServerConfig] = None
+) -> Dict[str, Any]:
+    """
+    Run every combination of threads, max_tokens and rate_limit_delay.
+
+    Peak RSS is the process high-water mark, so within one sweep it can
+    only grow; compare it across versions for the same sweep.
+
+    Args:
+        data_path: Path to the dataset CSV
+        threads: Worker thread counts to try
+        max_tokens: Completion token budgets to try
+        rate_limit_delays: Values of Settings.rate_limit_delay to try
+        start: Index of the first review in the filtered dataset
+        limit: Number of reviews per run
+        server_config: Fake backend behavior (defaults to FakeServerConfig(seed=0))
+
+    Returns:
+        JSON-serializable report with environment details and one entry per case
+    """
+    server_config = server_config or FakeServerConfig(seed=0)
+    reviews, processed_codes = load_slice(data_path, start, limit)
+    logger.info(f"Benchmarking {len(reviews)} reviews from {data_path}")
+
+    cases = [
+        BenchmarkCase(threads=t, max_tokens=m, rate_limit_delay=d)
+        for t, m, d in itertools.product(threads, max_tokens, rate_limit_delays)
+    ]
+
+    results = []
+    for case in cases:
+        # A fresh server per case keeps throughput caps and failure sequences independent
+        with FakeLLMServer(server_config) as server:
+            results.append(run_case(case, reviews, processed_codes, server))
+
+    return {
+        "version": __version__,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {"path": str(data_path), "start": start, "limit": limit, "reviews": len(reviews)},
+        "server": asdict(server_config),
+        "results": results,
+    }
@@ -0,0 +1,215 @@
+"""
+Persistent on-disk cache for LLM theme extraction results.
+
+Entries are stored in SQLite and keyed by a hash of everything that
+determines the completion: model name, full prompt, temperature and
+max_tokens. Caching is only semantically safe for deterministic
+decoding, so enable Settings.deterministic (temperature 0) when using it.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Run eviction after this many writes rather than on every put
+EVICTION_INTERVAL = 100
+
+
+class ResponseCache:
+    """SQLite-backed cache of parsed LLM responses with size and age based eviction."""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 0,
+        max_age_seconds: float = 0
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            path: Path to the SQLite database file (created if missing)
+            max_entries: Maximum number of cached responses (0 for unlimited);
+                the oldest entries are evicted first
+            max_age_seconds: Entries older than this are ignored and evicted
+                (0 to keep entries forever)
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared across worker threads, serialized by self._lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "  key TEXT PRIMARY KEY,"
+            "  response TEXT NOT NULL,"
+            "  created_at REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)"
+        )
+        self._conn.commit()
+        self.evict()
+
+        logger.info(f"Opened response cache at {self.path} ({len(self)} entries)")
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["ResponseCache"]:
+        """
+        Create a response cache from settings.
+
+        Args:
+            settings: Configuration settings instance
+
+        Returns:
+            ResponseCache instance, or None if no cache path is configured
+        """
+        if not settings.cache_path:
+            return None
+
+        if settings.temperature > 0:
+            logger.warning(f"Caching responses sampled at temperature {settings.temperature}; "
+                          f"set LLM_DETERMINISTIC=true to make cached results reproducible")
+
+        return cls(
+            settings.cache_path,
+            max_entries=settings.cache_max_entries,
+            max_age_seconds=settings.cache_max_age,
+        )
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            model: Model name
+            prompt: Full prompt sent to the model
+            temperature: Sampling temperature
+            max_tokens: Completion token budget
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps([model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached result dict, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or self._is_expired(row[1]):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        Store a response.
+
+        Args:
+            key: Cache key from make_key
+            result: Parsed result dict to cache
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+            self._writes_since_eviction += 1
+            run_eviction = self._writes_since_eviction >= EVICTION_INTERVAL
+
+        if run_eviction:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries and trim the cache to max_entries.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,)
+                )
+                removed += cursor.rowcount
+
+            if self.max_entries > 0:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "  SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+                    ")",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+
+            self._conn.commit()
+            self._writes_since_eviction = 0
+
+        if removed:
+            logger.info(f"Evicted {removed} entries from response cache")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+
+        Returns:
+            Dict with hits, misses, hit_rate and entries
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups > 0 else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.max_age_seconds > 0 and time.time() - created_at > self.max_age_seconds
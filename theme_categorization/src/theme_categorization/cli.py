@@ -0,0 +1,179 @@
+"""
+Command-line runner for classifying a review CSV.
+
+    theme-categorize Dataset_v6.csv --output results.jsonl --threads 8 --resume --evaluate
+
+Results are written to JSONL, Parquet or Arrow IPC as they complete, in chunks of
+--chunk-size reviews, so memory stays flat however many rows are
+processed. With --resume, rows already in the output are skipped. Rows
+are identified by Id and occurrence (the number of earlier rows with the
+same Id), since Ids repeat in Dataset_v6.csv, so resume with the same input
+file and --start. --shard-index/--num-shards split a run across machines by
+Id hash; each machine reads only its own rows into memory.
+"""
+import argparse
+import copy
+import dataclasses
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .data_loader import DataLoader
+from .evaluator import evaluate_predictions, parse_ground_truth, parse_llm_themes
+from .exporter import MetricsExporter
+from .ids import RowKeys, normalize_id
+from .journal import JournaledRunner, record_key
+from .llm_clients import HuggingFaceClient
+from .pipeline import ThemeCategorizationPipeline
+from .prompt_engineer import ThemeCategorizationPrompt
+from .settings import Settings
+from .writers import open_result_writer, result_output_exists
+
+logger = logging.getLogger(__name__)
+
+
+def _row_keys(loader: DataLoader, start: int) -> RowKeys:
+    """Count the Ids of the rows before start, so occurrences match a run from the first row."""
+    keys = RowKeys()
+    for review_id, _, _ in loader.iter_reviews(limit=start):
+        keys.key(review_id)
+    return keys
+
+
+def _select_rows(
+    loader: DataLoader,
+    start: int,
+    limit: Optional[int],
+    ground_truth: Optional[Dict[Tuple[Any, int], Optional[str]]] = None,
+    row_keys: Optional[RowKeys] = None
+) -> Iterator[Tuple[Any, str]]:
+    """Yield (Id, Comment) for rows start..start+limit with a comment, collecting ProcessedCode if asked."""
+    for review_id, comment, code in loader.iter_reviews(limit=limit, start=start):
+        review_id = normalize_id(review_id)
+        if ground_truth is not None:
+            ground_truth[row_keys.key(review_id)] = code
+        yield review_id, comment
+
+
+def _evaluate(writer, ground_truth: Dict[Tuple[Any, int], Optional[str]]) -> Dict[str, Any]:
+    """Compare the written results with the collected ground truth, row by row."""
+    ground_truth = {
+        key: code for key, code in ground_truth.items()
+        if isinstance(code, str) and code.strip() and code.strip().lower() != 'nan'
+    }
+    predictions = {}
+    for record in writer.records():
+        key = record_key(record)
+        if key in ground_truth:
+            predictions[key] = parse_llm_themes(record["result"])
+
+    keys = [key for key in ground_truth if key in predictions]
+    return evaluate_predictions(
+        [parse_ground_truth(ground_truth[key]) for key in keys],
+        [predictions[key] for key in keys],
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Classify the reviews of a CSV file and write the results incrementally."""
+    parser = argparse.ArgumentParser(
+        prog="theme-categorize",
+        description="Extract key themes from the reviews in a CSV file",
+    )
+    parser.add_argument("input", help="CSV file with Id and Comment columns (e.g. Dataset_v6.csv)")
+    parser.add_argument("-o", "--output", required=True, help="Results file (.jsonl, .parquet or .arrow)")
+    parser.add_argument("--start", type=int, default=0, help="First review (row among those with a comment)")
+    parser.add_argument("--limit", type=int, default=None, help="Number of reviews (default: all)")
+    parser.add_argument("--shard-index", type=int, default=None,
+                        help="Only process rows whose Id hashes to this shard (with --num-shards)")
+    parser.add_argument("--num-shards", type=int, default=None,
+                        help="Total shards when splitting a run across machines")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Worker threads (default: MAX_WORKERS); requests are still paced by the rate limit")
+    parser.add_argument("--pack-size", type=int, default=None, help="Reviews per LLM call (default: PACK_SIZE)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Reviews per batch between writes")
+    parser.add_argument("--resume", action="store_true", help="Skip rows already present in the output file")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="With --resume, re-process rows whose stored result has no themes")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing output file")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="Compare results with the ProcessedCode ground truth when done")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="Do not pace requests (otherwise they are paced to RATE_LIMIT_RPS, or to "
+                             "1/RATE_LIMIT_DELAY when that is unset: 1 per second by default)")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar")
+    parser.add_argument("--metrics-output", help="Write pipeline (and evaluation) metrics to this JSON file")
+    args = parser.parse_args(argv)
+
+    output = Path(args.output)
+    if args.start < 0 or (args.limit is not None and args.limit < 0):
+        parser.error("--start and --limit must not be negative")
+    if result_output_exists(str(output)) and not (args.resume or args.overwrite):
+        parser.error(f"{output} already has results; pass --resume to continue it or --overwrite to replace it")
+    if output.exists() and args.overwrite and not args.resume:
+        output.unlink()
+
+    try:
+        loader = DataLoader(args.input, shard_index=args.shard_index, num_shards=args.num_shards)
+    except ValueError as e:
+        parser.error(str(e))
+
+    overrides = {}
+    if args.threads is not None:
+        overrides["max_workers"] = args.threads
+    if args.pack_size is not None:
+        overrides["pack_size"] = args.pack_size
+    try:
+        settings = dataclasses.replace(Settings(), **overrides)
+        writer = open_result_writer(str(output), resume=args.resume, model=settings.hf_model_name)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    logger.info(f"Using base URL: {settings.base_url}")
+    logger.info(f"Using model: {settings.hf_model_name}")
+
+    pipeline = ThemeCategorizationPipeline(HuggingFaceClient(settings), ThemeCategorizationPrompt(), settings)
+    exporter = MetricsExporter.from_settings(pipeline, settings)
+    ground_truth: Optional[Dict[Tuple[Any, int], Optional[str]]] = {} if args.evaluate else None
+
+    try:
+        row_keys = _row_keys(loader, args.start)
+        with writer:
+            counts = JournaledRunner(pipeline, writer, retry_failed=args.retry_failed).run(
+                _select_rows(loader, args.start, args.limit, ground_truth, copy.deepcopy(row_keys)),
+                chunk_size=args.chunk_size,
+                row_keys=row_keys,
+                show_progress=not args.no_progress,
+                rate_limit=not args.no_rate_limit,
+            )
+    except FileNotFoundError as e:
+        logger.error(f"Data file not found: {e}")
+        return 1
+    finally:
+        if exporter is not None:
+            exporter.stop()
+
+    report: Dict[str, Any] = {**counts, "output": str(output), "metrics": pipeline.get_metrics()}
+    metrics = report["metrics"]
+    logger.info(f"Processed {counts['processed']} reviews ({counts['skipped']} already in the output, "
+               f"{counts['duplicate_ids']} sharing an Id with an earlier row), "
+               f"success rate {metrics['success_rate']:.2%}, "
+               f"{metrics['avg_themes_per_review']:.2f} themes per review")
+
+    if ground_truth is not None:
+        report["evaluation"] = _evaluate(writer, ground_truth)
+        logger.info(f"Evaluated {report['evaluation']['total_reviews']} reviews with ground truth: "
+                   f"theme identification rate {report['evaluation']['theme_identification_rate']:.1f}%, "
+                   f"novel themes {report['evaluation']['novel_themes_percentage']:.1f}%")
+
+    if args.metrics_output:
+        with open(args.metrics_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Wrote metrics to {args.metrics_output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
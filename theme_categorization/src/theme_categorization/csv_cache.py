@@ -0,0 +1,270 @@
+"""
+Columnar cache of parsed CSV files.
+
+Parsing Dataset_v6.csv from text costs most of a second on every process
+start. read_csv_cached parses the file once, stores the result as an
+uncompressed Arrow IPC (Feather v2) file next to the source, and later
+memory-maps it instead of re-parsing:
+
+    from theme_categorization.csv_cache import read_csv_cached
+    df = read_csv_cached("Dataset_v6.csv")  # drop-in for pd.read_csv(path)
+
+Only the columns callers ask for are parsed and cached. A later call
+needing other columns re-parses the union, so the cache grows to the
+columns actually used instead of holding all of them from the start.
+
+A JSON sidecar records the source's size, modification time, BLAKE2b
+hash and cached columns. The cache is used when size and mtime match.
+When only the mtime changed (e.g. the file was touched or copied), the
+hash decides, so a changed file is never served stale and an unchanged
+one is not re-parsed. Without pyarrow, or when the cache cannot be
+written, the CSV is parsed as usual.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:  # The cache is optional
+    pa = None
+    pc = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the cache layout changes, invalidating existing caches
+CACHE_VERSION = 2
+
+# Bytes read at a time when hashing the source file
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def cache_paths(path: str, cache_dir: Optional[str] = None) -> Dict[str, Path]:
+    """
+    Get the cache and sidecar paths for a CSV file.
+
+    Args:
+        path: Source CSV file
+        cache_dir: Directory for the cache (defaults to the source's directory)
+
+    Returns:
+        Dict with "data" (.arrow cache file) and "meta" (.json sidecar) paths
+    """
+    source = Path(path)
+    directory = Path(cache_dir) if cache_dir is not None else source.parent
+    stem = f".{source.name}.cache"
+    return {"data": directory / f"{stem}.arrow", "meta": directory / f"{stem}.json"}
+
+
+def file_digest(path: str) -> str:
+    """
+    Hash a file's contents.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex BLAKE2b digest
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_csv_cached(
+    path: str,
+    usecols: Optional[Iterable[str]] = None,
+    dtype: Optional[Dict[str, Any]] = None,
+    cache_dir: Optional[str] = None,
+    refresh: bool = False
+) -> pd.DataFrame:
+    """
+    Read a CSV file through the columnar cache, building the cache if needed.
+
+    The cache holds columns as pd.read_csv(path) parses them; dtype is
+    applied when reading it, so one cache serves all callers. Dtypes Arrow
+    can represent (category, numeric and nullable integer types) are applied
+    as Arrow casts before the table is converted to pandas, so each column is
+    copied once by the conversion instead of again by astype. The conversion
+    is still a copy for string, categorical and nullable columns; only
+    numeric columns without nulls may stay views of the memory-mapped file.
+    Arrow buffers are released column by column as they are converted.
+
+    Args:
+        path: Source CSV file
+        usecols: Optional columns to return, in this order
+        dtype: Optional dtypes to convert columns to (e.g. {"Hospital": "category"})
+        cache_dir: Directory for the cache (defaults to the source's directory)
+        refresh: Rebuild the cache even if it is valid
+
+    Returns:
+        DataFrame as pd.read_csv(path, usecols=usecols, dtype=dtype) would return it
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist
+    """
+    source = Path(path)
+    if not source.exists():
+        raise FileNotFoundError(f"File not found: {source}")
+    usecols = list(usecols) if usecols is not None else None
+
+    if pa is None:
+        logger.debug("pyarrow is not installed; reading CSV without cache")
+        return pd.read_csv(source, usecols=usecols, dtype=dtype)
+
+    paths = cache_paths(path, cache_dir)
+    stat = source.stat()
+    meta = None if refresh else _valid_cache_meta(source, stat, paths)
+    if meta is None or not _has_columns(meta, usecols):
+        # Keep the columns already cached for other callers when the source is unchanged
+        if meta is not None and usecols is not None and meta["columns"] is not None:
+            columns = list(dict.fromkeys(meta["columns"] + usecols))
+        else:
+            columns = usecols
+        try:
+            _build_cache(source, stat, paths, columns)
+        except OSError as e:
+            logger.warning(f"Could not write CSV cache for {source}: {e}; reading CSV")
+            return pd.read_csv(source, usecols=usecols, dtype=dtype)
+
+    start_time = time.perf_counter()
+    table = feather.read_table(str(paths["data"]), columns=usecols, memory_map=True)
+    if usecols is not None:
+        table = table.select(usecols)
+    table, types, remaining = _cast_for_pandas(table, dtype or {})
+    df = table.to_pandas(self_destruct=True, split_blocks=True, types_mapper=types.get)
+    del table
+    if remaining:
+        df = df.astype(remaining)
+    logger.debug(f"Read {len(df)} rows from CSV cache {paths['data']} "
+                f"in {time.perf_counter() - start_time:.3f}s")
+    return df
+
+
+def _cast_for_pandas(table: "pa.Table", dtype: Dict[str, Any]):
+    """
+    Apply dtypes as Arrow casts where Arrow has a matching type.
+
+    Returns:
+        (table, types_mapper dict for to_pandas, dtypes left for astype)
+    """
+    types, remaining = {}, {}
+    for column, value in dtype.items():
+        if column not in table.column_names:
+            continue
+        target = pd.api.types.pandas_dtype(value)
+        index = table.column_names.index(column)
+        array = table.column(index)
+        try:
+            if isinstance(target, pd.CategoricalDtype) and target.categories is None:
+                array = _sorted_dictionary(array)
+            elif isinstance(target, pd.api.extensions.ExtensionDtype) and hasattr(target, "numpy_dtype"):
+                # Nullable integer/float types: cast, then have to_pandas build the masked array
+                arrow_type = pa.from_numpy_dtype(target.numpy_dtype)
+                array = array.cast(arrow_type)
+                types[arrow_type] = target
+            elif not isinstance(target, pd.api.extensions.ExtensionDtype) and target.kind in "iufb":
+                array = array.cast(pa.from_numpy_dtype(target))
+            else:
+                remaining[column] = value
+                continue
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            remaining[column] = value
+            continue
+        table = table.set_column(index, column, array)
+    return table, types, remaining
+
+
+def _sorted_dictionary(array: "pa.ChunkedArray") -> "pa.ChunkedArray":
+    """Dictionary-encode a column with sorted values, as astype("category") orders categories."""
+    values = pc.drop_null(pc.unique(array))
+    values = values.take(pc.array_sort_indices(values))
+    return pa.chunked_array(
+        [pa.DictionaryArray.from_arrays(pc.index_in(chunk, value_set=values), values) for chunk in array.chunks],
+        pa.dictionary(pa.int32(), values.type),
+    )
+
+
+def _has_columns(meta: Dict[str, Any], usecols: Optional[List[str]]) -> bool:
+    if meta["columns"] is None:
+        return True
+    return usecols is not None and set(usecols) <= set(meta["columns"])
+
+
+def _valid_cache_meta(source: Path, stat: os.stat_result, paths: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+    """Get the sidecar of a cache that matches the source, or None."""
+    try:
+        with open(paths["meta"], "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (meta.get("version") != CACHE_VERSION or meta.get("size") != stat.st_size
+            or not paths["data"].exists()):
+        return None
+    if meta.get("mtime_ns") == stat.st_mtime_ns:
+        return meta
+
+    # Same size, new mtime: trust the cache only if the contents are unchanged
+    if meta.get("blake2b") != file_digest(str(source)):
+        return None
+    meta["mtime_ns"] = stat.st_mtime_ns
+    try:
+        _write_atomic(paths["meta"], json.dumps(meta, indent=2).encode("utf-8"))
+    except OSError:
+        pass
+    return meta
+
+
+def _build_cache(source: Path, stat: os.stat_result, paths: Dict[str, Path], columns: Optional[List[str]]):
+    start_time = time.perf_counter()
+    df = pd.read_csv(source, usecols=columns)
+    paths["data"].parent.mkdir(parents=True, exist_ok=True)
+
+    # Uncompressed so the cache can be memory-mapped without decoding
+    fd, tmp_path = tempfile.mkstemp(dir=str(paths["data"].parent), prefix=".csv-cache-", suffix=".tmp")
+    os.close(fd)
+    try:
+        feather.write_feather(df, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, paths["data"])
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": source.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "blake2b": file_digest(str(source)),
+        "rows": len(df),
+        # None when every column is cached
+        "columns": None if columns is None else list(df.columns),
+    }
+    _write_atomic(paths["meta"], json.dumps(meta, indent=2).encode("utf-8"))
+    logger.info(f"Built CSV cache {paths['data']} for {source} "
+               f"({len(df)} rows, {len(df.columns)} columns) in {time.perf_counter() - start_time:.2f}s")
+
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=".csv-cache-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -1,53 +1,259 @@
 
+import hashlib
+import io
 import pandas as pd
 import numpy as np
-from typing import List, Optional, Tuple
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 import logging
+import time
+
+from .csv_cache import read_csv_cached
+from .ids import is_missing_id, normalize_id
+from .row_index import RowIndex
 
 logger = logging.getLogger(__name__)
 
+# Explicit dtypes for known Dataset_v6.csv columns; applied to whichever are loaded
+COLUMN_DTYPES = {
+    "Hospital": "category",
+    "Type": "category",
+    "Unit": "category",
+    "Valence": "category",
+    "ProcessedType": "category",
+    "ProcessedUnit": "category",
+    "ProcessedValence": "category",
+    "Year": "Int16",
+    "Month": "Int8",
+    "Day": "Int8",
+}
+
+# Default rows per chunk for iter_reviews
+CHUNK_SIZE = 10_000
+
+# Rows sampled to estimate the memory a load of every column would take
+MEMORY_SAMPLE_ROWS = 1000
+
+# Size of the first chunk read by iter_reviews when only a few reviews are needed
+MIN_CHUNK_SIZE = 256
+
+# Rows converted to Python strings at a time when iterating a ReviewPairs view
+VIEW_BLOCK_SIZE = 4096
+
+
+def shard_for_id(review_id: Any, num_shards: int) -> int:
+    """
+    Assign a review id to a shard.
+    
+    The assignment uses an unkeyed BLAKE2b hash of the normalized id rather
+    than hash(), which is salted per process, so it is identical across
+    processes, runs and machines, and rows appended to a file never move
+    existing ids to another shard, even when an appended row with an empty
+    Id makes pandas read the column as float64 (see normalize_id).
+    
+    Args:
+        review_id: Review id, e.g. a value of the CSV Id column
+        num_shards: Total number of shards
+        
+    Returns:
+        Shard index between 0 and num_shards - 1
+        
+    Raises:
+        ValueError: If num_shards is below 1 or the id is missing (None or NaN)
+    """
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1")
+    if is_missing_id(review_id):
+        raise ValueError("A row without an Id cannot be assigned to a shard")
+    key = str(normalize_id(review_id)).encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+class ReviewPairs(Sequence):
+    """
+    Lazy sequence of (review_text, processed_code) pairs over two filtered columns.
+    
+    The columns stay in pandas (comments and codes); Python strings are only
+    created for the items that are accessed, a block at a time when iterating.
+    Slicing returns another view without copying.
+    """
+    
+    def __init__(self, comments: pd.Series, codes: pd.Series):
+        """
+        Initialize the view.
+        
+        Args:
+            comments: Review texts
+            codes: ProcessedCode values aligned with comments
+        """
+        self.comments = comments
+        self.codes = codes
+    
+    def __len__(self) -> int:
+        return len(self.comments)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Tuple[str, str], "ReviewPairs"]:
+        if isinstance(index, slice):
+            return ReviewPairs(self.comments.iloc[index], self.codes.iloc[index])
+        return str(self.comments.iat[index]), str(self.codes.iat[index])
+    
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for start in range(0, len(self), VIEW_BLOCK_SIZE):
+            end = start + VIEW_BLOCK_SIZE
+            yield from zip(
+                self.comments.iloc[start:end].astype(str).tolist(),
+                self.codes.iloc[start:end].astype(str).tolist(),
+            )
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (ReviewPairs, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"ReviewPairs({len(self)} reviews)"
+    
+    def tolist(self) -> List[Tuple[str, str]]:
+        """Materialize the pairs as a list of tuples."""
+        return list(self)
+
 
 class DataLoader:
     """Handles loading and preprocessing of patient reviews."""
     
-    def __init__(self, file_path: str):
+    def __init__(
+        self,
+        file_path: str,
+        use_cache: bool = True,
+        shard_index: Optional[int] = None,
+        num_shards: Optional[int] = None
+    ):
         """
         Initialize the data loader.
         
         Args:
             file_path: Path to the CSV file containing reviews
+            use_cache: Whether load_data reads through the columnar cache kept
+                next to the CSV (see csv_cache.read_csv_cached)
+            shard_index: Only return rows whose Id hashes to this shard
+                (see shard_for_id); requires num_shards
+            num_shards: Total number of shards, e.g. one per machine
         """
+        if (shard_index is None) != (num_shards is None):
+            raise ValueError("shard_index and num_shards must be given together")
+        if num_shards is not None and not 0 <= shard_index < num_shards:
+            raise ValueError("shard_index must be between 0 and num_shards - 1")
+        
         self.file_path = Path(file_path)
+        self.use_cache = use_cache
+        self.shard_index = shard_index
+        self.num_shards = num_shards
         self._df = None
+        self._columns: Optional[List[str]] = None  # Columns in self._df (None = all)
+        self._row_index: Optional[RowIndex] = None
     
-    def load_data(self) -> pd.DataFrame:
+    def load_data(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
         """
         Load patient reviews from CSV file.
         
+        Only the requested columns are parsed, with the dtypes in COLUMN_DTYPES
+        (e.g. category for Hospital, Type and Unit). The result is cached; a
+        later call needing other columns reloads the union of both. For a
+        sharded loader only the rows of its shard are kept.
+        
+        Args:
+            columns: Optional columns to load (defaults to all columns);
+                'Comment' is always loaded
+            
         Returns:
             DataFrame containing the reviews
             
         Raises:
             FileNotFoundError: If the file doesn't exist
             pd.errors.EmptyDataError: If the file is empty
+            ValueError: If 'Comment' or a requested column is missing
         """
+        if columns is not None:
+            columns = list(dict.fromkeys(["Comment", *columns]))
+        
         if self._df is not None:
-            return self._df
+            if self._columns is None:
+                for column in columns or []:
+                    if column not in self._df.columns:
+                        raise ValueError(f"CSV file must contain a '{column}' column")
+                return self._df if columns is None else self._df[columns]
+            if columns is not None and set(columns) <= set(self._columns):
+                return self._df[columns]
+            if columns is not None:
+                columns = list(dict.fromkeys([*self._columns, *columns]))
             
         if not self.file_path.exists():
             raise FileNotFoundError(f"File not found: {self.file_path}")
         
-        self._df = pd.read_csv(self.file_path)
-        if self._df.empty:
+        header = pd.read_csv(self.file_path, nrows=0).columns
+        if 'Comment' not in header:
+            raise ValueError("CSV file must contain a 'Comment' column")
+        for column in columns or []:
+            if column not in header:
+                raise ValueError(f"CSV file must contain a '{column}' column")
+        
+        if self.num_shards is not None and 'Id' not in header:
+            raise ValueError("CSV file must contain an 'Id' column to be sharded")
+        
+        usecols = columns if columns is not None else list(header)
+        if self.num_shards is not None and 'Id' not in usecols:
+            usecols = [*usecols, 'Id']
+        dtype = {column: dtype for column, dtype in COLUMN_DTYPES.items() if column in usecols}
+        start_time = time.perf_counter()
+        if self.use_cache:
+            df = read_csv_cached(str(self.file_path), usecols=usecols, dtype=dtype)
+        else:
+            df = pd.read_csv(self.file_path, usecols=usecols, dtype=dtype)
+        elapsed = time.perf_counter() - start_time
+        if df.empty:
             raise pd.errors.EmptyDataError("The CSV file is empty")
+        if self.num_shards is not None:
+            df = df[self._shard_mask(df['Id'])]
         
-        if 'Comment' not in self._df.columns:
-            raise ValueError("CSV file must contain a 'Comment' column")
+        self._df = df[columns] if columns is not None else df
+        self._columns = columns
         
-        logger.info(f"Loaded {len(self._df)} rows from {self.file_path}")
+        if logger.isEnabledFor(logging.INFO):
+            memory = self._df.memory_usage(deep=True).sum()
+            saved = ""
+            if len(self._df.columns) < len(header):
+                full_memory = self._estimate_full_memory(len(self._df), memory)
+                saved = f", about {(full_memory - memory) / (1024 * 1024):.1f} MB less than all columns"
+            shard = f" (shard {self.shard_index}/{self.num_shards})" if self.num_shards is not None else ""
+            logger.info(f"Loaded {len(self._df)} rows x {len(self._df.columns)}/{len(header)} columns "
+                       f"from {self.file_path}{shard} in {elapsed:.2f}s "
+                       f"({memory / (1024 * 1024):.1f} MB{saved})")
         return self._df
     
+    def _estimate_full_memory(self, rows: int, memory: int) -> int:
+        """
+        Estimate the memory of loading every column for the loaded rows.
+        
+        The columns that were not loaded are measured on the first
+        MEMORY_SAMPLE_ROWS rows and scaled to rows, and added to the
+        measured memory of the loaded columns.
+        
+        Args:
+            rows: Number of rows loaded
+            memory: Measured memory of the loaded columns in bytes
+            
+        Returns:
+            Estimated memory in bytes
+        """
+        sample = pd.read_csv(self.file_path, nrows=MEMORY_SAMPLE_ROWS, dtype=COLUMN_DTYPES)
+        if sample.empty:
+            return memory
+        skipped = sample.drop(columns=[column for column in self._df.columns if column in sample.columns])
+        per_row = skipped.memory_usage(deep=True, index=False).sum() / len(sample)
+        return memory + int(per_row * rows)
+    
     def get_reviews(self, limit: Optional[int] = None) -> List[str]:
         """
         Get a list of reviews from the loaded data.
@@ -58,10 +264,30 @@ class DataLoader:
         Returns:
             List of review texts
         """
-        df = self.load_data()
+        df = self.load_data(['Comment'])
         reviews = df['Comment'].dropna().astype(str).tolist()
         return reviews[:limit] if limit else reviews
     
+    def get_reviews_with_ids(self, limit: Optional[int] = None) -> List[Tuple[Any, str]]:
+        """
+        Get reviews paired with their CSV Id, e.g. for a JournaledRunner.
+        
+        Args:
+            limit: Optional limit on number of reviews to return
+            
+        Returns:
+            List of tuples: (id, review_text)
+        """
+        df = self.load_data(['Id', 'Comment'])
+        
+        df_filtered = df[df['Comment'].notna()]
+        reviews_with_ids = list(zip(
+            df_filtered['Id'].tolist(),
+            df_filtered['Comment'].astype(str).tolist()
+        ))
+        
+        return reviews_with_ids[:limit] if limit else reviews_with_ids
+    
     def get_reviews_with_ground_truth(
         self, 
         limit: Optional[int] = None,
@@ -78,27 +304,188 @@ class DataLoader:
             List of tuples: (review_text, processed_code_string)
             Only includes reviews with non-empty ProcessedCode if include_empty_ground_truth=False
         """
-        df = self.load_data()
+        return self.get_review_pairs(limit, include_empty_ground_truth).tolist()
+    
+    def get_review_pairs(
+        self,
+        limit: Optional[int] = None,
+        include_empty_ground_truth: bool = False
+    ) -> ReviewPairs:
+        """
+        Get reviews with their ground truth as a lazy view instead of a list.
         
-        if 'ProcessedCode' not in df.columns:
-            raise ValueError("CSV file must contain a 'ProcessedCode' column")
+        Selects the same rows as get_reviews_with_ground_truth, with one
+        vectorized mask, but returns a view over the filtered columns; use
+        .comments and .codes for columnar access or .tolist() for the list.
         
-        # Filter out rows with empty comments
-        df_filtered = df[df['Comment'].notna() & (df['Comment'].astype(str).str.strip() != '')]
+        Args:
+            limit: Optional limit on number of reviews to return
+            include_empty_ground_truth: If True, includes reviews with NaN/empty ProcessedCode
+            
+        Returns:
+            ReviewPairs sequence of (review_text, processed_code_string)
+        """
+        df = self.load_data(['Comment', 'ProcessedCode'])
+        
+        mask = self._ground_truth_mask(df, require_code=not include_empty_ground_truth)
+        comments = df['Comment'][mask]
+        codes = df['ProcessedCode'][mask]
         
-        if not include_empty_ground_truth:
-   
-            df_filtered = df_filtered[df_filtered['ProcessedCode'].notna()]
-       
-            df_filtered = df_filtered[df_filtered['ProcessedCode'].astype(str).str.strip() != '']
+        logger.info(f"Filtered to {len(comments)} reviews with valid ground truth (out of {len(df)} total)")
+        
+        pairs = ReviewPairs(comments, codes)
+        return pairs[:limit] if limit else pairs
     
-            df_filtered = df_filtered[df_filtered['ProcessedCode'].astype(str).str.lower() != 'nan']
+    def iter_reviews(
+        self,
+        chunksize: int = CHUNK_SIZE,
+        with_ground_truth: bool = False,
+        limit: Optional[int] = None,
+        start: int = 0
+    ) -> Iterator[Tuple[Any, str, Optional[str]]]:
+        """
+        Stream reviews from the CSV in chunks without loading the whole file.
         
-        logger.info(f"Filtered to {len(df_filtered)} reviews with valid ground truth (out of {len(df)} total)")
+        Filtering matches the list getters: reviews need a comment, and with
+        with_ground_truth a non-blank comment and a valid ProcessedCode (as in
+        get_reviews_with_ground_truth). Only one chunk is in memory at a time,
+        and when a limit is given the first chunks are sized to it, so a small
+        limit reads only the start of the file. A sharded loader yields only
+        its shard's rows; start and limit count within the shard.
         
-        reviews_with_gt = list(zip(
-            df_filtered['Comment'].astype(str).tolist(),
-            df_filtered['ProcessedCode'].astype(str).tolist()
-        ))
+        Args:
+            chunksize: Maximum rows parsed per chunk
+            with_ground_truth: Only yield reviews with a valid ProcessedCode
+            limit: Optional number of reviews to yield
+            start: Number of matching reviews to skip first
+            
+        Yields:
+            Tuples of (id, review_text, processed_code); processed_code is None
+            if the file has no ProcessedCode column or the value is missing
+        """
+        if not self.file_path.exists():
+            raise FileNotFoundError(f"File not found: {self.file_path}")
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+        
+        header = pd.read_csv(self.file_path, nrows=0).columns
+        for column in ['Id', 'Comment'] + (['ProcessedCode'] if with_ground_truth else []):
+            if column not in header:
+                raise ValueError(f"CSV file must contain a '{column}' column")
+        usecols = [column for column in ('Id', 'Comment', 'ProcessedCode') if column in header]
+        dtype = {column: dtype for column, dtype in COLUMN_DTYPES.items() if column in usecols}
         
-        return reviews_with_gt[:limit] if limit else reviews_with_gt
+        to_skip = start
+        remaining = limit
+        with pd.read_csv(self.file_path, usecols=usecols, dtype=dtype, iterator=True) as reader:
+            while remaining is None or remaining > 0:
+                size = chunksize
+                if remaining is not None:
+                    # Read about twice what is still needed, leaving room for filtered rows
+                    size = min(chunksize, max(MIN_CHUNK_SIZE, 2 * (to_skip + remaining)))
+                try:
+                    chunk = reader.get_chunk(size)
+                except StopIteration:
+                    break
+                
+                if self.num_shards is not None:
+                    chunk = chunk[self._shard_mask(chunk['Id'])]
+                if with_ground_truth:
+                    chunk = chunk[self._ground_truth_mask(chunk)]
+                else:
+                    chunk = chunk[chunk['Comment'].notna()]
+                
+                if to_skip:
+                    skipped = min(to_skip, len(chunk))
+                    chunk = chunk.iloc[skipped:]
+                    to_skip -= skipped
+                if remaining is not None:
+                    chunk = chunk.iloc[:remaining]
+                    remaining -= len(chunk)
+                
+                codes = (
+                    chunk['ProcessedCode'].astype(object).where(chunk['ProcessedCode'].notna(), None).tolist()
+                    if 'ProcessedCode' in chunk.columns
+                    else [None] * len(chunk)
+                )
+                yield from zip(chunk['Id'].tolist(), chunk['Comment'].astype(str).tolist(), codes)
+    
+    def get_by_ids(self, ids: Iterable[Any], columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Read the rows with the given Ids without loading the whole CSV.
+    
+        Uses the byte-offset RowIndex kept next to the CSV, which is built on
+        first use and extended when the file has been appended to. Only the
+        matching records are read and parsed.
+    
+        Args:
+            ids: Integer Ids to fetch, e.g. of failed reviews to re-process;
+                every row with a matching Id is returned
+            columns: Optional columns to parse (defaults to all columns)
+    
+        Returns:
+            DataFrame of the matching rows in file order, with the dtypes in
+            COLUMN_DTYPES; Ids not in the file are skipped
+        """
+        if not self.file_path.exists():
+            raise FileNotFoundError(f"File not found: {self.file_path}")
+        if self._row_index is None:
+            self._row_index = RowIndex(str(self.file_path))
+    
+        ids = list(ids)
+        header = self._row_index.header()
+        records = self._row_index.read_records(ids)
+    
+        usecols = list(columns) if columns is not None else None
+        if self.num_shards is not None and usecols is not None and 'Id' not in usecols:
+            usecols = [*usecols, 'Id']
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        dtype = {
+            column: dtype for column, dtype in COLUMN_DTYPES.items()
+            if column in names and (usecols is None or column in usecols)
+        }
+        df = pd.read_csv(io.BytesIO(header + records), usecols=usecols, dtype=dtype)
+        if self.num_shards is not None:
+            df = df[self._shard_mask(df['Id'])]
+            if columns is not None:
+                df = df[list(columns)]
+    
+        found = set(df['Id'].tolist()) if 'Id' in df.columns else None
+        if found is not None and len(found) < len(set(ids)):
+            logger.warning(f"{len(set(ids)) - len(found)} of {len(set(ids))} requested Ids "
+                          f"not found in {self.file_path}")
+        logger.info(f"Read {len(df)} rows by Id from {self.file_path}")
+        return df
+    
+    def _shard_mask(self, ids: pd.Series) -> np.ndarray:
+        """Select the rows whose Id belongs to this loader's shard; rows without an Id belong to none."""
+        missing = ids.isna().to_numpy()
+        if missing.any():
+            logger.warning(f"Skipping {int(missing.sum())} rows without an Id in shard {self.shard_index}")
+        shards = np.fromiter(
+            (-1 if is_missing_id(review_id) else shard_for_id(review_id, self.num_shards)
+             for review_id in ids.tolist()),
+            dtype=np.int64,
+            count=len(ids),
+        )
+        return shards == self.shard_index
+    
+    @staticmethod
+    def _ground_truth_mask(df: pd.DataFrame, require_code: bool = True) -> pd.Series:
+        """
+        Select rows with a non-blank comment and, if require_code, a non-blank
+        ProcessedCode other than 'nan'.
+        
+        Each column is converted to strings at most once.
+        """
+        comments = df['Comment']
+        mask = comments.notna().to_numpy() & (comments.astype(str).str.strip() != '').to_numpy()
+        if require_code:
+            codes = df['ProcessedCode']
+            code_text = codes.astype(str)
+            mask &= (
+                codes.notna().to_numpy()
+                & (code_text.str.strip() != '').to_numpy()
+                & (code_text.str.lower() != 'nan').to_numpy()
+            )
+        return pd.Series(mask, index=df.index)
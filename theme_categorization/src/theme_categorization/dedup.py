@@ -0,0 +1,119 @@
+"""
+Duplicate review detection ahead of LLM calls.
+
+Patient comments repeat heavily ("Great care", "N/A", redacted "XXXXX"
+variants, identical multi-site postings). Reviews are grouped by a hash
+of their normalized text so each distinct text is sent to the LLM once
+and the result is fanned back out to every original row.
+"""
+import copy
+import hashlib
+import logging
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Whole-word runs of redaction characters, e.g. "XXXXXX" or "xxxxxxxxx"; anchored so
+# words that merely contain "xx" (e.g. "vaxxed") are left alone
+REDACTION_PATTERN = re.compile(r"\b[xX]{2,}\b")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_review(text: str) -> str:
+    """
+    Normalize review text for duplicate detection.
+
+    Lowercases, collapses whitespace and replaces whole-word redaction runs
+    of any length with a single placeholder.
+
+    Args:
+        text: Review text
+
+    Returns:
+        Normalized text
+    """
+    text = REDACTION_PATTERN.sub("xx", str(text).lower())
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+class ReviewDeduplicator:
+    """Collapses duplicate reviews and fans results back out to the original rows."""
+
+    def __init__(self, normalize: Callable[[str], str] = normalize_review):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            normalize: Function mapping review text to its normalized form
+        """
+        self.normalize = normalize
+        self.total_reviews = 0
+        self.unique_reviews = 0
+
+    def deduplicate(self, reviews: List[str]) -> Tuple[List[str], List[int]]:
+        """
+        Collapse reviews with identical normalized text.
+
+        Args:
+            reviews: List of review texts
+
+        Returns:
+            Tuple of (unique reviews, index map). Unique reviews keep the text of
+            their first occurrence; index_map[i] is the position of reviews[i]
+            in the unique list.
+        """
+        positions: Dict[bytes, int] = {}
+        unique_reviews = []
+        index_map = []
+
+        for review in reviews:
+            key = hashlib.blake2b(self.normalize(review).encode("utf-8"), digest_size=16).digest()
+            position = positions.get(key)
+            if position is None:
+                position = len(unique_reviews)
+                positions[key] = position
+                unique_reviews.append(review)
+            index_map.append(position)
+
+        self.total_reviews += len(reviews)
+        self.unique_reviews += len(unique_reviews)
+
+        logger.info(f"Deduplicated {len(reviews)} reviews to {len(unique_reviews)} unique texts "
+                   f"({len(reviews) - len(unique_reviews)} LLM calls saved)")
+        return unique_reviews, index_map
+
+    @staticmethod
+    def expand(unique_results: List[Dict[str, Any]], index_map: List[int]) -> List[Dict[str, Any]]:
+        """
+        Fan results for unique reviews back out to every original review.
+
+        Args:
+            unique_results: Results in the order of the unique reviews
+            index_map: Index map returned by deduplicate
+
+        Returns:
+            One result per original review; duplicates get independent copies
+        """
+        results = []
+        used = set()
+        for position in index_map:
+            result = unique_results[position]
+            results.append(copy.deepcopy(result) if position in used else result)
+            used.add(position)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get deduplication statistics across all deduplicate calls.
+
+        Returns:
+            Dict with total_reviews, unique_reviews, calls_saved and duplicate_ratio
+        """
+        calls_saved = self.total_reviews - self.unique_reviews
+        return {
+            "total_reviews": self.total_reviews,
+            "unique_reviews": self.unique_reviews,
+            "calls_saved": calls_saved,
+            "duplicate_ratio": calls_saved / self.total_reviews if self.total_reviews > 0 else 0.0,
+        }
@@ -4,9 +4,12 @@ from typing import Dict, Any, List, Set, Tuple
 import pandas as pd
 import numpy as np
 
+from .tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
+@traced()
 def parse_ground_truth(processed_code: str) -> Set[str]:
     """
     Parse ground truth themes from ProcessedCode column.
@@ -33,6 +36,7 @@ def parse_ground_truth(processed_code: str) -> Set[str]:
         return set()
 
 
+@traced()
 def parse_llm_themes(llm_result: Dict[str, Any]) -> Set[str]:
     """
     Extract theme names from LLM result.
@@ -82,6 +86,7 @@ def calculate_metrics(
     }
 
 
+@traced()
 def evaluate_predictions(
     ground_truth_list: List[Set[str]],
     predicted_list: List[Set[str]]
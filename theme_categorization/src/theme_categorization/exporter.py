@@ -0,0 +1,263 @@
+"""
+Prometheus/OpenMetrics export of pipeline metrics for long-running jobs.
+
+MetricsExporter renders a ThemeCategorizationPipeline's counters, gauges
+and per-request histograms in the text exposition format and either
+serves them over HTTP (GET /metrics) or writes them periodically to a
+file for node_exporter's textfile collector. Both run on daemon threads
+and are optional; nothing is exported unless started.
+"""
+import logging
+import math
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, List, Optional
+
+from .pipeline import ERROR_CLASSES, ThemeCategorizationPipeline
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Pipeline counters exported as <prefix>_<name>_total, with their help text
+COUNTERS = {
+    "total_reviews": "Reviews processed",
+    "successful_extractions": "Reviews with at least one extracted theme",
+    "failed_extractions": "Reviews without extracted themes",
+    "total_themes_extracted": "Themes extracted across all reviews",
+    "cache_hits": "Response cache hits",
+    "cache_misses": "Response cache misses",
+    "packed_requests": "Packed LLM requests",
+    "requeued_reviews": "Packed reviews re-sent individually",
+    "duplicate_reviews": "Reviews answered from a duplicate in the same batch",
+    "llm_requests": "LLM requests completed (including failed ones)",
+    "request_retries": "LLM request retries",
+    "guided_requests": "LLM requests constrained by a JSON schema",
+    "parse_failures": "LLM responses without usable JSON",
+    "prompt_tokens": "Prompt tokens reported by the backend",
+    "completion_tokens": "Completion tokens reported by the backend",
+    "usage_unavailable": "Successful LLM requests without reported token counts",
+}
+
+# Pipeline gauges exported as <prefix>_<name>, with their help text
+GAUGES = {
+    "in_flight_requests": "LLM requests currently in flight",
+    "queue_depth": "Reviews submitted to a batch and not yet finished",
+    "cache_hit_rate": "Fraction of cache lookups that hit",
+    "success_rate": "Fraction of reviews with at least one extracted theme",
+}
+
+# Per-request histograms exported as summaries: name -> (metric name, help text)
+SUMMARIES = {
+    "latency": ("request_latency_seconds", "LLM request wall time including retries"),
+    "retries": ("request_retries_per_request", "Retries per LLM request"),
+    "prompt_tokens": ("request_prompt_tokens", "Prompt tokens per LLM request"),
+    "completion_tokens": ("request_completion_tokens", "Completion tokens per LLM request"),
+    "parse_time": ("response_parse_seconds", "Time spent parsing LLM responses"),
+}
+
+
+def _format_value(value: Any) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+class MetricsExporter:
+    """Exposes a pipeline's metrics via an HTTP endpoint or a textfile-collector file."""
+
+    def __init__(self, pipeline: ThemeCategorizationPipeline, prefix: str = "theme_pipeline"):
+        """
+        Initialize the exporter.
+
+        Args:
+            pipeline: Pipeline whose metrics are exported
+            prefix: Metric name prefix
+        """
+        self.pipeline = pipeline
+        self.prefix = prefix
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_settings(
+        cls,
+        pipeline: ThemeCategorizationPipeline,
+        settings: Settings
+    ) -> Optional["MetricsExporter"]:
+        """
+        Create and start an exporter as configured in settings.
+
+        Args:
+            pipeline: Pipeline whose metrics are exported
+            settings: Configuration settings instance
+
+        Returns:
+            Running MetricsExporter, or None if neither METRICS_PORT nor
+            METRICS_TEXTFILE is set
+        """
+        if not settings.metrics_port and not settings.metrics_textfile:
+            return None
+
+        exporter = cls(pipeline)
+        if settings.metrics_port:
+            exporter.start_http_server(settings.metrics_port)
+        if settings.metrics_textfile:
+            exporter.start_textfile_writer(settings.metrics_textfile, settings.metrics_interval)
+        return exporter
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Render the current metrics in text exposition format.
+
+        Args:
+            openmetrics: Render OpenMetrics 1.0 (True) or the classic Prometheus
+                text format read by the textfile collector (False)
+
+        Returns:
+            Exposition text
+        """
+        metrics = self.pipeline.get_metrics()
+        lines: List[str] = []
+
+        def family(name: str, metric_type: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for key, help_text in COUNTERS.items():
+            name = f"{self.prefix}_{key}"
+            family(name if openmetrics else f"{name}_total", "counter", help_text)
+            lines.append(f"{name}_total {_format_value(metrics.get(key, 0))}")
+
+        name = f"{self.prefix}_request_errors"
+        family(name if openmetrics else f"{name}_total", "counter",
+               "Failed LLM request attempts by error class")
+        for error_class in ERROR_CLASSES:
+            lines.append(f'{name}_total{{class="{error_class}"}} '
+                         f'{_format_value(metrics.get(f"{error_class}_errors", 0))}')
+
+        for key, help_text in GAUGES.items():
+            name = f"{self.prefix}_{key}"
+            family(name, "gauge", help_text)
+            lines.append(f"{name} {_format_value(metrics.get(key, 0))}")
+
+        histograms = metrics.get("histograms", {})
+        for key, (suffix, help_text) in SUMMARIES.items():
+            summary = histograms.get(key)
+            if summary is None:
+                continue
+            name = f"{self.prefix}_{suffix}"
+            family(name, "summary", help_text)
+            for quantile, label in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                lines.append(f'{name}{{quantile="{label}"}} {_format_value(summary[quantile])}')
+            lines.append(f"{name}_sum {_format_value(summary['sum'])}")
+            lines.append(f"{name}_count {_format_value(summary['count'])}")
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """
+        Atomically write the metrics for node_exporter's textfile collector.
+
+        The file is written next to its destination and renamed into place,
+        so the collector never reads a partial file.
+
+        Args:
+            path: Destination .prom file
+        """
+        destination = Path(path)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(destination.parent), prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render(openmetrics=False))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def start_textfile_writer(self, path: str, interval: float = 15.0):
+        """
+        Rewrite the textfile every interval seconds on a daemon thread.
+
+        Args:
+            path: Destination .prom file
+            interval: Seconds between writes
+        """
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    logger.warning(f"Failed to write metrics textfile {path}: {e}")
+                self._stop.wait(interval)
+
+        thread = threading.Thread(target=run, name="metrics-textfile", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Writing metrics to {path} every {interval:g}s")
+
+    def start_http_server(self, port: int, host: str = "0.0.0.0") -> int:
+        """
+        Serve metrics at http://host:port/metrics on a daemon thread.
+
+        Args:
+            port: Port to listen on (0 picks a free port)
+            host: Interface to listen on
+
+        Returns:
+            The port the server is bound to
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                data = exporter.render(openmetrics=openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+                )
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args):
+                logger.debug(f"{self.address_string()} - {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+        bound_port = self._server.server_address[1]
+        logger.info(f"Serving metrics on http://{host}:{bound_port}/metrics")
+        return bound_port
+
+    def stop(self):
+        """Stop the HTTP server and textfile writer."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -0,0 +1,550 @@
+"""
+Local OpenAI-compatible stand-in for vLLM / the HF Router.
+
+FakeLLMServer answers POST /v1/chat/completions with plausible theme JSON
+for both single-review and packed prompts, so HuggingFaceClient and
+process_batch can be load tested offline. Latency, throughput and failure
+behavior are configurable and seeded, which makes runs reproducible:
+
+    python -m theme_categorization.fake_server --port 8001 --latency 0.3 \\
+        --rate-limit-rate 0.05 --server-error-rate 0.02 --seed 42
+
+then point the pipeline at it with VLLM_BASE_URL=http://localhost:8001/v1
+(and HF_TOKEN unset, so the vLLM URL is used).
+"""
+import argparse
+import contextlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .constants import KEY_THEMES
+from .rate_limiter import CHARS_PER_TOKEN, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+# Keyword stems used to pick plausible themes for a review
+THEME_KEYWORDS = {
+    "parking/transport": ("park", "bus", "taxi", "transport"),
+    "nurse/nurse aide": ("nurse", "nursing"),
+    "dietary/service": ("food", "meal", "diet", "breakfast", "lunch", "dinner"),
+    "billing/accounting": ("bill", "charge", "invoice", "insurance"),
+    "emergency": ("emergency", "triage"),
+    "discharge": ("discharg", "sent home"),
+    "medication/prescription": ("medic", "prescri", "pill", "drug"),
+    "housekeeping/room": ("clean", "dirty", "room", "bathroom"),
+    "physical comfort": ("pain", "comfort", "cold", "noise", "bed"),
+    "families/friends": ("family", "wife", "husband", "daughter", "son", "friend"),
+    "access/coord of care": ("wait", "appointment", "referral", "delay"),
+    "information/education": ("explain", "inform", "told", "question"),
+    "respect to patient": ("respect", "rude", "dignity", "polite"),
+    "emotional support": ("support", "anxious", "scared", "kind"),
+    "radiology": ("x-ray", "xray", "scan", "mri", "ultrasound"),
+    "laboratory": ("lab", "blood test", "sample"),
+    "cardiology": ("heart", "cardi"),
+    "icu/ccu": ("icu", "ccu", "intensive care"),
+    "positive recognition": ("thank", "great", "excellent", "wonderful", "amazing"),
+}
+
+SINGLE_REVIEW_PATTERN = re.compile(r"Patient Review:\n(.*?)\n\nRespond with", re.S)
+PACKED_REVIEW_PATTERN = re.compile(
+    r"^Review (\d+):\n(.*?)(?=\n\nReview \d+:\n|\n\nRespond with|\Z)", re.S | re.M
+)
+
+
+@dataclass
+class FakeServerConfig:
+    """Behavior of the fake server; all rates are probabilities per request."""
+
+    model: str = "fake-model"
+    latency: float = 0.2  # Typical base latency in seconds (median for lognormal, mean otherwise)
+    latency_distribution: str = "lognormal"  # constant, uniform, normal, lognormal or exponential
+    latency_spread: float = 0.5  # Relative spread (sigma for lognormal, stddev/width fraction otherwise)
+    token_latency: float = 0.0  # Extra seconds per generated completion token
+    max_concurrency: int = 0  # Requests processed at once; excess requests queue (0 = unlimited)
+    requests_per_second: float = 0  # Request throughput cap (0 = unlimited)
+    tokens_per_second: float = 0  # Completion token throughput cap (0 = unlimited)
+    rate_limit_rate: float = 0.0  # Probability of a 429 response
+    retry_after: float = 1.0  # Retry-After seconds sent with 429 responses
+    server_error_rate: float = 0.0  # Probability of a 500/502/503 response
+    timeout_rate: float = 0.0  # Probability of hanging without responding
+    timeout_seconds: float = 300.0  # How long a hanging request stalls before the connection is dropped
+    malformed_rate: float = 0.0  # Probability of returning truncated, unparseable JSON
+    seed: Optional[int] = None  # Seed for reproducible latencies and failures
+
+    def __post_init__(self):
+        """Validate the configuration."""
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        for name in ("rate_limit_rate", "server_error_rate", "timeout_rate", "malformed_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+
+@dataclass
+class FakeServerStats:
+    """Counters of requests handled by the fake server, by outcome."""
+
+    requests: int = 0
+    completed: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    timeouts: int = 0
+    malformed: int = 0
+    truncated: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    in_flight: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def increment(self, **counts: int):
+        """Add to one or more counters."""
+        with self._lock:
+            for key, value in counts.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def as_dict(self) -> Dict[str, int]:
+        """Get a snapshot of the counters."""
+        with self._lock:
+            return {key: value for key, value in vars(self).items() if not key.startswith("_")}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text with the same heuristic as the rate limiter."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def pick_themes(review: str) -> List[Dict[str, str]]:
+    """
+    Pick plausible themes for a review by keyword matching.
+
+    Args:
+        review: Review text
+
+    Returns:
+        List of theme dicts with theme and description
+    """
+    text = review.lower()
+    themes = []
+    for theme, stems in THEME_KEYWORDS.items():
+        stem = next((stem for stem in stems if stem in text), None)
+        if stem is not None:
+            themes.append({"theme": theme, "description": f"The review mentions '{stem}'."})
+
+    if not themes:
+        theme = "general comment" if text.strip() else "unknown"
+        themes = [{"theme": theme, "description": "The review makes a general remark about the visit."}]
+    return [t for t in themes if t["theme"] in KEY_THEMES][:4]
+
+
+def build_completion(prompt: str) -> str:
+    """
+    Build the JSON completion a well-behaved model would return for a prompt.
+
+    Args:
+        prompt: Prompt built by ThemeCategorizationPrompt (single or packed)
+
+    Returns:
+        JSON text
+    """
+    packed = PACKED_REVIEW_PATTERN.findall(prompt) if '"results"' in prompt else []
+    if packed:
+        results = [{"id": int(review_id), "themes": pick_themes(review)} for review_id, review in packed]
+        return json.dumps({"results": results})
+
+    match = SINGLE_REVIEW_PATTERN.search(prompt)
+    return json.dumps({"themes": pick_themes(match.group(1) if match else prompt)})
+
+
+class FakeLLMServer:
+    """Threaded HTTP server emulating the OpenAI chat completions API."""
+
+    def __init__(
+        self,
+        config: Optional[FakeServerConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Initialize the server and bind its socket.
+
+        Args:
+            config: Server behavior (defaults to FakeServerConfig())
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.config = config or FakeServerConfig()
+        self.stats = FakeServerStats()
+
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._concurrency = (
+            threading.BoundedSemaphore(self.config.max_concurrency)
+            if self.config.max_concurrency > 0 else None
+        )
+        self._request_bucket = (
+            TokenBucket(self.config.requests_per_second, 1)
+            if self.config.requests_per_second > 0 else None
+        )
+        self._token_bucket = (
+            TokenBucket(self.config.tokens_per_second, self.config.tokens_per_second)
+            if self.config.tokens_per_second > 0 else None
+        )
+        self._thread: Optional[threading.Thread] = None
+
+        self._httpd = ThreadingHTTPServer((host, port), _FakeLLMRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake_server = self
+
+    @property
+    def port(self) -> int:
+        """Port the server is bound to."""
+        return self._httpd.server_address[1]
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as Settings.vllm_base_url."""
+        return f"http://{self._httpd.server_address[0]}:{self.port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        """
+        Serve requests on a background daemon thread.
+
+        Returns:
+            The server itself
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake LLM server listening on {self.url}")
+        return self
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until interrupted."""
+        logger.info(f"Fake LLM server listening on {self.url}")
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop the background thread started by start() and close the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.close()
+
+    def close(self):
+        """Close the listening socket."""
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get request counters.
+
+        Returns:
+            Dict with requests, completed, failure counts and token totals
+        """
+        return self.stats.as_dict()
+
+    def sample_latency(self) -> float:
+        """Draw a base latency in seconds from the configured distribution."""
+        base, spread = self.config.latency, self.config.latency_spread
+        distribution = self.config.latency_distribution
+        with self._random_lock:
+            if distribution == "constant":
+                latency = base
+            elif distribution == "uniform":
+                latency = self._random.uniform(base * (1 - spread), base * (1 + spread))
+            elif distribution == "normal":
+                latency = self._random.gauss(base, base * spread)
+            elif distribution == "lognormal":
+                latency = base * math.exp(self._random.gauss(0.0, spread))
+            else:
+                latency = self._random.expovariate(1.0 / base) if base > 0 else 0.0
+        return max(latency, 0.0)
+
+    def choose_outcome(self) -> str:
+        """
+        Decide how to answer the next request.
+
+        Returns:
+            One of rate_limited, server_error, timeout, malformed or ok
+        """
+        with self._random_lock:
+            roll = self._random.random()
+
+        for outcome, rate in (
+            ("rate_limited", self.config.rate_limit_rate),
+            ("server_error", self.config.server_error_rate),
+            ("timeout", self.config.timeout_rate),
+            ("malformed", self.config.malformed_rate),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    def server_error_code(self) -> int:
+        """Pick the status code of an injected server error."""
+        with self._random_lock:
+            return self._random.choice((500, 502, 503))
+
+    def generate(self, body: Dict[str, Any], malformed: bool) -> Tuple[str, str, Dict[str, int], float]:
+        """
+        Produce the completion for a request and the time it should take.
+
+        Args:
+            body: Parsed request body
+            malformed: Whether to corrupt the JSON
+
+        Returns:
+            Tuple of (content, finish_reason, usage, generation seconds)
+        """
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        content = build_completion(prompt)
+        finish_reason = "stop"
+
+        if malformed:
+            content = content[:max(1, len(content) // 2)]
+
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            content = content[:max_tokens * CHARS_PER_TOKEN]
+            finish_reason = "length"
+            self.stats.increment(truncated=1)
+
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        generation_time = usage["completion_tokens"] * self.config.token_latency
+        if self._token_bucket is not None:
+            generation_time = max(generation_time, self._token_bucket.reserve(usage["completion_tokens"]))
+        return content, finish_reason, usage, generation_time
+
+    @contextlib.contextmanager
+    def admit(self) -> Iterator[None]:
+        """Wait for room under the request throughput and concurrency caps."""
+        if self._request_bucket is not None:
+            time.sleep(self._request_bucket.reserve())
+        if self._concurrency is None:
+            yield
+            return
+        with self._concurrency:
+            yield
+
+
+class _FakeLLMRequestHandler(BaseHTTPRequestHandler):
+    """Request handler; the owning FakeLLMServer is available as self.server.fake_server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def do_GET(self):
+        fake = self.server.fake_server
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": fake.config.model, "object": "model"}]})
+        elif self.path.rstrip("/") in ("/health", "/stats"):
+            self._send_json(200, fake.get_stats())
+        else:
+            self._send_json(404, _error_body("Not found", "not_found_error"))
+
+    def do_POST(self):
+        fake = self.server.fake_server
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, _error_body("Request body is not valid JSON", "invalid_request_error"))
+            return
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, _error_body(f"Unknown endpoint {self.path}", "not_found_error"))
+            return
+        if not body.get("messages"):
+            self._send_json(400, _error_body("'messages' is required", "invalid_request_error"))
+            return
+
+        fake.stats.increment(requests=1, in_flight=1)
+        try:
+            self._handle_completion(fake, body)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client disconnected before the response finished")
+        finally:
+            fake.stats.increment(in_flight=-1)
+
+    def _handle_completion(self, fake: FakeLLMServer, body: Dict[str, Any]):
+        outcome = fake.choose_outcome()
+
+        if outcome == "rate_limited":
+            fake.stats.increment(rate_limited=1)
+            self._send_json(
+                429, _error_body("Rate limit exceeded", "rate_limit_error"),
+                headers={"Retry-After": f"{fake.config.retry_after:g}"}
+            )
+            return
+        if outcome == "server_error":
+            fake.stats.increment(server_errors=1)
+            self._send_json(fake.server_error_code(), _error_body("Injected server error", "server_error"))
+            return
+        if outcome == "timeout":
+            fake.stats.increment(timeouts=1)
+            time.sleep(fake.config.timeout_seconds)
+            self.close_connection = True
+            return
+
+        with fake.admit():
+            latency = fake.sample_latency()
+            content, finish_reason, usage, generation_time = fake.generate(body, outcome == "malformed")
+            if outcome == "malformed":
+                fake.stats.increment(malformed=1)
+
+            if body.get("stream"):
+                time.sleep(latency)
+                self._stream(fake, body, content, finish_reason, usage, generation_time)
+            else:
+                time.sleep(latency + generation_time)
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", fake.config.model),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": finish_reason,
+                    }],
+                    "usage": usage,
+                })
+
+        fake.stats.increment(
+            completed=1,
+            prompt_tokens=usage["prompt_tokens"],
+            completion_tokens=usage["completion_tokens"],
+        )
+
+    def _stream(
+        self,
+        fake: FakeLLMServer,
+        body: Dict[str, Any],
+        content: str,
+        finish_reason: str,
+        usage: Dict[str, int],
+        generation_time: float
+    ):
+        """Send the completion as server-sent events, one token-sized chunk at a time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", fake.config.model)
+        pieces = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        delay = generation_time / len(pieces) if pieces else 0.0
+
+        def chunk(delta: Dict[str, Any], reason: Optional[str] = None, **extra) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+                **extra,
+            }
+
+        self._send_event(chunk({"role": "assistant", "content": ""}))
+        for piece in pieces:
+            if delay:
+                time.sleep(delay)
+            self._send_event(chunk({"content": piece}))
+        self._send_event(chunk({}, finish_reason))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, payload: Dict[str, Any]):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _error_body(message: str, error_type: str) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": error_type}}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the fake server from the command line."""
+    defaults = FakeServerConfig()
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--model", default=defaults.model)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS,
+                        default=defaults.latency_distribution)
+    parser.add_argument("--latency-spread", type=float, default=defaults.latency_spread)
+    parser.add_argument("--token-latency", type=float, default=defaults.token_latency)
+    parser.add_argument("--max-concurrency", type=int, default=defaults.max_concurrency)
+    parser.add_argument("--requests-per-second", type=float, default=defaults.requests_per_second)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--server-error-rate", type=float, default=defaults.server_error_rate)
+    parser.add_argument("--timeout-rate", type=float, default=defaults.timeout_rate)
+    parser.add_argument("--timeout-seconds", type=float, default=defaults.timeout_seconds)
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    options = vars(args)
+    host, port = options.pop("host"), options.pop("port")
+    server = FakeLLMServer(FakeServerConfig(**options), host=host, port=port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"Stopping fake LLM server; stats: {server.get_stats()}")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
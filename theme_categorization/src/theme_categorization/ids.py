@@ -0,0 +1,79 @@
+"""
+Review id helpers shared by the data, journal and output layers.
+
+This module has no dependencies beyond the standard library, so the data
+layer can use it without importing the LLM client stack.
+"""
+import math
+import numbers
+from typing import Any, Dict, Tuple
+
+
+def normalize_id(review_id: Any) -> Any:
+    """
+    Convert a review id to a JSON-serializable key.
+
+    Integral ids (including numpy integers read from the CSV) and floats
+    with an integral value become int, anything else becomes str, so ids
+    compare equal across restarts. pandas reads an Id column as float64 as
+    soon as one row has an empty Id, and 106.0 must still be the same id as
+    106.
+
+    Args:
+        review_id: Review id, e.g. a value of the CSV Id column
+
+    Returns:
+        int or str id
+    """
+    if isinstance(review_id, numbers.Integral):
+        return int(review_id)
+    if isinstance(review_id, numbers.Real) and float(review_id).is_integer():
+        return int(review_id)
+    return str(review_id)
+
+
+def is_missing_id(review_id: Any) -> bool:
+    """
+    Check whether a review id is missing (None or NaN, e.g. an empty CSV cell).
+
+    Args:
+        review_id: Review id, e.g. a value of the CSV Id column
+
+    Returns:
+        True if the row has no id
+    """
+    if review_id is None:
+        return True
+    return isinstance(review_id, numbers.Real) and math.isnan(review_id)
+
+
+class RowKeys:
+    """
+    Keys rows by (id, occurrence), so rows that share an Id stay distinct.
+
+    occurrence counts the earlier rows with the same id, so the first row
+    with an id is (id, 0), the next (id, 1) and so on. The keys are stable
+    across runs as long as the rows arrive in the same order, e.g. the row
+    order of a CSV file, also when they are split into shards by Id.
+    """
+
+    def __init__(self):
+        self._seen: Dict[Any, int] = {}
+        self.duplicates = 0  # Rows whose id was already seen
+
+    def key(self, review_id: Any) -> Tuple[Any, int]:
+        """
+        Key the next row.
+
+        Args:
+            review_id: Id of the row
+
+        Returns:
+            Tuple of (normalized id, occurrence)
+        """
+        review_id = normalize_id(review_id)
+        occurrence = self._seen.get(review_id, 0)
+        self._seen[review_id] = occurrence + 1
+        if occurrence:
+            self.duplicates += 1
+        return review_id, occurrence
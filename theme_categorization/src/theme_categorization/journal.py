@@ -0,0 +1,310 @@
+"""
+Write-ahead results journal for crash-safe, resumable batch runs.
+
+Every finished review is appended to a JSONL file as soon as it completes,
+and the file is fsynced periodically. On restart the journal is read back
+and reviews already recorded are skipped, so a crash late in a multi-hour
+run only loses the last few unsynced rows. Failed extractions (results
+without themes) are journaled too but are retried on restart by default.
+
+Records are keyed by (Id, occurrence) rather than the Id alone, because
+Ids are not unique: in Dataset_v6.csv, Id 0 is shared by several thousand
+rows. occurrence counts the earlier input rows with the same Id (see
+ids.RowKeys) and is only written when non-zero, so every row is processed
+and journaled once, as long as the input order is the same on restart.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .ids import RowKeys, normalize_id
+from .pipeline import ThemeCategorizationPipeline
+
+logger = logging.getLogger(__name__)
+
+# Default number of appended records between fsyncs
+FSYNC_EVERY_RECORDS = 100
+
+# Default maximum seconds between fsyncs
+FSYNC_EVERY_SECONDS = 5.0
+
+
+def record_key(record: Dict[str, Any]) -> Tuple[Any, int]:
+    """
+    Get the (id, occurrence) key of a journaled record.
+
+    Args:
+        record: Record as yielded by records()
+
+    Returns:
+        Tuple of (id, occurrence); records without an occurrence are the
+        first row with their id
+    """
+    return record["id"], record.get("occurrence", 0)
+
+
+class ResultsJournal:
+    """Append-only JSONL journal of completed results, keyed by (review id, occurrence)."""
+
+    def __init__(
+        self,
+        path: str,
+        fsync_every: int = FSYNC_EVERY_RECORDS,
+        fsync_interval: float = FSYNC_EVERY_SECONDS
+    ):
+        """
+        Open (or create) the journal.
+
+        A torn final line left behind by a crash is truncated before new
+        records are appended.
+
+        Args:
+            path: Path to the JSONL journal file
+            fsync_every: Fsync after this many appended records
+            fsync_interval: Fsync when this many seconds have passed since the last fsync
+        """
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._repair()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+        logger.info(f"Opened results journal at {self.path}")
+
+    def __enter__(self) -> "ResultsJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(
+        self,
+        review_id: Any,
+        result: Dict[str, Any],
+        latency: Optional[float] = None,
+        occurrence: int = 0
+    ):
+        """
+        Append a completed result.
+
+        Args:
+            review_id: Id of the review (e.g. the CSV Id column)
+            result: Result dict returned by the pipeline
+            latency: Optional processing time in seconds
+            occurrence: Number of earlier input rows with the same id
+        """
+        record = {"id": normalize_id(review_id)}
+        if occurrence:
+            record["occurrence"] = occurrence
+        record["result"] = result
+        if latency is not None:
+            record["latency"] = round(latency, 6)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            self._file.write(line)
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def flush(self):
+        """Write buffered records and fsync them to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """Fsync outstanding records and close the journal."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over journaled records in the order they were written.
+
+        Yields:
+            Dicts with id, result and (if recorded) occurrence and latency
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt journal line {line_number} in {self.path}")
+
+    def completed_keys(self, include_failed: bool = False) -> Set[Tuple[Any, int]]:
+        """
+        Get the rows already recorded in the journal.
+
+        Args:
+            include_failed: Whether rows whose result has no themes (a failed
+                extraction, as counted by the pipeline metrics) count as done
+
+        Returns:
+            Set of (normalized id, occurrence) keys
+        """
+        return {
+            record_key(record) for record in self.records()
+            if include_failed or record["result"].get("themes")
+        }
+
+    def load_results(self) -> Dict[Tuple[Any, int], Dict[str, Any]]:
+        """
+        Load journaled results.
+
+        Returns:
+            Dict mapping (id, occurrence) to result; the latest record wins
+            for a row journaled more than once (e.g. a retried failure)
+        """
+        return {record_key(record): record["result"] for record in self.records()}
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _repair(self):
+        """Drop a partially written last line so appends start on a fresh line."""
+        if not self.path.exists():
+            return
+
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # Scan back to the last complete line
+            position = size
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                newline = f.read(step).rfind(b"\n")
+                if newline != -1:
+                    position += newline + 1
+                    break
+            f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+
+        logger.warning(f"Truncated incomplete final record in {self.path} "
+                      f"({size - position} bytes)")
+
+
+class JournaledRunner:
+    """Runs the pipeline over (id, review) records, journaling results and skipping finished rows."""
+
+    def __init__(
+        self,
+        pipeline: ThemeCategorizationPipeline,
+        journal: ResultsJournal,
+        retry_failed: bool = True
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            pipeline: Pipeline used to process reviews
+            journal: Journal receiving each result as it completes
+            retry_failed: Whether to re-process rows whose journaled result has
+                no themes when resuming
+        """
+        self.pipeline = pipeline
+        self.journal = journal
+        self.retry_failed = retry_failed
+
+    def run(
+        self,
+        records: Iterable[Tuple[Any, str]],
+        chunk_size: int = 1000,
+        row_keys: Optional[RowKeys] = None,
+        **batch_kwargs
+    ) -> Dict[str, int]:
+        """
+        Process every record that is not yet in the journal.
+
+        Records are keyed by (id, occurrence), so rows sharing an id are each
+        processed; pass them in the same order when resuming. Records are
+        processed in chunks with process_batch, and the journal is flushed
+        after each chunk, so only one chunk of results is held in memory or
+        at risk; read results back with journal.load_results().
+
+        Args:
+            records: Iterable of (id, review_text) pairs, e.g. from the CSV Id
+                and Comment columns
+            chunk_size: Number of reviews passed to process_batch at a time
+            row_keys: Keys to continue from when records start partway into
+                the input, e.g. seeded with the rows before --start, so
+                occurrences count from the start of the input
+            **batch_kwargs: Extra keyword arguments for process_batch
+                (show_progress, rate_limit, max_workers, pack_size, deduplicate)
+
+        Returns:
+            Dict with processed, skipped (already journaled), duplicate_ids
+            (rows sharing an id with an earlier row, processed all the same)
+            and total counts
+        """
+        done = self.journal.completed_keys(include_failed=not self.retry_failed)
+        if done:
+            logger.info(f"Resuming: {len(done)} rows already journaled in {self.journal.path}")
+
+        keys = row_keys if row_keys is not None else RowKeys()
+        duplicates_before = keys.duplicates
+        processed = skipped = total = 0
+        chunk: List[Tuple[Tuple[Any, int], str]] = []
+
+        for review_id, review in records:
+            total += 1
+            key = keys.key(review_id)
+            if key in done:
+                skipped += 1
+                continue
+            chunk.append((key, review))
+            if len(chunk) >= chunk_size:
+                processed += self._run_chunk(chunk, batch_kwargs)
+                chunk = []
+
+        if chunk:
+            processed += self._run_chunk(chunk, batch_kwargs)
+
+        duplicates = keys.duplicates - duplicates_before
+        if duplicates:
+            logger.warning(f"{duplicates} of {total} rows share an id with an earlier row; "
+                          f"they are journaled by (id, occurrence), so resume with the rows in the same order")
+        logger.info(f"Journaled run complete: {processed} processed, {skipped} already journaled "
+                   f"out of {total}")
+        return {"processed": processed, "skipped": skipped, "duplicate_ids": duplicates, "total": total}
+
+    def _run_chunk(self, chunk: List[Tuple[Tuple[Any, int], str]], batch_kwargs: Dict[str, Any]) -> int:
+        keys = [key for key, _ in chunk]
+
+        def on_result(index: int, result: Dict[str, Any], latency: float):
+            review_id, occurrence = keys[index]
+            self.journal.append(review_id, result, latency, occurrence=occurrence)
+
+        self.pipeline.process_batch([review for _, review in chunk], on_result=on_result, **batch_kwargs)
+        # Make the chunk durable before starting the next one
+        self.journal.flush()
+        return len(chunk)
@@ -1,12 +1,20 @@
+import asyncio
 import json
 import logging
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from openai import OpenAI
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Optional, List
+from openai import AsyncOpenAI, OpenAI
 
 from .settings import Settings
 from .constants import KEY_THEMES
+from .load_balancer import Endpoint, EndpointPool
+from .retry import RetryPolicy, get_circuit_breaker, get_status_code
+from .steps import Sleep, Steps, arun_steps, run_steps
+from .streaming import JsonObjectScanner
+from .prompt_engineer import build_packed_themes_schema, build_themes_schema
+from .tracing import get_tracer
 
 # Try to import connection error types from common libraries
 try:
@@ -33,6 +41,38 @@ except ImportError:
         RateLimitError = Exception
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+# Ask for a final usage chunk on streamed requests; without it the server reports no token counts
+STREAM_USAGE = {"stream_options": {"include_usage": True}}
+
+
+@dataclass
+class RequestStats:
+    """Timing and outcome of one LLM request, including its retries."""
+    
+    model: str
+    endpoint: str
+    streamed: bool = False
+    attempts: int = 0
+    success: bool = False
+    latency: float = 0.0  # Wall time across all attempts, in seconds
+    time_to_first_token: Optional[float] = None  # Streaming only, for the final attempt
+    generation_time: Optional[float] = None  # Streaming only, first to last token of the final attempt
+    guided: bool = False  # Response was constrained by a JSON schema
+    parse_failed: bool = False  # Response contained no usable JSON
+    prompt_tokens: Optional[int] = None  # From the response usage; None when the server did not report it
+    completion_tokens: Optional[int] = None  # From the response usage; None when the server did not report it
+    parse_time: Optional[float] = None  # Seconds spent parsing the response into themes
+    errors: Dict[str, int] = field(default_factory=dict)  # Failed attempts by error class
+
+
+@dataclass
+class _Send:
+    """Step of HuggingFaceClient._completion_steps: send one chat completion request."""
+    
+    endpoint: Endpoint
+    request_kwargs: Dict[str, Any]
 
 
 class LLMClient(ABC):
@@ -55,11 +95,39 @@ class LLMClient(ABC):
                 base_url=settings.base_url,
                 api_key=settings.api_key,
                 timeout=settings.hf_timeout,
+                max_retries=0,  # Retries are handled by RetryPolicy
             )
             logger.info(f"Successfully initialized LLM client")
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {e}", exc_info=True)
             raise
+        
+        self._request_listeners: List[Callable[[RequestStats], None]] = []
+    
+    def add_request_listener(self, listener: Callable[[RequestStats], None]):
+        """
+        Register a callback invoked with the RequestStats of every completed request.
+        
+        Listeners may be called from worker threads or an event loop, so they
+        must be thread-safe and fast.
+        
+        Args:
+            listener: Callable receiving a RequestStats instance
+        """
+        self._request_listeners.append(listener)
+    
+    def _notify_request(self, stats: RequestStats):
+        """
+        Pass the stats of a completed request to all registered listeners.
+        
+        Args:
+            stats: Stats of the completed request
+        """
+        for listener in self._request_listeners:
+            try:
+                listener(stats)
+            except Exception as e:
+                logger.error(f"Request listener failed: {e}", exc_info=True)
     
     @abstractmethod
     def extract_themes(self, patient_review: str) -> Dict[str, Any]:
@@ -81,17 +149,53 @@ class HuggingFaceClient(LLMClient):
     Supports both vLLM (local) and HuggingFace Inference Router.
     """
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, themes: Optional[List[str]] = None):
         """
         Initialize the HuggingFace client.
         
         Args:
             settings: Configuration settings instance
+            themes: Allowed themes for guided decoding. If None, uses default KEY_THEMES.
         """
         super().__init__(settings)
         self.model_name = settings.hf_model_name
+        self.themes = themes or KEY_THEMES
+        # Cleared when the backend rejects schema-constrained requests
+        self.guided_decoding = settings.guided_decoding
+        self.retry_policy = RetryPolicy.from_settings(settings)
+        self.endpoint_pool = EndpointPool([
+            Endpoint(url, self.client if url == settings.base_url else self._create_client(url),
+                     get_circuit_breaker(url, settings))
+            for url in settings.base_urls
+        ])
         logger.info(f"Using model: {self.model_name}")
     
+    def _create_client(self, base_url: str) -> OpenAI:
+        """
+        Create an OpenAI client for an additional endpoint.
+        
+        Args:
+            base_url: Endpoint base URL
+            
+        Returns:
+            OpenAI client instance
+        """
+        return OpenAI(
+            base_url=base_url,
+            api_key=self.settings.api_key,
+            timeout=self.settings.hf_timeout,
+            max_retries=0,  # Retries are handled by RetryPolicy
+        )
+    
+    def get_endpoint_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-endpoint health, latency and error statistics.
+        
+        Returns:
+            Dict mapping endpoint URL to its stats
+        """
+        return self.endpoint_pool.get_stats()
+    
     def extract_themes(self, patient_review: str, retries: int = 3) -> Dict[str, Any]:
         """
         Extract themes from a patient review using HuggingFace API.
@@ -103,156 +207,652 @@ class HuggingFaceClient(LLMClient):
         Returns:
             Dict containing extracted themes in format: {"themes": [{"theme": str, "description": str}]}
         """
-        # Log request details (only on first attempt to reduce verbosity)
-        for attempt in range(retries):
-            try:
-                if attempt == 0:
-                    logger.info(f"Extracting themes - Attempt {attempt + 1}/{retries}")
-                    logger.debug(f"  Base URL: {self.settings.base_url}")
-                    logger.debug(f"  Model: {self.model_name}")
-                    logger.debug(f"  Timeout: {self.settings.hf_timeout}s")
-                    logger.debug(f"  API Key: {'***SET***' if self.settings.api_key != 'EMPTY' else 'EMPTY (vLLM mode)'}")
-                    logger.debug(f"  Prompt length: {len(patient_review)} characters")
-                else:
-                    logger.info(f"Retry attempt {attempt + 1}/{retries}")
-                
-                logger.debug(f"Sending request to {self.settings.base_url}")
-                logger.debug(f"Request parameters: model={self.model_name}, temperature={self.settings.temperature}, max_tokens={self.settings.max_tokens}")
-                
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": patient_review}],
-                    temperature=self.settings.temperature,
-                    max_tokens=self.settings.max_tokens,
-                )
-                
-                logger.debug(f"Successfully received response from API")
-                content = response.choices[0].message.content
-                logger.debug(f"Raw LLM response (first 200 chars): {content[:200]}...")
-                
-                # Parse JSON response
-                result = self._parse_response(content)
-                logger.debug(f"Successfully extracted {len(result.get('themes', []))} themes")
-                return result
-                
-            except APITimeoutError as e:
-                logger.error(f"TIMEOUT ERROR on attempt {attempt + 1}/{retries}")
-                logger.error(f"  Error type: {type(e).__name__}")
-                logger.error(f"  Error message: {str(e)}")
-                logger.error(f"  Timeout setting: {self.settings.hf_timeout}s")
-                logger.error(f"  Base URL: {self.settings.base_url}")
-                if hasattr(e, '__cause__') and e.__cause__:
-                    logger.error(f"  Underlying error: {e.__cause__}")
-                
-                # Provide troubleshooting suggestions
-                logger.error(f"  TROUBLESHOOTING:")
-                if "handshake" in str(e.__cause__).lower() or "ssl" in str(e.__cause__).lower():
-                    logger.error(f"    - SSL handshake timeout detected")
-                    logger.error(f"    - This may indicate network connectivity issues")
-                    logger.error(f"    - Try increasing HF_TIMEOUT in .env file (e.g., HF_TIMEOUT=120)")
-                else:
-                    logger.error(f"    - Request is taking longer than {self.settings.hf_timeout}s")
-                    logger.error(f"    - HuggingFace Router may be slow or overloaded")
-                    logger.error(f"    - Try increasing HF_TIMEOUT in .env file (e.g., HF_TIMEOUT=120)")
-                    logger.error(f"    - Check your network connection")
-                
-                if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    logger.info(f"Retrying after {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {retries} attempts due to timeout")
-                    logger.error(f"  SUGGESTION: Increase HF_TIMEOUT in your .env file to 120 or higher")
-                    return {"themes": []}
-                    
-            except RateLimitError as e:
-                logger.error(f"RATE LIMIT ERROR on attempt {attempt + 1}/{retries}")
-                logger.error(f"  Error type: {type(e).__name__}")
-                logger.error(f"  Error message: {str(e)}")
-                if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    logger.info(f"Retrying after {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {retries} attempts due to rate limit")
-                    return {"themes": []}
-                    
-            except APIError as e:
-                logger.error(f"API ERROR on attempt {attempt + 1}/{retries}")
-                logger.error(f"  Error type: {type(e).__name__}")
-                logger.error(f"  Error message: {str(e)}")
-                logger.error(f"  Base URL: {self.settings.base_url}")
-                logger.error(f"  Model: {self.model_name}")
-                if hasattr(e, 'status_code'):
-                    logger.error(f"  HTTP Status: {e.status_code}")
-                if hasattr(e, 'response'):
-                    logger.error(f"  Response: {e.response}")
-                if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    logger.info(f"Retrying after {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {retries} attempts")
-                    return {"themes": []}
-                    
-            except Exception as e:
-                # Catch connection errors and other exceptions
-                error_type = type(e).__name__
-                error_msg = str(e)
-                
-                # Check if it's a known connection error type
-                is_connection_error = False
-                if RequestsConnectionError and isinstance(e, RequestsConnectionError):
-                    is_connection_error = True
-                elif HttpxConnectError and isinstance(e, HttpxConnectError):
-                    is_connection_error = True
-                elif 'connection' in error_msg.lower() or 'connect' in error_msg.lower():
-                    is_connection_error = True
-                
-                if is_connection_error:
-                    logger.error(f"CONNECTION ERROR on attempt {attempt + 1}/{retries}")
-                else:
-                    logger.error(f"UNEXPECTED ERROR on attempt {attempt + 1}/{retries}")
+        stats = self._new_request_stats()
+        try:
+            content = self._complete(
+                patient_review, retries, schema=build_themes_schema(self.themes), stats=stats
+            )
+            return self._themes_from_content(content, stats)
+        finally:
+            self._notify_request(stats)
+    
+    def _themes_from_content(self, content: Optional[str], stats: RequestStats) -> Dict[str, Any]:
+        """
+        Parse the completion of a single-review request into themes.
+        
+        Args:
+            content: Completion text, or None if all attempts failed
+            stats: RequestStats to fill in with the parse time
+            
+        Returns:
+            Dict containing extracted themes in format: {"themes": [{"theme": str, "description": str}]}
+        """
+        if content is None:
+            return {"themes": []}
+        
+        parse_start = time.perf_counter()
+        with tracer.span("parse_response", chars=len(content)):
+            result = self._parse_response(content, stats)
+        stats.parse_time = time.perf_counter() - parse_start
+        logger.debug(f"Successfully extracted {len(result.get('themes', []))} themes")
+        return result
+    
+    def extract_themes_packed(
+        self,
+        packed_prompt: str,
+        num_reviews: int,
+        retries: int = 3
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Extract themes for several numbered reviews sent in a single prompt.
+        
+        Args:
+            packed_prompt: Prompt from ThemeCategorizationPrompt.create_packed_prompt
+            num_reviews: Number of reviews packed into the prompt
+            retries: Number of retry attempts on failure
+            
+        Returns:
+            Dict mapping 1-based review id to {"themes": [...]}; reviews missing
+            from the response are absent from the dict
+        """
+        stats = self._new_request_stats()
+        try:
+            content = self._complete(
+                packed_prompt,
+                retries,
+                max_tokens=self.settings.max_tokens * num_reviews,
+                schema=build_packed_themes_schema(self.themes),
+                stats=stats,
+            )
+            if content is None:
+                return {}
+            
+            parse_start = time.perf_counter()
+            with tracer.span("parse_response", chars=len(content)):
+                results = self._parse_packed_response(content, num_reviews, stats)
+            stats.parse_time = time.perf_counter() - parse_start
+            logger.debug(f"Successfully extracted themes for {len(results)}/{num_reviews} packed reviews")
+            return results
+        finally:
+            self._notify_request(stats)
+    
+    def _complete(
+        self,
+        patient_review: str,
+        retries: int = 3,
+        max_tokens: Optional[int] = None,
+        schema: Optional[Dict[str, Any]] = None,
+        stats: Optional[RequestStats] = None
+    ) -> Optional[str]:
+        """
+        Send a prompt and return the raw completion text, retrying on errors.
+        
+        Args:
+            patient_review: The prompt to send
+            retries: Number of retry attempts on failure
+            max_tokens: Completion token budget (defaults to settings.max_tokens)
+            schema: JSON schema for guided decoding (used if enabled in settings)
+            stats: Optional RequestStats to fill in with timings and outcome
+            
+        Returns:
+            Completion text, or None if all attempts failed
+        """
+        stats = stats or self._new_request_stats()
+        return run_steps(
+            self._completion_steps(patient_review, retries, max_tokens, schema, stats),
+            lambda step: self._perform(step, stats),
+        )
+    
+    def _completion_steps(
+        self,
+        patient_review: str,
+        retries: int,
+        max_tokens: Optional[int],
+        schema: Optional[Dict[str, Any]],
+        stats: RequestStats
+    ) -> Steps[Optional[str]]:
+        """
+        Attempt loop shared by _complete and _acomplete.
+        
+        Picks the endpoint, builds the request, classifies errors and decides
+        whether to retry; it yields a _Send step for every request and a Sleep
+        step for every wait, which the caller performs (blocking or awaiting).
+        
+        Args:
+            patient_review: The prompt to send
+            retries: Number of retry attempts on failure
+            max_tokens: Completion token budget (defaults to settings.max_tokens)
+            schema: JSON schema for guided decoding (used if enabled in settings)
+            stats: RequestStats to fill in with timings and outcome
+            
+        Returns:
+            Completion text, or None if all attempts failed
+        """
+        request_start = time.perf_counter()
+        endpoint = None
+        
+        try:
+            for attempt in range(retries):
+                endpoint = self.endpoint_pool.acquire(avoid=endpoint)
+                while endpoint is None:
+                    wait_time = self._circuit_wait_time()
+                    if wait_time is None:
+                        return None
+                    yield Sleep(wait_time)
+                    endpoint = self.endpoint_pool.acquire()
                 
-                logger.error(f"  Error type: {error_type}")
-                logger.error(f"  Error message: {error_msg}")
-                logger.error(f"  Base URL: {self.settings.base_url}")
-                logger.error(f"  Model: {self.model_name}")
-                logger.error(f"  Full exception details:", exc_info=True)
+                stats.attempts = attempt + 1
+                stats.endpoint = endpoint.url
+                attempt_start = time.perf_counter()
+                error = None
+                sent = False
+                try:
+                    self._log_attempt(patient_review, attempt, retries, endpoint.url)
+                    request_kwargs = self._request_kwargs(patient_review, max_tokens, schema)
+                    try:
+                        content = yield _Send(endpoint, request_kwargs)
+                    except Exception as e:
+                        if not self._reject_guided(e, request_kwargs, endpoint.url):
+                            raise
+                        content = yield _Send(endpoint, self._request_kwargs(patient_review, max_tokens))
+                    sent = True
+                except Exception as e:
+                    error = e
+                finally:
+                    # Also runs when the request is cancelled (GeneratorExit from the driver),
+                    # so the endpoint's outstanding count is never leaked
+                    self.endpoint_pool.release(endpoint, time.perf_counter() - attempt_start, error=not sent)
+                    if not sent and error is None:
+                        # Cancelled: there is no outcome to record, but a half-open probe must be freed
+                        endpoint.circuit_breaker.release_probe()
                 
-                # Provide troubleshooting info for connection errors
-                if is_connection_error:
-                    logger.error(f"  TROUBLESHOOTING:")
-                    if self.settings.base_url.startswith("http://localhost"):
-                        logger.error(f"    - You're using vLLM (local server)")
-                        logger.error(f"    - Check if vLLM server is running on {self.settings.base_url}")
-                        logger.error(f"    - Start vLLM with: python -m vllm.entrypoints.openai.api_server --model {self.model_name} --port 8001")
-                    else:
-                        logger.error(f"    - You're using HuggingFace Inference Router")
-                        logger.error(f"    - Check if your API token is valid")
-                        logger.error(f"    - Check your network connection")
-                        logger.error(f"    - Verify the URL is accessible: {self.settings.base_url}")
+                if sent:
+                    endpoint.circuit_breaker.record_success()
+                    stats.success = True
+                    return content
                 
-                if attempt < retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    logger.info(f"Retrying after {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed after {retries} attempts")
-                    return {"themes": []}
+                self._record_failure(error, endpoint)
+                error_class = self.classify_error(error)
+                stats.errors[error_class] = stats.errors.get(error_class, 0) + 1
+                if not self._handle_error(error, attempt, retries, endpoint.url):
+                    return None
+                wait_time = self._retry_delay(attempt, error)
+                logger.info(f"Retrying after {wait_time:.1f} seconds...")
+                with tracer.span("retry_backoff", attempt=attempt + 1):
+                    yield Sleep(wait_time)
+            
+            return None
+        finally:
+            stats.latency = time.perf_counter() - request_start
+    
+    def _perform(self, step: Any, stats: RequestStats) -> Optional[str]:
+        """
+        Perform one step of _completion_steps by blocking.
         
-        return {"themes": []}
+        Args:
+            step: Sleep or _Send step
+            stats: RequestStats of the request
+            
+        Returns:
+            Completion text for a _Send step, None for a Sleep step
+        """
+        if isinstance(step, Sleep):
+            time.sleep(step.seconds)
+            return None
+        return self._send(step.endpoint, step.request_kwargs, stats)
+    
+    def _send(self, endpoint: Endpoint, request_kwargs: Dict[str, Any], stats: RequestStats) -> str:
+        """
+        Send one chat completion request, streamed if enabled in settings.
+        
+        Args:
+            endpoint: Endpoint to send the request to
+            request_kwargs: Keyword arguments for chat.completions.create
+            stats: RequestStats to fill in
+            
+        Returns:
+            Completion text
+        """
+        stats.guided = self._is_guided(request_kwargs)
+        with tracer.span("http_request", endpoint=endpoint.url, stream=self.settings.stream):
+            if self.settings.stream:
+                return self._stream_completion(endpoint.client, request_kwargs, stats)
+            response = endpoint.client.chat.completions.create(**request_kwargs)
+            self._record_usage(stats, response)
+            return self._response_content(response)
     
-    def _parse_response(self, content: str) -> Dict[str, Any]:
+    def _stream_completion(self, client: OpenAI, request_kwargs: Dict[str, Any], stats: RequestStats) -> str:
+        """
+        Stream a completion and stop reading once a complete JSON object has arrived.
+        
+        Args:
+            client: OpenAI client of the chosen endpoint
+            request_kwargs: Keyword arguments for chat.completions.create
+            stats: RequestStats to fill in with streaming timings
+            
+        Returns:
+            Completion text up to the end of the first top-level JSON object
+            (or the whole completion if no object closes)
+        
+        Once the object is complete the stream is still read for the finish
+        and usage chunks, but it is closed as soon as the model generates
+        anything but whitespace. The token counts of a stream closed that
+        way stay None: the usage chunk only arrives at the very end.
+        """
+        attempt_start = time.perf_counter()
+        first_token_at = None
+        scanner = JsonObjectScanner()
+        
+        # Counts of an earlier attempt must not outlive this one
+        stats.prompt_tokens = stats.completion_tokens = None
+        stream = client.chat.completions.create(**request_kwargs, stream=True, **STREAM_USAGE)
+        try:
+            for chunk in stream:
+                self._record_usage(stats, chunk)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if scanner.complete:
+                    if delta.strip():
+                        logger.debug("Content after the JSON object; closing stream early")
+                        break
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                scanner.feed(delta)
+        finally:
+            stream.close()
+        
+        self._record_stream_timings(stats, attempt_start, first_token_at)
+        return self._log_content(scanner.text)
+    
+    @staticmethod
+    def _record_usage(stats: RequestStats, response: Any):
+        """
+        Store the token counts reported in a response (or final stream chunk).
+        
+        Args:
+            stats: RequestStats to update
+            response: ChatCompletion or ChatCompletionChunk
+        """
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            stats.prompt_tokens = usage.prompt_tokens
+            stats.completion_tokens = usage.completion_tokens
+    
+    @staticmethod
+    def _record_stream_timings(stats: RequestStats, attempt_start: float, first_token_at: Optional[float]):
+        """
+        Store time-to-first-token and generation time of a streamed attempt.
+        
+        Args:
+            stats: RequestStats to update
+            attempt_start: perf_counter value when the request was sent
+            first_token_at: perf_counter value when the first content arrived (None if none did)
+        """
+        end = time.perf_counter()
+        stats.streamed = True
+        if first_token_at is None:
+            stats.time_to_first_token = None
+            stats.generation_time = None
+        else:
+            stats.time_to_first_token = first_token_at - attempt_start
+            stats.generation_time = end - first_token_at
+    
+    def _new_request_stats(self) -> RequestStats:
+        """Create an empty RequestStats for a request to this client's endpoint."""
+        return RequestStats(model=self.model_name, endpoint=self.settings.base_url)
+    
+    def _request_kwargs(
+        self,
+        patient_review: str,
+        max_tokens: Optional[int] = None,
+        schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the chat completion request parameters for a prompt.
+        
+        Args:
+            patient_review: The prompt-wrapped review to send
+            max_tokens: Completion token budget (defaults to settings.max_tokens)
+            schema: JSON schema to constrain the response to, if guided decoding is enabled
+            
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+        request_kwargs = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": patient_review}],
+            "temperature": self.settings.temperature,
+            "max_tokens": max_tokens or self.settings.max_tokens,
+        }
+        
+        if schema is not None and self.guided_decoding == "response_format":
+            request_kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "themes", "schema": schema, "strict": True},
+            }
+        elif schema is not None and self.guided_decoding == "guided_json":
+            request_kwargs["extra_body"] = {"guided_json": schema}
+        
+        return request_kwargs
+    
+    @staticmethod
+    def _is_guided(request_kwargs: Dict[str, Any]) -> bool:
+        """Check whether request parameters include a guided decoding schema."""
+        return "response_format" in request_kwargs or "guided_json" in request_kwargs.get("extra_body", {})
+    
+    def _reject_guided(self, e: Exception, request_kwargs: Dict[str, Any], base_url: str) -> bool:
+        """
+        Turn off guided decoding if the backend rejected a schema-constrained request.
+        
+        Args:
+            e: The exception raised by the request
+            request_kwargs: Parameters of the rejected request
+            base_url: Endpoint that rejected the request
+            
+        Returns:
+            True if guided decoding was turned off and the request should be resent without it
+        """
+        if not self._is_guided(request_kwargs) or get_status_code(e) not in (400, 422):
+            return False
+        
+        logger.warning(f"Backend rejected guided decoding ({self.guided_decoding}): {e}")
+        logger.warning(f"  Falling back to unconstrained JSON parsing for {base_url}")
+        self.guided_decoding = "off"
+        return True
+    
+    def _log_attempt(self, patient_review: str, attempt: int, retries: int, base_url: str):
+        """Log request details (full details only on the first attempt to reduce verbosity)."""
+        if attempt == 0:
+            logger.info(f"Extracting themes - Attempt {attempt + 1}/{retries}")
+            logger.debug(f"  Base URL: {base_url}")
+            logger.debug(f"  Model: {self.model_name}")
+            logger.debug(f"  Timeout: {self.settings.hf_timeout}s")
+            logger.debug(f"  API Key: {'***SET***' if self.settings.api_key != 'EMPTY' else 'EMPTY (vLLM mode)'}")
+            logger.debug(f"  Prompt length: {len(patient_review)} characters")
+        else:
+            logger.info(f"Retry attempt {attempt + 1}/{retries}")
+        
+        logger.debug(f"Sending request to {base_url}")
+        logger.debug(f"Request parameters: model={self.model_name}, temperature={self.settings.temperature}, max_tokens={self.settings.max_tokens}")
+    
+    def _response_content(self, response) -> str:
+        """
+        Extract the message content of a chat completion response.
+        
+        Args:
+            response: Chat completion response object
+            
+        Returns:
+            Raw completion text
+        """
+        logger.debug(f"Successfully received response from API")
+        return self._log_content(response.choices[0].message.content or "")
+    
+    @staticmethod
+    def _log_content(content: str) -> str:
+        """Log the start of a raw completion and return it unchanged."""
+        logger.debug(f"Raw LLM response (first 200 chars): {content[:200]}...")
+        return content
+    
+    def _retry_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Get the number of seconds to wait before the next attempt.
+        
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            error: Exception raised by the failed attempt (for Retry-After)
+            
+        Returns:
+            Delay in seconds
+        """
+        return self.retry_policy.compute_delay(attempt, error)
+    
+    def _circuit_wait_time(self) -> Optional[float]:
+        """
+        Decide what to do when the endpoint's circuit refuses a request.
+        
+        Returns:
+            Seconds to wait before checking the circuit again, or None to fail
+            the request immediately (circuit_breaker_mode "fail")
+        """
+        if self.settings.circuit_breaker_mode == "fail":
+            logger.error(f"Circuits for all endpoints are open; failing request fast")
+            return None
+        
+        # Half-open circuits admit one probe; other callers poll until it settles
+        wait_time = self.endpoint_pool.remaining_open_time() or 1.0
+        logger.info(f"Circuits for all endpoints are open; pausing {wait_time:.1f}s")
+        return wait_time
+    
+    def _record_failure(self, e: Exception, endpoint: Endpoint):
+        """
+        Count a failed request against the endpoint's circuit breaker.
+        
+        Only failures that indicate an unhealthy endpoint (timeouts, connection
+        errors and 5xx responses) are counted; rate limits and client errors
+        mean the endpoint is up, so they release the circuit as a success.
+        """
+        status_code = get_status_code(e)
+        if isinstance(e, APITimeoutError) or self._is_connection_error(e) or (
+            status_code is not None and status_code >= 500
+        ):
+            endpoint.circuit_breaker.record_failure()
+        else:
+            endpoint.circuit_breaker.record_success()
+    
+    def classify_error(self, e: Exception) -> str:
+        """
+        Classify a failed request the same way _handle_error reports it.
+        
+        Args:
+            e: The exception raised by the request
+            
+        Returns:
+            One of "timeout", "rate_limit", "api", "connection" or "unexpected"
+        """
+        if isinstance(e, APITimeoutError):
+            return "timeout"
+        if isinstance(e, RateLimitError):
+            return "rate_limit"
+        if isinstance(e, APIError):
+            return "api"
+        if self._is_connection_error(e):
+            return "connection"
+        return "unexpected"
+    
+    def _handle_error(self, e: Exception, attempt: int, retries: int, base_url: str) -> bool:
+        """
+        Log a failed request attempt with troubleshooting hints.
+        
+        Args:
+            e: The exception raised by the request
+            attempt: Zero-based index of the failed attempt
+            retries: Total number of attempts allowed
+            base_url: Endpoint the request was sent to
+            
+        Returns:
+            True if the request should be retried, False if attempts are exhausted
+        """
+        should_retry = attempt < retries - 1 and self.retry_policy.is_retryable(e)
+        
+        if isinstance(e, APITimeoutError):
+            logger.error(f"TIMEOUT ERROR on attempt {attempt + 1}/{retries}")
+            logger.error(f"  Error type: {type(e).__name__}")
+            logger.error(f"  Error message: {str(e)}")
+            logger.error(f"  Timeout setting: {self.settings.hf_timeout}s")
+            logger.error(f"  Base URL: {base_url}")
+            if hasattr(e, '__cause__') and e.__cause__:
+                logger.error(f"  Underlying error: {e.__cause__}")
+            
+            # Provide troubleshooting suggestions
+            logger.error(f"  TROUBLESHOOTING:")
+            if "handshake" in str(e.__cause__).lower() or "ssl" in str(e.__cause__).lower():
+                logger.error(f"    - SSL handshake timeout detected")
+                logger.error(f"    - This may indicate network connectivity issues")
+                logger.error(f"    - Try increasing HF_TIMEOUT in .env file (e.g., HF_TIMEOUT=120)")
+            else:
+                logger.error(f"    - Request is taking longer than {self.settings.hf_timeout}s")
+                logger.error(f"    - HuggingFace Router may be slow or overloaded")
+                logger.error(f"    - Try increasing HF_TIMEOUT in .env file (e.g., HF_TIMEOUT=120)")
+                logger.error(f"    - Check your network connection")
+            
+            if not should_retry:
+                logger.error(f"Failed after {attempt + 1} attempts due to timeout")
+                logger.error(f"  SUGGESTION: Increase HF_TIMEOUT in your .env file to 120 or higher")
+            return should_retry
+        
+        if isinstance(e, RateLimitError):
+            logger.error(f"RATE LIMIT ERROR on attempt {attempt + 1}/{retries}")
+            logger.error(f"  Error type: {type(e).__name__}")
+            logger.error(f"  Error message: {str(e)}")
+            if not should_retry:
+                logger.error(f"Failed after {attempt + 1} attempts due to rate limit")
+            return should_retry
+        
+        if isinstance(e, APIError):
+            logger.error(f"API ERROR on attempt {attempt + 1}/{retries}")
+            logger.error(f"  Error type: {type(e).__name__}")
+            logger.error(f"  Error message: {str(e)}")
+            logger.error(f"  Base URL: {base_url}")
+            logger.error(f"  Model: {self.model_name}")
+            if hasattr(e, 'status_code'):
+                logger.error(f"  HTTP Status: {e.status_code}")
+            if hasattr(e, 'response'):
+                logger.error(f"  Response: {e.response}")
+            if not should_retry:
+                logger.error(f"Failed after {attempt + 1} attempts")
+            return should_retry
+        
+        # Catch connection errors and other exceptions
+        error_type = type(e).__name__
+        error_msg = str(e)
+        
+        # Check if it's a known connection error type
+        is_connection_error = self._is_connection_error(e)
+        
+        if is_connection_error:
+            logger.error(f"CONNECTION ERROR on attempt {attempt + 1}/{retries}")
+        else:
+            logger.error(f"UNEXPECTED ERROR on attempt {attempt + 1}/{retries}")
+        
+        logger.error(f"  Error type: {error_type}")
+        logger.error(f"  Error message: {error_msg}")
+        logger.error(f"  Base URL: {base_url}")
+        logger.error(f"  Model: {self.model_name}")
+        logger.error(f"  Full exception details:", exc_info=e)
+        
+        # Provide troubleshooting info for connection errors
+        if is_connection_error:
+            logger.error(f"  TROUBLESHOOTING:")
+            if base_url.startswith("http://localhost"):
+                logger.error(f"    - You're using vLLM (local server)")
+                logger.error(f"    - Check if vLLM server is running on {base_url}")
+                logger.error(f"    - Start vLLM with: python -m vllm.entrypoints.openai.api_server --model {self.model_name} --port 8001")
+            else:
+                logger.error(f"    - You're using HuggingFace Inference Router")
+                logger.error(f"    - Check if your API token is valid")
+                logger.error(f"    - Check your network connection")
+                logger.error(f"    - Verify the URL is accessible: {base_url}")
+        
+        if not should_retry:
+            logger.error(f"Failed after {attempt + 1} attempts")
+        return should_retry
+    
+    @staticmethod
+    def _is_connection_error(e: Exception) -> bool:
+        """Check whether an exception looks like a connection failure."""
+        if RequestsConnectionError and isinstance(e, RequestsConnectionError):
+            return True
+        if HttpxConnectError and isinstance(e, HttpxConnectError):
+            return True
+        error_msg = str(e).lower()
+        return 'connection' in error_msg or 'connect' in error_msg
+    
+    def _parse_response(self, content: str, stats: Optional[RequestStats] = None) -> Dict[str, Any]:
         """
         Parse LLM response content into structured format.
         
         Args:
             content: Raw response content from LLM
+            stats: Optional RequestStats, marked parse_failed if no usable JSON is found
             
         Returns:
             Dict with parsed themes
         """
+        parsed = self._extract_json(content)
+        if parsed is None:
+            self._mark_parse_failed(stats)
+            return {"themes": []}
+        
+        # Validate structure
+        if "themes" not in parsed:
+            logger.warning("Response missing 'themes' key")
+            self._mark_parse_failed(stats)
+            return {"themes": []}
+        
+        return {"themes": self._validate_themes(parsed["themes"])}
+    
+    def _parse_packed_response(
+        self,
+        content: str,
+        num_reviews: int,
+        stats: Optional[RequestStats] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Parse a packed LLM response into per-review results.
+        
+        Args:
+            content: Raw response content in format {"results": [{"id": int, "themes": [...]}]}
+            num_reviews: Number of reviews packed into the prompt
+            stats: Optional RequestStats, marked parse_failed if no usable JSON is found
+            
+        Returns:
+            Dict mapping 1-based review id to {"themes": [...]}
+        """
+        parsed = self._extract_json(content)
+        if parsed is None:
+            self._mark_parse_failed(stats)
+            return {}
+        
+        if not isinstance(parsed.get("results"), list):
+            logger.warning("Packed response missing 'results' list")
+            self._mark_parse_failed(stats)
+            return {}
+        
+        results = {}
+        for item in parsed["results"]:
+            if not isinstance(item, dict) or not isinstance(item.get("themes"), list):
+                logger.warning(f"Invalid packed result format: {item}")
+                continue
+            try:
+                review_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid packed result id: {item.get('id')}")
+                continue
+            if not 1 <= review_id <= num_reviews:
+                logger.warning(f"Packed result id {review_id} out of range 1-{num_reviews}")
+                continue
+            results[review_id] = {"themes": self._validate_themes(item["themes"])}
+        
+        return results
+    
+    @staticmethod
+    def _mark_parse_failed(stats: Optional[RequestStats]):
+        if stats is not None:
+            stats.parse_failed = True
+    
+    def _extract_json(self, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Find and decode the outermost JSON object in a response.
+        
+        Args:
+            content: Raw response content from LLM
+            
+        Returns:
+            Decoded dict, or None if no valid JSON object was found
+        """
         # Try to extract JSON from response
         content = content.strip()
         
@@ -262,32 +862,206 @@ class HuggingFaceClient(LLMClient):
         
         if start_idx == -1 or end_idx == 0:
             logger.warning("No JSON object found in response")
-            return {"themes": []}
+            return None
         
         json_str = content[start_idx:end_idx]
         
         try:
             parsed = json.loads(json_str)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON: {e}")
+            logger.error(f"JSON string: {json_str[:500]}")
+            return None
+        
+        if not isinstance(parsed, dict):
+            logger.warning("Response JSON is not an object")
+            return None
+        return parsed
+    
+    @staticmethod
+    def _validate_themes(themes: Any) -> List[Dict[str, str]]:
+        """
+        Keep only well-formed theme entries.
+        
+        Args:
+            themes: Decoded "themes" value from a response
             
-            # Validate structure
-            if "themes" not in parsed:
-                logger.warning("Response missing 'themes' key")
-                return {"themes": []}
+        Returns:
+            List of {"theme": str, "description": str} dicts
+        """
+        validated_themes = []
+        if not isinstance(themes, list):
+            logger.warning(f"Invalid themes format: {themes}")
+            return validated_themes
+        
+        for theme in themes:
+            if isinstance(theme, dict) and "theme" in theme:
+                validated_themes.append({
+                    "theme": theme.get("theme", "unknown"),
+                    "description": theme.get("description", "")
+                })
+            else:
+                logger.warning(f"Invalid theme format: {theme}")
+        
+        return validated_themes
+
+
+class AsyncHuggingFaceClient(HuggingFaceClient):
+    """
+    HuggingFace client with an additional AsyncOpenAI transport.
+    
+    Allows many requests to be in flight at once from a single event loop,
+    which keeps a vLLM server serving concurrent sequences busy. The synchronous
+    extract_themes method remains available.
+    """
+    
+    def __init__(self, settings: Settings, themes: Optional[List[str]] = None):
+        """
+        Initialize the async HuggingFace client.
+        
+        Args:
+            settings: Configuration settings instance
+            themes: Allowed themes for guided decoding. If None, uses default KEY_THEMES.
+        """
+        super().__init__(settings, themes)
+        
+        try:
+            for endpoint in self.endpoint_pool.endpoints:
+                endpoint.async_client = AsyncOpenAI(
+                    base_url=endpoint.url,
+                    api_key=settings.api_key,
+                    timeout=settings.hf_timeout,
+                    max_retries=0,  # Retries are handled by RetryPolicy
+                )
+            self.async_client = self.endpoint_pool.endpoints[0].async_client
+            logger.info(f"Successfully initialized async LLM client")
+        except Exception as e:
+            logger.error(f"Failed to initialize AsyncOpenAI client: {e}", exc_info=True)
+            raise
+    
+    async def aextract_themes(self, patient_review: str, retries: int = 3) -> Dict[str, Any]:
+        """
+        Extract themes from a patient review without blocking the event loop.
+        
+        Args:
+            patient_review: The patient review text to analyze
+            retries: Number of retry attempts on failure
             
-            # Validate theme format
-            validated_themes = []
-            for theme in parsed["themes"]:
-                if isinstance(theme, dict) and "theme" in theme:
-                    validated_themes.append({
-                        "theme": theme.get("theme", "unknown"),
-                        "description": theme.get("description", "")
-                    })
-                else:
-                    logger.warning(f"Invalid theme format: {theme}")
+        Returns:
+            Dict containing extracted themes in format: {"themes": [{"theme": str, "description": str}]}
+        """
+        stats = self._new_request_stats()
+        try:
+            content = await self._acomplete(
+                patient_review, retries, schema=build_themes_schema(self.themes), stats=stats
+            )
+            return self._themes_from_content(content, stats)
+        finally:
+            self._notify_request(stats)
+    
+    async def _acomplete(
+        self,
+        patient_review: str,
+        retries: int = 3,
+        max_tokens: Optional[int] = None,
+        schema: Optional[Dict[str, Any]] = None,
+        stats: Optional[RequestStats] = None
+    ) -> Optional[str]:
+        """
+        Async counterpart of _complete.
+        
+        Args:
+            patient_review: The prompt to send
+            retries: Number of retry attempts on failure
+            max_tokens: Completion token budget (defaults to settings.max_tokens)
+            schema: JSON schema for guided decoding (used if enabled in settings)
+            stats: Optional RequestStats to fill in with timings and outcome
             
-            return {"themes": validated_themes}
+        Returns:
+            Completion text, or None if all attempts failed
+        """
+        stats = stats or self._new_request_stats()
+        return await arun_steps(
+            self._completion_steps(patient_review, retries, max_tokens, schema, stats),
+            lambda step: self._aperform(step, stats),
+        )
+    
+    async def _aperform(self, step: Any, stats: RequestStats) -> Optional[str]:
+        """
+        Perform one step of _completion_steps without blocking the event loop.
+        
+        Args:
+            step: Sleep or _Send step
+            stats: RequestStats of the request
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON: {e}")
-            logger.error(f"JSON string: {json_str[:500]}")
-            return {"themes": []}
+        Returns:
+            Completion text for a _Send step, None for a Sleep step
+        """
+        if isinstance(step, Sleep):
+            await asyncio.sleep(step.seconds)
+            return None
+        return await self._asend(step.endpoint, step.request_kwargs, stats)
+    
+    async def _asend(self, endpoint: Endpoint, request_kwargs: Dict[str, Any], stats: RequestStats) -> str:
+        """
+        Async counterpart of _send.
+        
+        Args:
+            endpoint: Endpoint to send the request to
+            request_kwargs: Keyword arguments for chat.completions.create
+            stats: RequestStats to fill in
+            
+        Returns:
+            Completion text
+        """
+        stats.guided = self._is_guided(request_kwargs)
+        with tracer.span("http_request", endpoint=endpoint.url, stream=self.settings.stream):
+            if self.settings.stream:
+                return await self._astream_completion(endpoint.async_client, request_kwargs, stats)
+            response = await endpoint.async_client.chat.completions.create(**request_kwargs)
+            self._record_usage(stats, response)
+            return self._response_content(response)
+    
+    async def _astream_completion(
+        self,
+        client: AsyncOpenAI,
+        request_kwargs: Dict[str, Any],
+        stats: RequestStats
+    ) -> str:
+        """
+        Async counterpart of _stream_completion.
+        
+        Args:
+            client: AsyncOpenAI client of the chosen endpoint
+            request_kwargs: Keyword arguments for chat.completions.create
+            stats: RequestStats to fill in with streaming timings
+            
+        Returns:
+            Completion text up to the end of the first top-level JSON object
+        """
+        attempt_start = time.perf_counter()
+        first_token_at = None
+        scanner = JsonObjectScanner()
+        
+        # Counts of an earlier attempt must not outlive this one
+        stats.prompt_tokens = stats.completion_tokens = None
+        stream = await client.chat.completions.create(**request_kwargs, stream=True, **STREAM_USAGE)
+        try:
+            async for chunk in stream:
+                self._record_usage(stats, chunk)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if scanner.complete:
+                    if delta.strip():
+                        logger.debug("Content after the JSON object; closing stream early")
+                        break
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                scanner.feed(delta)
+        finally:
+            await stream.close()
+        
+        self._record_stream_timings(stats, attempt_start, first_token_at)
+        return self._log_content(scanner.text)
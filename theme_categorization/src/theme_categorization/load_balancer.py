@@ -0,0 +1,165 @@
+"""
+Least-outstanding-requests load balancing across OpenAI-compatible endpoints.
+
+Each endpoint has its own circuit breaker, which doubles as health
+tracking: an endpoint is ejected from rotation when its circuit opens and
+re-admitted after a successful half-open probe.
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .retry import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the exponentially weighted latency average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class Endpoint:
+    """One backend replica with its API clients, circuit breaker and request stats."""
+
+    def __init__(self, url: str, client: Any, circuit_breaker: CircuitBreaker):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Base URL of the replica
+            client: OpenAI client bound to the URL
+            circuit_breaker: Circuit breaker tracking the replica's health
+        """
+        self.url = url
+        self.client = client
+        self.async_client = None  # Set by AsyncHuggingFaceClient
+        self.circuit_breaker = circuit_breaker
+
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.ewma_latency: Optional[float] = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request statistics for the endpoint.
+
+        Returns:
+            Dict with state, outstanding, requests, errors, error_rate and latencies
+        """
+        successes = self.requests - self.errors
+        return {
+            "state": self.circuit_breaker.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests > 0 else 0.0,
+            "avg_latency": self.total_latency / successes if successes > 0 else 0.0,
+            "ewma_latency": self.ewma_latency or 0.0,
+        }
+
+
+class EndpointPool:
+    """Spreads requests over endpoints, preferring the healthy one with fewest requests in flight."""
+
+    def __init__(self, endpoints: List[Endpoint]):
+        """
+        Initialize the endpoint pool.
+
+        Args:
+            endpoints: Endpoints to balance across (at least one)
+        """
+        if not endpoints:
+            raise ValueError("EndpointPool requires at least one endpoint")
+
+        self.endpoints = endpoints
+        self._next_index = 0
+        self._lock = threading.Lock()
+
+        if len(endpoints) > 1:
+            logger.info(f"Load balancing across {len(endpoints)} endpoints: "
+                       f"{', '.join(endpoint.url for endpoint in endpoints)}")
+
+    def acquire(self, avoid: Optional[Endpoint] = None) -> Optional[Endpoint]:
+        """
+        Pick an endpoint for the next request and count it as in flight.
+
+        An ejected endpoint whose circuit has become half-open receives a
+        single probe request so it can be re-admitted; otherwise the healthy
+        (closed circuit) endpoint with the fewest requests in flight is used.
+
+        Args:
+            avoid: Endpoint to skip if another one is available (e.g. the one
+                that just failed, when retrying)
+
+        Returns:
+            The chosen endpoint, or None if every circuit is open
+        """
+        with self._lock:
+            # Rotate the starting point so ties are broken round-robin
+            start = self._next_index
+            self._next_index = (start + 1) % len(self.endpoints)
+            ordered = self.endpoints[start:] + self.endpoints[:start]
+
+            healthy = [e for e in ordered if e.circuit_breaker.state == CircuitBreaker.CLOSED]
+            if avoid is not None and len(healthy) > 1:
+                healthy = [e for e in healthy if e is not avoid]
+
+            endpoint = next(
+                (e for e in ordered
+                 if e is not avoid
+                 and e.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+                 and e.circuit_breaker.allow_request()),
+                None
+            )
+            if endpoint is not None:
+                logger.info(f"Probing ejected endpoint {endpoint.url}")
+            elif healthy:
+                endpoint = min(healthy, key=lambda e: e.outstanding)
+            elif avoid is not None and avoid.circuit_breaker.allow_request():
+                endpoint = avoid
+            else:
+                return None
+
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, error: bool = False):
+        """
+        Record the outcome of a request sent to an endpoint.
+
+        Args:
+            endpoint: Endpoint returned by acquire
+            latency: Request wall time in seconds
+            error: Whether the request failed
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            if error:
+                endpoint.errors += 1
+                return
+            endpoint.total_latency += latency
+            if endpoint.ewma_latency is None:
+                endpoint.ewma_latency = latency
+            else:
+                endpoint.ewma_latency += LATENCY_EWMA_ALPHA * (latency - endpoint.ewma_latency)
+
+    def remaining_open_time(self) -> float:
+        """
+        Get the seconds until any ejected endpoint can be probed.
+
+        Returns:
+            Shortest remaining open time across endpoints
+        """
+        return min(endpoint.circuit_breaker.remaining_open_time() for endpoint in self.endpoints)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get request statistics for every endpoint.
+
+        Returns:
+            Dict mapping endpoint URL to its stats
+        """
+        with self._lock:
+            return {endpoint.url: endpoint.get_stats() for endpoint in self.endpoints}
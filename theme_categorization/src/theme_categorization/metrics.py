@@ -0,0 +1,222 @@
+"""
+Mergeable streaming histograms for per-request pipeline metrics.
+
+Histogram is a log-bucketed quantile sketch in the style of DDSketch:
+values fall into buckets whose bounds grow geometrically, so any quantile
+is answered with a bounded relative error while memory stays proportional
+to the value range (a few hundred buckets for microseconds to hours).
+Sketches with the same accuracy merge by adding bucket counts, which lets
+threads, async workers or shard processes record independently and
+combine their results.
+"""
+import math
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# Values at or below this are counted in the zero bucket (e.g. zero retries)
+MIN_TRACKED_VALUE = 1e-9
+
+# Quantiles reported by Histogram.summary()
+SUMMARY_QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+# Histograms recorded for every LLM request by the pipeline
+REQUEST_HISTOGRAMS = ("latency", "retries", "prompt_tokens", "completion_tokens", "parse_time")
+
+
+class Histogram:
+    """Thread-safe log-bucketed quantile sketch with bounded relative error."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+                (0.01 means within 1% of the true value)
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Locks cannot be pickled; histograms are sent between shard processes
+        with self._lock:
+            state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, value: float, count: int = 1):
+        """
+        Record a value.
+
+        Args:
+            value: Non-negative observation (negative values are clamped to 0)
+            count: Number of times to record it
+        """
+        value = max(float(value), 0.0)
+        with self._lock:
+            if value <= MIN_TRACKED_VALUE:
+                self._zero_count += count
+            else:
+                index = math.ceil(math.log(value) / self._log_gamma)
+                self._buckets[index] = self._buckets.get(index, 0) + count
+            self.count += count
+            self.sum += value * count
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        """
+        Add another histogram's observations to this one.
+
+        Args:
+            other: Histogram created with the same relative_accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different relative accuracy")
+
+        with other._lock:
+            buckets = dict(other._buckets)
+            zero_count, count, total = other._zero_count, other.count, other.sum
+            other_min, other_max = other.min, other.max
+
+        with self._lock:
+            for index, bucket_count in buckets.items():
+                self._buckets[index] = self._buckets.get(index, 0) + bucket_count
+            self._zero_count += zero_count
+            self.count += count
+            self.sum += total
+            self.min = min(self.min, other_min)
+            self.max = max(self.max, other_max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        Args:
+            q: Quantile between 0 and 1 (e.g. 0.99)
+
+        Returns:
+            Estimated value, or None if the histogram is empty
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+
+        with self._lock:
+            if self.count == 0:
+                return None
+
+            rank = q * (self.count - 1)
+            seen = self._zero_count
+            if rank < seen:
+                return 0.0
+
+            for index in sorted(self._buckets):
+                seen += self._buckets[index]
+                if rank < seen:
+                    # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                    value = 2 * self._gamma ** index / (self._gamma + 1)
+                    return min(max(value, self.min), self.max)
+            return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get count, mean, extremes and the standard percentiles.
+
+        Returns:
+            Dict with count, sum, mean, min, max, p50, p95 and p99
+        """
+        with self._lock:
+            count, total = self.count, self.sum
+            low, high = self.min, self.max
+
+        summary = {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count > 0 else 0.0,
+            "min": low if count > 0 else 0.0,
+            "max": high if count > 0 else 0.0,
+        }
+        for name, q in SUMMARY_QUANTILES.items():
+            summary[name] = self.quantile(q) or 0.0
+        return summary
+
+    def buckets(self) -> Dict[float, int]:
+        """
+        Get cumulative counts at bucket upper bounds, e.g. for exposition formats.
+
+        Returns:
+            Dict mapping upper bound to the number of values at or below it
+        """
+        with self._lock:
+            cumulative = {0.0: self._zero_count} if self._zero_count else {}
+            running = self._zero_count
+            for index in sorted(self._buckets):
+                running += self._buckets[index]
+                cumulative[self._gamma ** index] = running
+            return cumulative
+
+
+class HistogramSet:
+    """Named histograms that are recorded and merged together."""
+
+    def __init__(self, names: Iterable[str] = REQUEST_HISTOGRAMS, relative_accuracy: float = 0.01):
+        """
+        Initialize one empty histogram per name.
+
+        Args:
+            names: Histogram names
+            relative_accuracy: Relative accuracy of every histogram
+        """
+        self.relative_accuracy = relative_accuracy
+        self.histograms = {name: Histogram(relative_accuracy) for name in names}
+
+    def record(self, **values: Optional[float]):
+        """
+        Record one observation per named histogram; None values are skipped.
+
+        Args:
+            **values: Observations keyed by histogram name
+        """
+        for name, value in values.items():
+            if value is not None:
+                self.histograms[name].add(value)
+
+    def merge(self, other: "HistogramSet"):
+        """
+        Add another set's observations to this one.
+
+        Args:
+            other: HistogramSet, e.g. from another worker or shard
+        """
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(self.relative_accuracy)
+            self.histograms[name].merge(histogram)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the summary of every histogram.
+
+        Returns:
+            Dict mapping histogram name to Histogram.summary()
+        """
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def __getitem__(self, name: str) -> Histogram:
+        return self.histograms[name]
@@ -1,13 +1,47 @@
+import asyncio
+import contextlib
+import contextvars
+import copy
 import logging
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from tqdm import tqdm
 
-from .llm_clients import LLMClient
+from .cache import ResponseCache
+from .dedup import ReviewDeduplicator
+from .llm_clients import LLMClient, RequestStats
+from .metrics import HistogramSet
 from .prompt_engineer import ThemeCategorizationPrompt
+from .rate_limiter import RateLimiter
 from .settings import Settings
+from .steps import Steps, arun_steps, run_steps
+from .tracing import enable_tracing, get_tracer
 
 logger = logging.getLogger(__name__)
+tracer = get_tracer()
+
+# Error classes counted per failed request attempt (see HuggingFaceClient.classify_error)
+ERROR_CLASSES = ("timeout", "rate_limit", "api", "connection", "unexpected")
+
+# Called as on_result(index, result, latency_seconds) when a review finishes
+ResultCallback = Callable[[int, Dict[str, Any], float], None]
+
+
+@dataclass
+class _RateLimitWait:
+    """Step of ThemeCategorizationPipeline._review_steps: wait for the rate limiter."""
+    
+    tokens: int
+
+
+@dataclass
+class _Extract:
+    """Step of ThemeCategorizationPipeline._review_steps: extract themes for a prompt."""
+    
+    prompt: str
 
 
 class ThemeCategorizationPipeline:
@@ -21,7 +55,9 @@ class ThemeCategorizationPipeline:
         self, 
         llm_client: LLMClient, 
         prompt_engineer: ThemeCategorizationPrompt,
-        settings: Optional[Settings] = None
+        settings: Optional[Settings] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None
     ):
         """
         Initialize the pipeline.
@@ -30,21 +66,59 @@ class ThemeCategorizationPipeline:
             llm_client: LLM client instance
             prompt_engineer: Prompt engineer instance
             settings: Optional settings instance (for rate limiting)
+            rate_limiter: Optional rate limiter, e.g. one shared between pipelines
+                (defaults to one built from settings)
+            cache: Optional response cache (defaults to one built from settings,
+                or no caching if settings.cache_path is unset)
         """
         self.llm_client = llm_client
         self.prompt_engineer = prompt_engineer
         self.settings = settings or Settings()
+        self.rate_limiter = rate_limiter or RateLimiter.from_settings(self.settings)
+        self.cache = cache if cache is not None else ResponseCache.from_settings(self.settings)
         
-        self.metrics = {
+        # Guards self.metrics when reviews are processed from worker threads
+        self._metrics_lock = threading.Lock()
+        self.metrics = self._empty_metrics()
+        # Per-request distributions (latency, retries, tokens, parse time)
+        self.histograms = HistogramSet()
+        # perf_counter span from the first request's start to the last request's end
+        self._request_window: Optional[List[float]] = None
+        # Point-in-time values; unlike counters these are not cleared by reset_metrics
+        self.gauges = {"in_flight_requests": 0, "queue_depth": 0}
+        
+        if self.settings.trace_enabled:
+            enable_tracing()
+        
+        if hasattr(llm_client, "add_request_listener"):
+            llm_client.add_request_listener(self._record_request)
+        
+        logger.info("Initialized ThemeCategorizationPipeline")
+    
+    @staticmethod
+    def _empty_metrics() -> Dict[str, int]:
+        """Get a fresh set of zeroed metric counters."""
+        return {
             "total_reviews": 0,
             "successful_extractions": 0,
             "failed_extractions": 0,
             "total_themes_extracted": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "packed_requests": 0,
+            "requeued_reviews": 0,
+            "duplicate_reviews": 0,
+            "llm_requests": 0,
+            "request_retries": 0,
+            "guided_requests": 0,
+            "parse_failures": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "usage_unavailable": 0,
+            **{f"{error_class}_errors": 0 for error_class in ERROR_CLASSES},
         }
-        
-        logger.info("Initialized ThemeCategorizationPipeline")
     
-    def process_review(self, review: str) -> Dict[str, Any]:
+    def process_review(self, review: str, rate_limit: bool = False) -> Dict[str, Any]:
         """
         Process a single review through the pipeline.
         
@@ -54,36 +128,324 @@ class ThemeCategorizationPipeline:
         
         Args:
             review: The review text to process
+            rate_limit: Whether to wait for the rate limiter before sending the request
             
         Returns:
             Dict containing the extracted themes in format: {"themes": [{"theme": str, "description": str}]}
         """
-        self.metrics["total_reviews"] += 1
+        return self._process_review(review, rate_limit)
+    
+    def _process_review(self, review: str, rate_limit: bool, check_cache: bool = True) -> Dict[str, Any]:
+        """
+        Process a single review, optionally skipping the cache lookup.
         
-        try:
-            prompt = self.prompt_engineer.create_prompt(review)
-            logger.debug(f"Created prompt for review (length: {len(review)} chars)")
+        Args:
+            review: The review text to process
+            rate_limit: Whether to wait for the rate limiter before sending the request
+            check_cache: Whether to look the review up in the cache first
+                (False when the caller already counted a miss for it)
             
-            result = self.llm_client.extract_themes(prompt)
-
-            if result.get("themes"):
-                self.metrics["successful_extractions"] += 1
-                self.metrics["total_themes_extracted"] += len(result["themes"])
-            else:
-                self.metrics["failed_extractions"] += 1
+        Returns:
+            Dict containing the extracted themes
+        """
+        return run_steps(self._review_steps(review, rate_limit, check_cache), self._perform)
+    
+    def _review_steps(self, review: str, rate_limit: bool, check_cache: bool = True) -> Steps[Dict[str, Any]]:
+        """
+        Single-review logic shared by _process_review and aprocess_review.
+        
+        Builds the prompt, checks the cache and records the result; it yields a
+        _RateLimitWait step before the request and an _Extract step for the
+        request itself, which the caller performs (blocking or awaiting).
+        
+        Args:
+            review: The review text to process
+            rate_limit: Whether to wait for the rate limiter before sending the request
+            check_cache: Whether to look the review up in the cache first
             
-            return result
+        Returns:
+            Dict containing the extracted themes
+        """
+        self._increment_metrics(total_reviews=1)
+        
+        try:
+            with tracer.span("process_review", chars=len(review)):
+                with tracer.span("create_prompt"):
+                    prompt = self.prompt_engineer.create_prompt(review)
+                logger.debug(f"Created prompt for review (length: {len(review)} chars)")
+                
+                cache_key = self._cache_key(prompt)
+                result = self._cache_lookup(cache_key) if check_cache else None
+                if result is None:
+                    if rate_limit and self.rate_limiter.enabled:
+                        with tracer.span("rate_limit_wait"):
+                            yield _RateLimitWait(self._estimate_tokens(prompt))
+                    
+                    with self._gauge("in_flight_requests"), tracer.span("extract_themes"):
+                        result = yield _Extract(prompt)
+                    self._cache_store(cache_key, result)
+                
+                self._record_result(result)
+                return result
             
         except Exception as e:
             logger.error(f"Error processing review: {e}", exc_info=True)
-            self.metrics["failed_extractions"] += 1
+            self._increment_metrics(failed_extractions=1)
             return {"themes": []}
     
+    def _perform(self, step: Any) -> Any:
+        """
+        Perform one step of _review_steps by blocking.
+        
+        Args:
+            step: _RateLimitWait or _Extract step
+            
+        Returns:
+            Extraction result for an _Extract step, None otherwise
+        """
+        if isinstance(step, _RateLimitWait):
+            self.rate_limiter.acquire(step.tokens)
+            return None
+        return self.llm_client.extract_themes(step.prompt)
+    
+    async def _aperform(self, step: Any) -> Any:
+        """
+        Perform one step of _review_steps without blocking the event loop.
+        
+        Args:
+            step: _RateLimitWait or _Extract step
+            
+        Returns:
+            Extraction result for an _Extract step, None otherwise
+        """
+        if isinstance(step, _RateLimitWait):
+            await self.rate_limiter.acquire_async(step.tokens)
+            return None
+        return await self.llm_client.aextract_themes(step.prompt)
+    
+    async def aprocess_review(self, review: str, rate_limit: bool = False) -> Dict[str, Any]:
+        """
+        Process a single review through the pipeline using the async LLM client.
+        
+        Args:
+            review: The review text to process
+            rate_limit: Whether to wait for the rate limiter before sending the request
+            
+        Returns:
+            Dict containing the extracted themes in format: {"themes": [{"theme": str, "description": str}]}
+            
+        Raises:
+            TypeError: If the LLM client does not support async extraction
+        """
+        if not hasattr(self.llm_client, "aextract_themes"):
+            raise TypeError(
+                f"{type(self.llm_client).__name__} does not support async extraction; "
+                f"use AsyncHuggingFaceClient"
+            )
+        
+        return await arun_steps(self._review_steps(review, rate_limit), self._aperform)
+    
+    def _cache_key(self, prompt: str) -> Optional[str]:
+        """
+        Build the response cache key for a prompt.
+        
+        Args:
+            prompt: The prompt-wrapped review
+            
+        Returns:
+            Cache key, or None if caching is disabled
+        """
+        if self.cache is None:
+            return None
+        client_settings = getattr(self.llm_client, "settings", self.settings)
+        return ResponseCache.make_key(
+            getattr(self.llm_client, "model_name", client_settings.hf_model_name),
+            prompt,
+            client_settings.temperature,
+            client_settings.max_tokens,
+        )
+    
+    def _cache_lookup(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result and count the hit or miss.
+        
+        Args:
+            cache_key: Key from _cache_key (None if caching is disabled)
+            
+        Returns:
+            Cached result dict, or None
+        """
+        if cache_key is None:
+            return None
+        with tracer.span("cache_lookup"):
+            result = self.cache.get(cache_key)
+        if result is None:
+            self._increment_metrics(cache_misses=1)
+        else:
+            self._increment_metrics(cache_hits=1)
+            logger.debug("Using cached themes for review")
+        return result
+    
+    def _cache_store(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """
+        Cache a result; failed extractions are not cached so they are retried next run.
+        
+        Args:
+            cache_key: Key from _cache_key (None if caching is disabled)
+            result: Dict returned by the LLM client
+        """
+        if cache_key is not None and result.get("themes"):
+            self.cache.put(cache_key, result)
+    
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Estimate the tokens a request for this prompt will consume."""
+        return RateLimiter.estimate_tokens(prompt, self.settings.max_tokens)
+    
+    def process_packed(self, reviews: List[str], rate_limit: bool = False) -> List[Dict[str, Any]]:
+        """
+        Process several reviews with a single packed LLM call.
+        
+        Cached reviews are served from the cache and the rest are sent together
+        in one numbered prompt. Reviews missing from the packed response are
+        re-queued and processed individually.
+        
+        The cache is keyed by the single-review prompt, so packed results are
+        not stored in it: they were answered from a different prompt. Only
+        re-queued reviews, which are sent on their own, are cached.
+        
+        Args:
+            reviews: The review texts to process
+            rate_limit: Whether to wait for the rate limiter before sending requests
+            
+        Returns:
+            List of dicts containing extracted themes, in the same order as reviews
+        """
+        if not hasattr(self.llm_client, "extract_themes_packed"):
+            return [self.process_review(review, rate_limit=rate_limit) for review in reviews]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(reviews)
+        pending = []
+        packed_sent = False
+        
+        try:
+            for i, review in enumerate(reviews):
+                # Building the single-review prompt is only needed for its cache key
+                cached = None
+                if self.cache is not None:
+                    cached = self._cache_lookup(self._cache_key(self.prompt_engineer.create_prompt(review)))
+                if cached is None:
+                    pending.append(i)
+                else:
+                    self._increment_metrics(total_reviews=1)
+                    self._record_result(cached)
+                    results[i] = cached
+            
+            if len(pending) > 1:
+                with tracer.span("create_prompt", reviews=len(pending)):
+                    prompt = self.prompt_engineer.create_packed_prompt([reviews[i] for i in pending])
+                logger.debug(f"Created packed prompt for {len(pending)} reviews (length: {len(prompt)} chars)")
+                
+                if rate_limit and self.rate_limiter.enabled:
+                    with tracer.span("rate_limit_wait"):
+                        self.rate_limiter.acquire(
+                            RateLimiter.estimate_tokens(prompt, self.settings.max_tokens * len(pending))
+                        )
+                
+                packed_sent = True
+                with self._gauge("in_flight_requests"), tracer.span("extract_themes_packed"):
+                    packed_results = self.llm_client.extract_themes_packed(prompt, len(pending))
+                self._increment_metrics(packed_requests=1)
+                
+                for review_id, i in enumerate(pending, start=1):
+                    result = packed_results.get(review_id)
+                    if result is None:
+                        continue
+                    self._increment_metrics(total_reviews=1)
+                    self._record_result(result)
+                    results[i] = result
+        
+        except Exception as e:
+            logger.error(f"Error processing packed reviews: {e}", exc_info=True)
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing and packed_sent:
+            logger.info(f"Re-queueing {len(missing)}/{len(reviews)} packed reviews individually")
+            self._increment_metrics(requeued_reviews=len(missing))
+        for i in missing:
+            # Cache misses for these reviews were already counted above
+            results[i] = self._process_review(reviews[i], rate_limit, check_cache=False)
+        
+        return results
+    
+    def _record_result(self, result: Dict[str, Any]):
+        """
+        Update metrics for a completed extraction.
+        
+        Args:
+            result: Dict returned by the LLM client
+        """
+        if result.get("themes"):
+            self._increment_metrics(
+                successful_extractions=1,
+                total_themes_extracted=len(result["themes"]),
+            )
+        else:
+            self._increment_metrics(failed_extractions=1)
+    
+    def _record_request(self, stats: RequestStats):
+        """
+        Update request-level metrics; registered as a listener on the LLM client.
+        
+        Args:
+            stats: Stats of a completed LLM request
+        """
+        retries = max(stats.attempts - 1, 0)
+        self._increment_metrics(
+            llm_requests=1,
+            request_retries=retries,
+            guided_requests=int(stats.guided),
+            parse_failures=int(stats.parse_failed),
+            prompt_tokens=stats.prompt_tokens or 0,
+            completion_tokens=stats.completion_tokens or 0,
+            usage_unavailable=int(stats.success and stats.completion_tokens is None),
+            **{f"{error_class}_errors": count for error_class, count in stats.errors.items()},
+        )
+        self.histograms.record(
+            latency=stats.latency,
+            retries=retries,
+            prompt_tokens=stats.prompt_tokens,
+            completion_tokens=stats.completion_tokens,
+            parse_time=stats.parse_time,
+        )
+        
+        end = time.perf_counter()
+        with self._metrics_lock:
+            if self._request_window is None:
+                self._request_window = [end - stats.latency, end]
+            else:
+                self._request_window[0] = min(self._request_window[0], end - stats.latency)
+                self._request_window[1] = end
+    
+    def _increment_metrics(self, **counts: int):
+        """
+        Atomically add to one or more metric counters.
+        
+        Args:
+            **counts: Metric names mapped to the amount to add
+        """
+        with self._metrics_lock:
+            for name, value in counts.items():
+                self.metrics[name] += value
+    
     def process_batch(
         self, 
         reviews: List[str], 
         show_progress: bool = True,
-        rate_limit: bool = True
+        rate_limit: bool = True,
+        max_workers: Optional[int] = None,
+        pack_size: Optional[int] = None,
+        deduplicate: Optional[bool] = None,
+        on_result: Optional[ResultCallback] = None
     ) -> List[Dict[str, Any]]:
         """
         Process a batch of reviews.
@@ -91,59 +453,468 @@ class ThemeCategorizationPipeline:
         Args:
             reviews: List of review texts to process
             show_progress: Whether to show progress bar
-            rate_limit: Whether to apply rate limiting between requests
+            rate_limit: Whether to pace requests with the shared rate limiter
+            max_workers: Number of worker threads sharing the LLM client
+                (defaults to settings.max_workers; 1 processes reviews sequentially)
+            pack_size: Number of reviews classified per LLM call
+                (defaults to settings.pack_size; 1 sends one review per call)
+            deduplicate: Whether to send each distinct normalized review text only once
+                (defaults to settings.deduplicate)
+            on_result: Optional callback invoked as on_result(index, result, latency)
+                from the calling thread as soon as each review finishes, e.g. to
+                persist results incrementally
             
         Returns:
-            List of dicts containing extracted themes
+            List of dicts containing extracted themes, in the same order as reviews
+        """
+        if self.settings.deduplicate if deduplicate is None else deduplicate:
+            deduplicator = ReviewDeduplicator()
+            unique_reviews, index_map = deduplicator.deduplicate(reviews)
+            self._increment_metrics(duplicate_reviews=len(reviews) - len(unique_reviews))
+            unique_results = self.process_batch(
+                unique_reviews, show_progress, rate_limit, max_workers, pack_size, deduplicate=False,
+                on_result=self._expand_callback(on_result, index_map)
+            )
+            return deduplicator.expand(unique_results, index_map)
+        
+        max_workers = max_workers or self.settings.max_workers
+        pack_size = pack_size or self.settings.pack_size
+        with tracer.span("process_batch", reviews=len(reviews)), \
+                self._queued(len(reviews), on_result) as on_result:
+            if pack_size > 1:
+                return self._process_batch_packed(
+                    reviews, show_progress, rate_limit, max_workers, pack_size, on_result
+                )
+            if max_workers > 1:
+                return self._process_batch_threaded(reviews, show_progress, rate_limit, max_workers, on_result)
+            return self._process_batch_sequential(reviews, show_progress, rate_limit, on_result)
+    
+    def _process_batch_sequential(
+        self,
+        reviews: List[str],
+        show_progress: bool,
+        rate_limit: bool,
+        on_result: Optional[ResultCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a batch of reviews one at a time.
+        
+        Args:
+            reviews: List of review texts to process
+            show_progress: Whether to show progress bar
+            rate_limit: Whether to pace requests with the shared rate limiter
+            on_result: Optional per-review completion callback
+            
+        Returns:
+            List of dicts containing extracted themes, in the same order as reviews
         """
         logger.info(f"Processing batch of {len(reviews)} reviews")
         
         results = []
         iterator = tqdm(reviews, desc="Processing reviews") if show_progress else reviews
         
-        for review in iterator:
-            result = self.process_review(review)
+        for i, review in enumerate(iterator):
+            start_time = time.perf_counter()
+            result = self.process_review(review, rate_limit=rate_limit)
             results.append(result)
+            if on_result is not None:
+                on_result(i, result, time.perf_counter() - start_time)
+        
+        logger.info(f"Completed batch processing. Success rate: "
+                   f"{self.metrics['successful_extractions']}/{self.metrics['total_reviews']}")
+        
+        return results
+    
+    def _process_batch_threaded(
+        self,
+        reviews: List[str],
+        show_progress: bool,
+        rate_limit: bool,
+        max_workers: int,
+        on_result: Optional[ResultCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a batch of reviews over a thread pool sharing one LLM client.
+        
+        Args:
+            reviews: List of review texts to process
+            show_progress: Whether to show progress bar
+            rate_limit: Whether to pace requests with the shared rate limiter
+            max_workers: Number of worker threads
+            on_result: Optional per-review completion callback
+            
+        Returns:
+            List of dicts containing extracted themes, in the same order as reviews
+        """
+        logger.info(f"Processing batch of {len(reviews)} reviews with {max_workers} threads")
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(reviews)
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review") as executor:
+            futures = {
+                # Run each task in a copy of this context so spans nest under the batch
+                executor.submit(
+                    contextvars.copy_context().run, self._timed, self.process_review, review, rate_limit
+                ): i
+                for i, review in enumerate(reviews)
+            }
+            completed = as_completed(futures)
+            if show_progress:
+                completed = tqdm(completed, total=len(futures), desc="Processing reviews")
+            
+            for future in completed:
+                i = futures[future]
+                results[i], latency = future.result()
+                if on_result is not None:
+                    on_result(i, results[i], latency)
+        
+        logger.info(f"Completed batch processing. Success rate: "
+                   f"{self.metrics['successful_extractions']}/{self.metrics['total_reviews']}")
+        
+        return results
+    
+    def _process_batch_packed(
+        self,
+        reviews: List[str],
+        show_progress: bool,
+        rate_limit: bool,
+        max_workers: int,
+        pack_size: int,
+        on_result: Optional[ResultCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a batch of reviews in packs of pack_size reviews per LLM call.
+        
+        Args:
+            reviews: List of review texts to process
+            show_progress: Whether to show progress bar
+            rate_limit: Whether to pace requests with the shared rate limiter
+            max_workers: Number of worker threads (1 processes packs sequentially)
+            pack_size: Number of reviews per LLM call
+            on_result: Optional per-review completion callback; every review in
+                a pack reports the latency of the whole pack
             
-            if rate_limit and self.settings.rate_limit_delay > 0:
-                time.sleep(self.settings.rate_limit_delay)
+        Returns:
+            List of dicts containing extracted themes, in the same order as reviews
+        """
+        packs = [reviews[i:i + pack_size] for i in range(0, len(reviews), pack_size)]
+        logger.info(f"Processing batch of {len(reviews)} reviews in {len(packs)} packs "
+                   f"of up to {pack_size} with {max_workers} threads")
+        
+        results: List[Dict[str, Any]] = []
+        progress = tqdm(total=len(reviews), desc="Processing reviews") if show_progress else None
+        
+        def pack_done(pack_index: int, pack_result: List[Dict[str, Any]], latency: float):
+            if on_result is not None:
+                for offset, result in enumerate(pack_result):
+                    on_result(pack_index * pack_size + offset, result, latency)
+            if progress is not None:
+                progress.update(len(pack_result))
+        
+        try:
+            if max_workers > 1:
+                pack_results: List[Optional[List[Dict[str, Any]]]] = [None] * len(packs)
+                with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review") as executor:
+                    futures = {
+                        executor.submit(
+                            contextvars.copy_context().run, self._timed, self.process_packed, pack, rate_limit
+                        ): i
+                        for i, pack in enumerate(packs)
+                    }
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        pack_results[i], latency = future.result()
+                        pack_done(i, pack_results[i], latency)
+                for pack_result in pack_results:
+                    results.extend(pack_result)
+            else:
+                for i, pack in enumerate(packs):
+                    pack_result, latency = self._timed(self.process_packed, pack, rate_limit)
+                    results.extend(pack_result)
+                    pack_done(i, pack_result, latency)
+        finally:
+            if progress is not None:
+                progress.close()
         
         logger.info(f"Completed batch processing. Success rate: "
                    f"{self.metrics['successful_extractions']}/{self.metrics['total_reviews']}")
         
         return results
     
+    async def process_batch_async(
+        self,
+        reviews: List[str],
+        show_progress: bool = True,
+        rate_limit: bool = True,
+        max_concurrency: Optional[int] = None,
+        deduplicate: Optional[bool] = None,
+        on_result: Optional[ResultCallback] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a batch of reviews concurrently on the current event loop.
+        
+        Args:
+            reviews: List of review texts to process
+            show_progress: Whether to show progress bar
+            rate_limit: Whether to pace requests with the shared rate limiter
+            max_concurrency: Maximum number of requests in flight
+                (defaults to settings.max_concurrency)
+            deduplicate: Whether to send each distinct normalized review text only once
+                (defaults to settings.deduplicate)
+            on_result: Optional callback invoked as on_result(index, result, latency)
+                on the event loop as soon as each review finishes
+            
+        Returns:
+            List of dicts containing extracted themes, in the same order as reviews
+        """
+        if self.settings.deduplicate if deduplicate is None else deduplicate:
+            deduplicator = ReviewDeduplicator()
+            unique_reviews, index_map = deduplicator.deduplicate(reviews)
+            self._increment_metrics(duplicate_reviews=len(reviews) - len(unique_reviews))
+            unique_results = await self.process_batch_async(
+                unique_reviews, show_progress, rate_limit, max_concurrency, deduplicate=False,
+                on_result=self._expand_callback(on_result, index_map)
+            )
+            return deduplicator.expand(unique_results, index_map)
+        
+        max_concurrency = max_concurrency or self.settings.max_concurrency
+        logger.info(f"Processing batch of {len(reviews)} reviews "
+                   f"(async, max {max_concurrency} in flight)")
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        progress = tqdm(total=len(reviews), desc="Processing reviews") if show_progress else None
+        
+        async def run(index: int, review: str) -> Dict[str, Any]:
+            async with semaphore:
+                start_time = time.perf_counter()
+                result = await self.aprocess_review(review, rate_limit=rate_limit)
+                latency = time.perf_counter() - start_time
+            if on_result is not None:
+                on_result(index, result, latency)
+            if progress is not None:
+                progress.update(1)
+            return result
+        
+        try:
+            with tracer.span("process_batch", reviews=len(reviews)), \
+                    self._queued(len(reviews), on_result) as on_result:
+                results = await asyncio.gather(*(run(i, review) for i, review in enumerate(reviews)))
+        finally:
+            if progress is not None:
+                progress.close()
+        
+        logger.info(f"Completed batch processing. Success rate: "
+                   f"{self.metrics['successful_extractions']}/{self.metrics['total_reviews']}")
+        
+        return list(results)
+    
+    def _adjust_gauge(self, name: str, amount: int):
+        """Add amount to a gauge."""
+        with self._metrics_lock:
+            self.gauges[name] += amount
+    
+    @contextlib.contextmanager
+    def _gauge(self, name: str, amount: int = 1) -> Iterator[None]:
+        """Raise a gauge for the duration of the block."""
+        self._adjust_gauge(name, amount)
+        try:
+            yield
+        finally:
+            self._adjust_gauge(name, -amount)
+    
+    @contextlib.contextmanager
+    def _queued(self, count: int, on_result: Optional[ResultCallback]) -> Iterator[ResultCallback]:
+        """
+        Count a batch's reviews in the queue_depth gauge until each one finishes.
+        
+        Args:
+            count: Number of reviews in the batch
+            on_result: Caller's per-review completion callback, if any
+            
+        Yields:
+            Completion callback that lowers the gauge before calling on_result
+        """
+        remaining = count
+        self._adjust_gauge("queue_depth", count)
+        
+        def finished(index: int, result: Dict[str, Any], latency: float):
+            nonlocal remaining
+            remaining -= 1
+            self._adjust_gauge("queue_depth", -1)
+            if on_result is not None:
+                on_result(index, result, latency)
+        
+        try:
+            yield finished
+        finally:
+            self._adjust_gauge("queue_depth", -remaining)
+    
+    @staticmethod
+    def _timed(func: Callable, *args) -> tuple:
+        """Call func(*args) and return (result, elapsed seconds)."""
+        start_time = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start_time
+    
+    @staticmethod
+    def _expand_callback(
+        on_result: Optional[ResultCallback],
+        index_map: List[int]
+    ) -> Optional[ResultCallback]:
+        """
+        Wrap a result callback so results for unique reviews are reported
+        for every original review that collapsed onto them.
+        
+        Args:
+            on_result: Callback expecting original review indices
+            index_map: Index map returned by ReviewDeduplicator.deduplicate
+            
+        Returns:
+            Callback accepting unique review indices, or None
+        """
+        if on_result is None:
+            return None
+        
+        positions: Dict[int, List[int]] = {}
+        for original_index, unique_index in enumerate(index_map):
+            positions.setdefault(unique_index, []).append(original_index)
+        
+        def expanded(unique_index: int, result: Dict[str, Any], latency: float):
+            for n, original_index in enumerate(positions[unique_index]):
+                on_result(original_index, copy.deepcopy(result) if n else result, latency)
+        
+        return expanded
+    
     def get_metrics(self) -> Dict[str, Any]:
         """
         Get current pipeline metrics.
         
+        Returns:
+            Dict containing metrics
+        """
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+            gauges = dict(self.gauges)
+            window = self._request_window
+            elapsed = window[1] - window[0] if window is not None else 0.0
+        
+        return self.summarize_metrics(metrics, self.histograms, elapsed, gauges)
+    
+    def get_raw_metrics(self) -> Tuple[Dict[str, int], HistogramSet]:
+        """
+        Get a snapshot of the raw counters and histograms.
+        
+        Nothing is derived, so snapshots of several pipelines (e.g. one per
+        shard process) can be added up with merge_raw_metrics.
+        
+        Returns:
+            Tuple of (counter values keyed as in get_metrics, copy of the per-request histograms)
+        """
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        histograms = HistogramSet()
+        histograms.merge(self.histograms)
+        return metrics, histograms
+    
+    @classmethod
+    def merge_raw_metrics(
+        cls,
+        snapshots: Iterable[Tuple[Dict[str, int], HistogramSet]],
+        elapsed: float
+    ) -> Dict[str, Any]:
+        """
+        Sum snapshots from get_raw_metrics into one metrics report.
+        
+        Args:
+            snapshots: (counters, histograms) pairs, e.g. one per shard
+            elapsed: Seconds over which the requests were made, for token rates
+            
+        Returns:
+            Metrics in the format of get_metrics()
+        """
+        counters = cls._empty_metrics()
+        histograms = HistogramSet()
+        for metrics, snapshot_histograms in snapshots:
+            for name, value in metrics.items():
+                counters[name] = counters.get(name, 0) + value
+            histograms.merge(snapshot_histograms)
+        return cls.summarize_metrics(counters, histograms, elapsed)
+    
+    @staticmethod
+    def summarize_metrics(
+        metrics: Dict[str, int],
+        histograms: HistogramSet,
+        elapsed: float,
+        gauges: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Derive rates and percentiles from raw counters and histograms.
+        
+        Used by get_metrics and to summarize counters merged from several
+        pipelines (e.g. one per shard process).
+        
+        Args:
+            metrics: Counter values keyed as in self.metrics
+            histograms: Per-request histograms
+            elapsed: Seconds over which requests were made, for token rates
+            gauges: Optional gauge values to include
+            
         Returns:
             Dict containing metrics
         """
         success_rate = (
-            self.metrics["successful_extractions"] / self.metrics["total_reviews"]
-            if self.metrics["total_reviews"] > 0
+            metrics["successful_extractions"] / metrics["total_reviews"]
+            if metrics["total_reviews"] > 0
             else 0.0
         )
         
         avg_themes_per_review = (
-            self.metrics["total_themes_extracted"] / self.metrics["successful_extractions"]
-            if self.metrics["successful_extractions"] > 0
+            metrics["total_themes_extracted"] / metrics["successful_extractions"]
+            if metrics["successful_extractions"] > 0
             else 0.0
         )
         
+        cache_lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        cache_hit_rate = (
+            metrics["cache_hits"] / cache_lookups
+            if cache_lookups > 0
+            else 0.0
+        )
+        
+        duplicate_ratio = (
+            metrics["duplicate_reviews"] / (metrics["total_reviews"] + metrics["duplicate_reviews"])
+            if metrics["duplicate_reviews"] > 0
+            else 0.0
+        )
+        
+        parse_failure_rate = (
+            metrics["parse_failures"] / metrics["llm_requests"]
+            if metrics["llm_requests"] > 0
+            else 0.0
+        )
+        
+        prompt_tokens_per_second = metrics["prompt_tokens"] / elapsed if elapsed > 0 else 0.0
+        completion_tokens_per_second = metrics["completion_tokens"] / elapsed if elapsed > 0 else 0.0
+        
         return {
-            **self.metrics,
+            **metrics,
+            **(gauges or {}),
             "success_rate": success_rate,
             "avg_themes_per_review": avg_themes_per_review,
+            "cache_hit_rate": cache_hit_rate,
+            "duplicate_ratio": duplicate_ratio,
+            "parse_failure_rate": parse_failure_rate,
+            "prompt_tokens_per_second": prompt_tokens_per_second,
+            "completion_tokens_per_second": completion_tokens_per_second,
+            # count/mean/min/max/p50/p95/p99 per request for latency, retries,
+            # prompt_tokens, completion_tokens and parse_time
+            "histograms": histograms.summary(),
         }
     
     def reset_metrics(self):
         """Reset pipeline metrics."""
-        self.metrics = {
-            "total_reviews": 0,
-            "successful_extractions": 0,
-            "failed_extractions": 0,
-            "total_themes_extracted": 0,
-        }
+        with self._metrics_lock:
+            self.metrics = self._empty_metrics()
+            self._request_window = None
+        self.histograms = HistogramSet()
         logger.info("Metrics reset")
@@ -1,10 +1,78 @@
 import logging
-from typing import List
+from typing import Any, Dict, List
 from .constants import KEY_THEMES
 
 logger = logging.getLogger(__name__)
 
 
+def build_themes_schema(themes: List[str] = None) -> Dict[str, Any]:
+    """
+    Build the JSON schema of a single-review response.
+    
+    Used for guided decoding so the model can only emit themes from the list.
+    
+    Args:
+        themes: Allowed theme names. If None, uses default KEY_THEMES.
+        
+    Returns:
+        JSON schema for {"themes": [{"theme": str, "description": str}]}
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "themes": _themes_array_schema(themes or KEY_THEMES),
+        },
+        "required": ["themes"],
+        "additionalProperties": False,
+    }
+
+
+def build_packed_themes_schema(themes: List[str] = None) -> Dict[str, Any]:
+    """
+    Build the JSON schema of a packed multi-review response.
+    
+    Args:
+        themes: Allowed theme names. If None, uses default KEY_THEMES.
+        
+    Returns:
+        JSON schema for {"results": [{"id": int, "themes": [...]}]}
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "themes": _themes_array_schema(themes or KEY_THEMES),
+                    },
+                    "required": ["id", "themes"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["results"],
+        "additionalProperties": False,
+    }
+
+
+def _themes_array_schema(themes: List[str]) -> Dict[str, Any]:
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "theme": {"type": "string", "enum": list(themes)},
+                "description": {"type": "string"},
+            },
+            "required": ["theme", "description"],
+            "additionalProperties": False,
+        },
+    }
+
+
 class ThemeCategorizationPrompt:
     """Handles the creation and management of prompts for theme categorization."""
     
@@ -59,6 +127,70 @@ class ThemeCategorizationPrompt:
         
         return prompt
     
+    def create_packed_prompt(self, patient_reviews: List[str]) -> str:
+        """
+        Create a single prompt that asks for the themes of several reviews at once.
+        
+        Reviews are numbered from 1 so the LLM response can be mapped back to
+        them. The instruction block and theme list are sent once for the whole pack.
+        
+        Args:
+            patient_reviews: The patient review texts to analyze.
+            
+        Returns:
+            str: The formatted prompt for the LLM.
+        """
+        themes_list = ', '.join(self.themes)
+        numbered_reviews = "\n\n".join(
+            f"Review {i}:\n{review}" for i, review in enumerate(patient_reviews, start=1)
+        )
+        
+        prompt = (
+            f"You are analyzing {len(patient_reviews)} numbered patient reviews to identify key themes or "
+            "areas discussed in each text. Key themes are specific topics, concerns, or aspects of the "
+            "healthcare experience that the patient mentions or talks about in their review.\n\n"
+            "Analyze each of the following patient reviews independently and identify all key themes from this list: " +
+            f"{themes_list}.\n\n" +
+            "Instructions:\n" +
+            "- Identify themes that represent topics, concerns, or areas explicitly mentioned or discussed in the review\n" +
+            "- A single review may contain multiple themes\n" +
+            "- Match themes based on the content and context of what the patient is describing\n" +
+            "- If no theme from the list matches the content, use 'unknown'\n" +
+            "- For each identified theme, provide a brief description explaining why this theme applies\n" +
+            "- Return exactly one result per review, using the review number as its id\n\n" +
+            f"Patient Reviews:\n{numbered_reviews}\n\n" +
+            "Respond with a JSON object containing the identified themes for every review in the format below:\n" +
+            "{\n" +
+            "  \"results\": [\n" +
+            "    {\n" +
+            "      \"id\": 1,\n" +
+            "      \"themes\": [\n" +
+            "        {\n" +
+            "          \"theme\": \"\",\n" +
+            "          \"description\": \"\"\n" +
+            "        }\n" +
+            "      ]\n" +
+            "    }\n" +
+            "  ]\n" +
+            "}"
+        )
+        
+        return prompt
+    
+    def get_json_schema(self, packed: bool = False) -> Dict[str, Any]:
+        """
+        Get the JSON schema responses to this engineer's prompts must follow.
+        
+        Args:
+            packed: Whether to return the schema for create_packed_prompt responses
+            
+        Returns:
+            JSON schema dict restricting themes to this engineer's theme list
+        """
+        if packed:
+            return build_packed_themes_schema(self.themes)
+        return build_themes_schema(self.themes)
+    
     def get_themes(self) -> List[str]:
         """
         Get the list of available themes.
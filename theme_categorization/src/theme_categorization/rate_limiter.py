@@ -0,0 +1,196 @@
+"""
+Token-bucket rate limiting for LLM requests.
+
+A single RateLimiter can be shared by the sequential, threaded and async
+batch paths. Buckets refill continuously and allow bursts up to their
+capacity; callers reserve capacity and then wait (blocking or awaiting)
+for the returned delay.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used to estimate prompt size before sending
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with continuous refill.
+
+    Reservations may drive the balance negative; later callers then wait
+    for the debt to be repaid, which keeps waiting callers in FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens the bucket can hold (burst size)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Take tokens from the bucket.
+
+        Args:
+            amount: Number of tokens to take
+
+        Returns:
+            Seconds the caller must wait before using the reserved tokens
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_refill
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-second and tokens-per-minute budgets.
+
+    Either budget may be disabled by passing None or 0.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        burst: int = 1
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_second: Sustained request rate (None or 0 for unlimited)
+            tokens_per_minute: Sustained token rate (None or 0 for unlimited)
+            burst: Number of requests that may be sent back-to-back when idle
+        """
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self.request_bucket = (
+            TokenBucket(requests_per_second, burst) if requests_per_second else None
+        )
+        # A full minute of tokens may be spent at once, matching how providers meter TPM
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        )
+
+        logger.info(f"Initialized rate limiter: "
+                   f"rps={requests_per_second or 'unlimited'}, "
+                   f"tpm={tokens_per_minute or 'unlimited'}, burst={burst}")
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RateLimiter":
+        """
+        Create a rate limiter from settings.
+
+        When rate_limit_rps is not set, a positive rate_limit_delay is
+        converted to the equivalent request rate (1 / delay). With the
+        default RATE_LIMIT_DELAY of 1.0 that is 1 request per second for
+        every batch path, however many threads or concurrent requests are
+        configured; set RATE_LIMIT_RPS (or RATE_LIMIT_DELAY=0) to lift it.
+
+        When rate_limit_burst is 0, the burst is max_workers, so each worker
+        thread can send its first request without waiting for the others.
+
+        Args:
+            settings: Configuration settings instance
+
+        Returns:
+            RateLimiter instance
+        """
+        rps = settings.rate_limit_rps
+        if not rps and settings.rate_limit_delay > 0:
+            rps = 1.0 / settings.rate_limit_delay
+            logger.info(f"RATE_LIMIT_RPS is unset; pacing requests to {rps:g}/s from "
+                       f"RATE_LIMIT_DELAY={settings.rate_limit_delay:g}")
+
+        return cls(
+            requests_per_second=rps,
+            tokens_per_minute=settings.rate_limit_tpm,
+            burst=settings.rate_limit_burst or settings.max_workers,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any budget is enforced."""
+        return self.request_bucket is not None or self.token_bucket is not None
+
+    @staticmethod
+    def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+        """
+        Estimate the tokens a request will consume.
+
+        Args:
+            prompt: Prompt text to be sent
+            max_tokens: Completion token budget of the request
+
+        Returns:
+            Estimated prompt tokens plus the completion budget
+        """
+        return len(prompt) // CHARS_PER_TOKEN + max_tokens
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve capacity for one request.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+
+        Returns:
+            Seconds to wait before sending the request
+        """
+        wait_time = 0.0
+        if self.request_bucket is not None:
+            wait_time = self.request_bucket.reserve(1)
+        if self.token_bucket is not None and tokens > 0:
+            wait_time = max(wait_time, self.token_bucket.reserve(tokens))
+        return wait_time
+
+    def acquire(self, tokens: int = 0):
+        """
+        Block until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        wait_time = self.reserve(tokens)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self, tokens: int = 0):
+        """
+        Wait without blocking the event loop until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        wait_time = self.reserve(tokens)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
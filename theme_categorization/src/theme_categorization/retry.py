@@ -0,0 +1,279 @@
+"""
+Retry policy and circuit breaker for LLM requests.
+
+RetryPolicy computes capped exponential backoff with full jitter and
+honors the server's Retry-After header. CircuitBreaker tracks consecutive
+endpoint failures so that a dead endpoint makes a batch fail fast (or
+pause) instead of burning every remaining review's retries.
+"""
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses that indicate the request itself is bad; retrying cannot help
+NON_RETRYABLE_STATUS_CODES = {400, 401, 403, 404, 405, 413, 422}
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """
+    Get the HTTP status code carried by an API error, if any.
+
+    Args:
+        error: Exception raised by the OpenAI client
+
+    Returns:
+        HTTP status code or None
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After delay from an API error response.
+
+    Supports the retry-after-ms extension, delta-seconds and HTTP-date values.
+
+    Args:
+        error: Exception raised by the OpenAI client
+
+    Returns:
+        Delay in seconds, or None if the header is missing or invalid
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid Retry-After header: {retry_after}")
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, honoring Retry-After."""
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, jitter: bool = True):
+        """
+        Initialize the retry policy.
+
+        Args:
+            base_delay: Delay before the first retry, in seconds
+            max_delay: Upper bound on any single delay, in seconds
+            jitter: Whether to randomize delays between 0 and the backoff
+                ("full jitter") so concurrent workers do not retry in lockstep
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RetryPolicy":
+        """
+        Create a retry policy from settings.
+
+        Args:
+            settings: Configuration settings instance
+
+        Returns:
+            RetryPolicy instance
+        """
+        return cls(base_delay=settings.retry_base_delay, max_delay=settings.retry_max_delay)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Check whether a failed request is worth retrying.
+
+        Args:
+            error: Exception raised by the request
+
+        Returns:
+            False for client errors such as 400/401/404, True otherwise
+        """
+        return get_status_code(error) not in NON_RETRYABLE_STATUS_CODES
+
+    def compute_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Get the number of seconds to wait before the next attempt.
+
+        Args:
+            attempt: Zero-based index of the attempt that just failed
+            error: Exception raised by the failed attempt
+
+        Returns:
+            Delay in seconds
+        """
+        retry_after = parse_retry_after(error) if error is not None else None
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                logger.warning(f"Server asked to retry after {retry_after:.1f}s; "
+                              f"capping at {self.max_delay:.1f}s")
+            return min(retry_after, self.max_delay)
+
+        backoff = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    closed: requests flow normally. After failure_threshold consecutive
+    failures the circuit opens and requests are refused for reset_timeout
+    seconds. It then becomes half-open and lets a single probe request
+    through; success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Endpoint identifier used in log messages
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once reset_timeout has elapsed."""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent now.
+
+        In the half-open state only one caller is allowed through as a probe.
+
+        Returns:
+            True if the request may proceed
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def remaining_open_time(self) -> float:
+        """
+        Get the seconds left before the circuit allows a probe request.
+
+        Returns:
+            Remaining time in seconds (0 unless the circuit is open)
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def record_success(self):
+        """Record a successful request, closing the circuit."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed after successful probe")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """
+        Give up a request without an outcome, e.g. because it was cancelled.
+
+        Neither a success nor a failure is recorded, but if the request was
+        the half-open probe another caller may now probe instead.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Record a failed request, opening the circuit once the threshold is reached."""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                logger.error(f"Circuit for {self.name} opened after "
+                            f"{self._consecutive_failures} consecutive failures; "
+                            f"pausing requests for {self.reset_timeout:.0f}s")
+
+    def _update_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str, settings: Settings) -> CircuitBreaker:
+    """
+    Get the circuit breaker shared by all clients of an endpoint.
+
+    Args:
+        endpoint: Endpoint base URL
+        settings: Configuration settings used when the breaker is first created
+
+    Returns:
+        CircuitBreaker instance for the endpoint
+    """
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                endpoint,
+                failure_threshold=settings.circuit_failure_threshold,
+                reset_timeout=settings.circuit_reset_timeout,
+            )
+            _circuit_breakers[endpoint] = breaker
+        return breaker
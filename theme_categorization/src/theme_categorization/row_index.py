@@ -0,0 +1,258 @@
+"""
+Byte-offset index of the records in a CSV file, for random access by Id.
+
+Re-processing a handful of reviews should not mean parsing the whole
+CSV. RowIndex records where every record starts, so DataLoader.get_by_ids
+can seek straight to the rows it needs.
+
+Comment fields may contain quoted newlines, so a newline ends a record
+only when an even number of quote characters precede it (an escaped quote
+"" adds two and keeps the parity). The scan is vectorized with numpy over
+a memory-mapped file, a block at a time. The index is stored next to the
+source as a structured .npy array of (id, offset), with a JSON sidecar
+recording how much of the file it covers. When the file has only been
+appended to, a rebuild scans just the new bytes.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the index layout changes, invalidating existing indexes
+INDEX_VERSION = 1
+
+# Structured dtype of the stored index
+INDEX_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8")])
+
+# Bytes scanned per numpy block
+SCAN_BLOCK_SIZE = 16 << 20
+
+# Bytes before the indexed end hashed to detect a rewritten (not appended) file
+TAIL_CHECK_BYTES = 1 << 16
+
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+
+
+def scan_record_ends(data: np.ndarray, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """
+    Find the newlines that terminate CSV records.
+
+    Args:
+        data: File contents as a uint8 array (e.g. np.memmap)
+        start: Offset of a record boundary to scan from (quote parity is even there)
+        end: Offset to stop at (defaults to the end of data)
+
+    Returns:
+        int64 array of the offsets of record-terminating newlines
+    """
+    end = len(data) if end is None else end
+    ends = []
+    parity = 0
+    for block_start in range(start, end, SCAN_BLOCK_SIZE):
+        block = data[block_start:min(block_start + SCAN_BLOCK_SIZE, end)]
+        quotes = np.flatnonzero(block == QUOTE)
+        newlines = np.flatnonzero(block == NEWLINE)
+        # Quotes seen before each newline, including those of earlier blocks
+        quotes_before = parity + np.searchsorted(quotes, newlines)
+        ends.append(newlines[quotes_before % 2 == 0] + block_start)
+        parity = (parity + len(quotes)) % 2
+    return np.concatenate(ends).astype(np.int64) if ends else np.empty(0, dtype=np.int64)
+
+
+class RowIndex:
+    """(Id, byte offset) index of a CSV file, built incrementally for append-only files."""
+
+    def __init__(self, csv_path: str, index_dir: Optional[str] = None):
+        """
+        Initialize the index for a CSV file.
+
+        Args:
+            csv_path: Source CSV file with an integer Id column
+            index_dir: Directory for the index files (defaults to the source's directory)
+        """
+        self.csv_path = Path(csv_path)
+        directory = Path(index_dir) if index_dir is not None else self.csv_path.parent
+        self.index_path = directory / f".{self.csv_path.name}.rowindex.npy"
+        self.meta_path = directory / f".{self.csv_path.name}.rowindex.json"
+
+        self._index: Optional[np.ndarray] = None
+        self._meta: Optional[Dict[str, Any]] = None
+
+    def load(self) -> np.ndarray:
+        """
+        Get the index, building or extending it if the file has changed.
+
+        Returns:
+            Structured array of (id, offset) in file order
+        """
+        if not self.csv_path.exists():
+            raise FileNotFoundError(f"File not found: {self.csv_path}")
+
+        stat = self.csv_path.stat()
+        if self._index is None:
+            self._index, self._meta = self._read_stored()
+        if self._meta is not None and self._meta["size"] == stat.st_size \
+                and self._meta["mtime_ns"] == stat.st_mtime_ns:
+            return self._index
+        return self.build()
+
+    def build(self, refresh: bool = False) -> np.ndarray:
+        """
+        Build the index, scanning only appended bytes when possible.
+
+        Args:
+            refresh: Rescan the whole file even if it was only appended to
+
+        Returns:
+            Structured array of (id, offset) in file order
+        """
+        start_time = time.perf_counter()
+        stat = self.csv_path.stat()
+        data = np.memmap(self.csv_path, dtype=np.uint8, mode="r") if stat.st_size else np.empty(0, np.uint8)
+
+        if self._index is None:
+            self._index, self._meta = self._read_stored()
+        previous, meta = self._index, self._meta
+        appended = (
+            not refresh and meta is not None and previous is not None
+            and stat.st_size >= meta["size"] and meta["header_end"] <= len(data)
+            and self._tail_digest(data, meta["indexed_end"]) == meta["tail_blake2b"]
+        )
+
+        ends = scan_record_ends(data, meta["indexed_end"] if appended else 0)
+        if appended:
+            header_end = meta["header_end"]
+            scan_start = meta["indexed_end"]
+            kept = previous[previous["offset"] < scan_start]
+        else:
+            if len(ends) == 0:
+                raise ValueError(f"{self.csv_path} has no header line")
+            header_end = int(ends[0]) + 1
+            ends = ends[1:]
+            scan_start = header_end
+            kept = np.empty(0, dtype=INDEX_DTYPE)
+
+        # Records start at scan_start and after each terminator; a final unterminated line is a record too
+        starts = np.concatenate(([scan_start], ends + 1)).astype(np.int64)
+        record_ends = np.concatenate((ends, [len(data)])).astype(np.int64)
+        # Skip blank lines, which pandas skips as well
+        lengths = record_ends - starts
+        first_bytes = data[np.minimum(starts, len(data) - 1)]
+        blank = (lengths == 0) | ((lengths == 1) & (first_bytes == CARRIAGE_RETURN))
+        starts = starts[~blank]
+
+        ids = self._parse_ids(data, header_end, scan_start)
+        if len(ids) != len(starts):
+            raise ValueError(f"Found {len(starts)} records but {len(ids)} Ids in {self.csv_path}; "
+                            f"the file may not be valid CSV")
+
+        added = np.empty(len(starts), dtype=INDEX_DTYPE)
+        added["id"] = ids
+        added["offset"] = starts
+        index = np.concatenate((kept, added))
+
+        # The last record may be unterminated; rescan it next time in case it grows
+        indexed_end = int(ends[-1]) + 1 if len(ends) else scan_start
+        meta = {
+            "version": INDEX_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "header_end": header_end,
+            "indexed_end": indexed_end,
+            "tail_blake2b": self._tail_digest(data, indexed_end),
+            "records": len(index),
+        }
+        self._write(index, meta)
+        self._index, self._meta = index, meta
+
+        logger.info(f"{'Extended' if appended else 'Built'} row index {self.index_path} "
+                   f"with {len(added)} new records ({len(index)} total) "
+                   f"in {time.perf_counter() - start_time:.2f}s")
+        return index
+
+    def header(self) -> bytes:
+        """Get the header line of the CSV file, including its newline."""
+        self.load()
+        with open(self.csv_path, "rb") as f:
+            return f.read(self._meta["header_end"])
+
+    def read_records(self, ids: Iterable[Any]) -> bytes:
+        """
+        Read the raw bytes of the records with the given Ids.
+
+        Args:
+            ids: Integer Ids; every record with a matching Id is read
+
+        Returns:
+            Concatenated records in file order, each ending with a newline
+        """
+        index = self.load()
+        wanted = np.fromiter((int(review_id) for review_id in ids), dtype=np.int64)
+        positions = np.flatnonzero(np.isin(index["id"], wanted))
+
+        offsets = index["offset"]
+        file_size = self._meta["size"]
+        chunks = []
+        with open(self.csv_path, "rb") as f:
+            for position in positions:
+                start = int(offsets[position])
+                end = int(offsets[position + 1]) if position + 1 < len(offsets) else file_size
+                f.seek(start)
+                record = f.read(end - start)
+                chunks.append(record if record.endswith(b"\n") else record + b"\n")
+        return b"".join(chunks)
+
+    def _parse_ids(self, data: np.ndarray, header_end: int, start: int) -> np.ndarray:
+        """Parse the Id column of data[start:] with pandas, using the file's header."""
+        if start >= len(data):
+            return np.empty(0, dtype=np.int64)
+        source = io.BytesIO(bytes(data[:header_end]) + bytes(data[start:]))
+        ids = pd.read_csv(source, usecols=["Id"])["Id"]
+        if not pd.api.types.is_integer_dtype(ids):
+            raise ValueError(f"Row index requires integer Ids in {self.csv_path}")
+        return ids.to_numpy(dtype=np.int64)
+
+    @staticmethod
+    def _tail_digest(data: np.ndarray, end: int) -> str:
+        if end > len(data):
+            return ""
+        return hashlib.blake2b(bytes(data[max(0, end - TAIL_CHECK_BYTES):end]), digest_size=16).hexdigest()
+
+    def _read_stored(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                return None, None
+            index = np.load(self.index_path)
+        except (OSError, ValueError):
+            return None, None
+        if index.dtype != INDEX_DTYPE or len(index) != meta.get("records"):
+            return None, None
+        return index, meta
+
+    def _write(self, index: np.ndarray, meta: Dict[str, Any]):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.index_path.parent), prefix=".rowindex-", suffix=".npy")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, index)
+            os.replace(tmp_path, self.index_path)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.meta_path.parent), prefix=".rowindex-", suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+            os.replace(tmp_path, self.meta_path)
+        except OSError as e:
+            logger.warning(f"Could not save row index for {self.csv_path}: {e}")
@@ -4,8 +4,8 @@ Automatically loads environment variables from .env file if present.
 """
 import os
 from pathlib import Path
-from typing import Optional
-from dataclasses import dataclass
+from typing import List, Optional
+from dataclasses import dataclass, field
 
 # Try to load .env file if python-dotenv is available
 try:
@@ -38,6 +38,10 @@ class Settings:
     
     # vLLM Configuration (local deployment)
     vllm_base_url: str = os.getenv("VLLM_BASE_URL", "http://localhost:8001/v1")
+    # Comma-separated replica URLs; when set, requests are load balanced across them
+    vllm_base_urls: List[str] = field(default_factory=lambda: [
+        url.strip() for url in os.getenv("VLLM_BASE_URLS", "").split(",") if url.strip()
+    ])
     
     # HuggingFace Inference Router Configuration
     hf_router_url: str = os.getenv("HF_ROUTER_URL", "https://router.huggingface.co/v1")
@@ -45,9 +49,43 @@ class Settings:
     # LLM Parameters
     temperature: float = float(os.getenv("LLM_TEMPERATURE", "0.7"))
     max_tokens: int = int(os.getenv("LLM_MAX_TOKENS", "1000"))
+    stream: bool = os.getenv("LLM_STREAM", "false").lower() in ("1", "true", "yes")  # Stop reading once the JSON object closes
+    guided_decoding: str = os.getenv("LLM_GUIDED_DECODING", "off")  # "off", "response_format" or "guided_json" (vLLM)
+    deterministic: bool = os.getenv("LLM_DETERMINISTIC", "false").lower() in ("1", "true", "yes")  # Forces temperature 0
+    
+    # Response Cache
+    cache_path: Optional[str] = os.getenv("LLM_CACHE_PATH") or None  # SQLite file; caching disabled if unset
+    cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "0"))  # 0 = unlimited
+    cache_max_age: float = float(os.getenv("LLM_CACHE_MAX_AGE", "0"))  # Seconds; 0 = never expire
     
     # Rate Limiting
+    # Seconds between requests, used as 1/delay rps when RATE_LIMIT_RPS is unset. The default caps
+    # every batch path at 1 request/s regardless of MAX_WORKERS: set RATE_LIMIT_RPS, or 0 to disable pacing.
     rate_limit_delay: float = float(os.getenv("RATE_LIMIT_DELAY", "1.0"))
+    rate_limit_rps: float = float(os.getenv("RATE_LIMIT_RPS", "0"))  # Requests per second (0 = derive from delay)
+    rate_limit_tpm: float = float(os.getenv("RATE_LIMIT_TPM", "0"))  # Tokens per minute (0 = unlimited)
+    rate_limit_burst: int = int(os.getenv("RATE_LIMIT_BURST", "0"))  # Requests allowed back-to-back when idle (0 = max_workers)
+    
+    # Retries and Circuit Breaker
+    retry_base_delay: float = float(os.getenv("RETRY_BASE_DELAY", "1.0"))  # First backoff delay in seconds
+    retry_max_delay: float = float(os.getenv("RETRY_MAX_DELAY", "60.0"))  # Cap on any backoff or Retry-After wait
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open the circuit
+    circuit_reset_timeout: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30.0"))  # Seconds before a probe request
+    circuit_breaker_mode: str = os.getenv("CIRCUIT_BREAKER_MODE", "fail")  # "fail" fast or "pause" while open
+    
+    # Concurrency
+    max_concurrency: int = int(os.getenv("MAX_CONCURRENCY", "8"))  # Max in-flight requests for async batches
+    max_workers: int = int(os.getenv("MAX_WORKERS", "1"))  # Threads for process_batch (1 = sequential)
+    pack_size: int = int(os.getenv("PACK_SIZE", "1"))  # Reviews classified per LLM call (1 = unpacked)
+    deduplicate: bool = os.getenv("DEDUPLICATE", "false").lower() in ("1", "true", "yes")  # Send each distinct review text once
+    
+    # Metrics Export
+    metrics_port: int = int(os.getenv("METRICS_PORT", "0"))  # Serve OpenMetrics on this port (0 = disabled)
+    metrics_textfile: Optional[str] = os.getenv("METRICS_TEXTFILE") or None  # node_exporter textfile collector path
+    metrics_interval: float = float(os.getenv("METRICS_INTERVAL", "15"))  # Seconds between textfile writes
+    
+    # Tracing
+    trace_enabled: bool = os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")  # Record per-stage timing spans
     
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
@@ -55,9 +93,14 @@ class Settings:
     @property
     def base_url(self) -> str:
         """Determine base URL based on token configuration."""
+        return self.base_urls[0]
+    
+    @property
+    def base_urls(self) -> List[str]:
+        """Determine all base URLs to send requests to, based on token configuration."""
         if self.hf_token == "dummy_token":
-            return self.vllm_base_url
-        return self.hf_router_url
+            return self.vllm_base_urls or [self.vllm_base_url]
+        return [self.hf_router_url]
     
     @property
     def api_key(self) -> str:
@@ -68,10 +111,34 @@ class Settings:
     
     def __post_init__(self):
         """Validate settings after initialization."""
+        if self.deterministic:
+            self.temperature = 0.0
         if self.temperature < 0 or self.temperature > 2:
             raise ValueError("Temperature must be between 0 and 2")
         if self.max_tokens < 1:
             raise ValueError("max_tokens must be at least 1")
         if self.hf_timeout < 1:
             raise ValueError("hf_timeout must be at least 1 second")
+        if self.rate_limit_delay < 0 or self.rate_limit_rps < 0 or self.rate_limit_tpm < 0:
+            raise ValueError("Rate limits must not be negative")
+        if self.rate_limit_burst < 0:
+            raise ValueError("rate_limit_burst must not be negative")
+        if self.guided_decoding not in ("off", "response_format", "guided_json"):
+            raise ValueError("guided_decoding must be 'off', 'response_format' or 'guided_json'")
+        if self.cache_max_entries < 0 or self.cache_max_age < 0:
+            raise ValueError("Cache limits must not be negative")
+        if self.retry_base_delay < 0 or self.retry_max_delay < self.retry_base_delay:
+            raise ValueError("retry_max_delay must be at least retry_base_delay, and both non-negative")
+        if self.circuit_failure_threshold < 1:
+            raise ValueError("circuit_failure_threshold must be at least 1")
+        if self.circuit_breaker_mode not in ("fail", "pause"):
+            raise ValueError("circuit_breaker_mode must be 'fail' or 'pause'")
+        if self.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if self.pack_size < 1:
+            raise ValueError("pack_size must be at least 1")
+        if self.metrics_port < 0 or self.metrics_interval <= 0:
+            raise ValueError("metrics_port must not be negative and metrics_interval must be positive")
 
@@ -0,0 +1,345 @@
+"""
+Multi-process sharded runs over a dataset.
+
+ShardedRunner splits (id, review) records into N shards by a stable hash of
+the Id (see data_loader.shard_for_id) and processes each shard in its own
+worker process, with its own client, pipeline, rate-limit share and
+results journal. Given a CSV path, each worker streams its own shard from
+the file, so records never pass through the parent. Response parsing,
+prompt construction and bookkeeping then run on N interpreters instead of
+contending for one GIL, and each worker is resumable on its own.
+
+When every shard finishes, the shard journals are merged into one
+results.jsonl in input order, and the shard counters and histograms are
+summed into one metrics report, so the merged output does not depend on
+which shard finished first.
+"""
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .data_loader import DataLoader, shard_for_id
+from .ids import RowKeys, is_missing_id, normalize_id
+from .journal import JournaledRunner, ResultsJournal, record_key
+from .llm_clients import HuggingFaceClient
+from .pipeline import ThemeCategorizationPipeline
+from .prompt_engineer import ThemeCategorizationPrompt
+from .settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def shard_settings(settings: Settings, num_shards: int) -> Settings:
+    """
+    Give one shard an equal share of the configured rate limits.
+
+    Args:
+        settings: Settings for the whole run
+        num_shards: Total number of shards
+
+    Returns:
+        Copy of settings whose request and token rates are divided by num_shards
+    """
+    changes: Dict[str, Any] = {"rate_limit_tpm": settings.rate_limit_tpm / num_shards}
+    if settings.rate_limit_rps > 0:
+        changes["rate_limit_rps"] = settings.rate_limit_rps / num_shards
+    else:
+        # rate_limit_delay is the interval between requests, so it grows with the shard count
+        changes["rate_limit_delay"] = settings.rate_limit_delay * num_shards
+    return dataclasses.replace(settings, **changes)
+
+
+def _run_shard(
+    shard_index: int,
+    num_shards: int,
+    settings: Settings,
+    records: Optional[List[Tuple[Any, str]]],
+    data_path: Optional[str],
+    journal_path: str,
+    chunk_size: int,
+    retry_failed: bool,
+    batch_kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Process one shard in a worker process (must be top level to be picklable)."""
+    if records is None:
+        loader = DataLoader(data_path, shard_index=shard_index, num_shards=num_shards)
+        records = ((review_id, review) for review_id, review, _ in loader.iter_reviews())
+
+    client = HuggingFaceClient(settings)
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings)
+
+    with ResultsJournal(journal_path) as journal:
+        counts = JournaledRunner(pipeline, journal, retry_failed=retry_failed).run(
+            records, chunk_size=chunk_size, **batch_kwargs
+        )
+
+    metrics, histograms = pipeline.get_raw_metrics()
+
+    return {
+        "shard": shard_index,
+        "pid": os.getpid(),
+        **counts,
+        "metrics": metrics,
+        "histograms": histograms,
+    }
+
+
+class ShardedRunner:
+    """Processes records in parallel worker processes, one per Id-hash shard."""
+
+    def __init__(
+        self,
+        output_dir: str,
+        num_shards: Optional[int] = None,
+        settings: Optional[Settings] = None,
+        retry_failed: bool = True
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            output_dir: Directory for the shard journals, the merged
+                results.jsonl and metrics.json
+            num_shards: Number of shards and worker processes (defaults to the CPU count)
+            settings: Settings for the whole run; each shard gets an equal share
+                of its rate limits
+            retry_failed: Whether to re-process ids whose journaled result has
+                no themes when resuming
+        """
+        self.output_dir = Path(output_dir)
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.settings = settings or Settings()
+        self.retry_failed = retry_failed
+
+        if self.num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+
+    def shard_path(self, shard_index: int) -> Path:
+        """
+        Get the journal path of a shard.
+
+        The shard count is part of the name, so resuming with a different
+        count starts fresh journals instead of mixing assignments.
+
+        Args:
+            shard_index: Shard index
+
+        Returns:
+            Path of the shard's JSONL journal
+        """
+        return self.output_dir / f"shard-{shard_index:03d}-of-{self.num_shards:03d}.jsonl"
+
+    def run(
+        self,
+        records: Iterable[Tuple[Any, str]],
+        chunk_size: int = 1000,
+        show_progress: bool = True,
+        **batch_kwargs
+    ) -> Dict[str, Any]:
+        """
+        Process every record across the shard processes and merge the results.
+
+        The records are split in this process and sent to the workers; use
+        run_csv to have each worker read its own shard from a file instead.
+
+        Args:
+            records: Iterable of (id, review_text) pairs, e.g. from
+                DataLoader.get_reviews_with_ids()
+            chunk_size: Number of reviews a shard passes to process_batch at a time
+            show_progress: Whether to show a progress bar of finished shards
+                (workers never draw their own)
+            **batch_kwargs: Extra keyword arguments for process_batch in every
+                shard (rate_limit, max_workers, pack_size, deduplicate)
+
+        Returns:
+            Dict with processed, skipped, duplicate_ids and total counts (see
+            JournaledRunner.run), per-shard counts and the merged pipeline metrics
+        """
+        shards: List[List[Tuple[Any, str]]] = [[] for _ in range(self.num_shards)]
+        keys = RowKeys()
+        order: List[Tuple[Any, int]] = []
+        missing = 0
+        for review_id, review in records:
+            if is_missing_id(review_id):
+                missing += 1
+                continue
+            review_id = normalize_id(review_id)
+            order.append(keys.key(review_id))
+            shards[shard_for_id(review_id, self.num_shards)].append((review_id, review))
+
+        if missing:
+            logger.warning(f"Skipping {missing} reviews without an Id; they cannot be assigned to a shard")
+        logger.info(f"Running {len(order)} reviews in {self.num_shards} shards "
+                   f"({', '.join(str(len(shard)) for shard in shards)} reviews)")
+        return self._execute(shards, None, lambda: order, chunk_size, show_progress, batch_kwargs)
+
+    def run_csv(
+        self,
+        data_path: str,
+        chunk_size: int = 1000,
+        show_progress: bool = True,
+        **batch_kwargs
+    ) -> Dict[str, Any]:
+        """
+        Process every review of a CSV file, each worker streaming its own shard.
+
+        Workers read the file with DataLoader(shard_index=..., num_shards=...),
+        so no review text is sent between processes. The merged results.jsonl
+        follows the file's row order.
+
+        Args:
+            data_path: CSV file with Id and Comment columns (e.g. Dataset_v6.csv)
+            chunk_size: Number of reviews a shard passes to process_batch at a time
+            show_progress: Whether to show a progress bar of finished shards
+            **batch_kwargs: Extra keyword arguments for process_batch in every shard
+
+        Returns:
+            Dict with processed, skipped, duplicate_ids and total counts (see
+            JournaledRunner.run), per-shard counts and the merged pipeline metrics
+        """
+        def order() -> List[Tuple[Any, int]]:
+            keys = RowKeys()
+            return [
+                keys.key(review_id) for review_id, _, _ in DataLoader(data_path).iter_reviews()
+                if not is_missing_id(review_id)
+            ]
+
+        logger.info(f"Running {data_path} in {self.num_shards} shards")
+        shards = [None] * self.num_shards
+        return self._execute(shards, str(data_path), order, chunk_size, show_progress, batch_kwargs)
+
+    def _execute(
+        self,
+        shards: List[Optional[List[Tuple[Any, str]]]],
+        data_path: Optional[str],
+        order: Callable[[], List[Tuple[Any, int]]],
+        chunk_size: int,
+        show_progress: bool,
+        batch_kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run one worker per shard, then merge their results and metrics."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        settings = shard_settings(self.settings, self.num_shards)
+        batch_kwargs["show_progress"] = False
+
+        start_time = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        shard_results: List[Optional[Dict[str, Any]]] = [None] * self.num_shards
+
+        with ProcessPoolExecutor(max_workers=self.num_shards, mp_context=context) as executor:
+            futures = {
+                executor.submit(
+                    _run_shard,
+                    shard_index,
+                    self.num_shards,
+                    settings,
+                    shard,
+                    data_path,
+                    str(self.shard_path(shard_index)),
+                    chunk_size,
+                    self.retry_failed,
+                    batch_kwargs,
+                ): shard_index
+                for shard_index, shard in enumerate(shards)
+            }
+
+            completed = as_completed(futures)
+            if show_progress:
+                completed = tqdm(completed, total=len(futures), desc="Processing shards")
+            for future in completed:
+                shard_index = futures[future]
+                shard_results[shard_index] = future.result()
+                logger.info(f"Shard {shard_index} finished: "
+                           f"{shard_results[shard_index]['processed']} processed, "
+                           f"{shard_results[shard_index]['skipped']} skipped")
+
+        elapsed = time.perf_counter() - start_time
+        metrics = self.merge_metrics(shard_results, elapsed)
+        written = self.merge_results(order())
+
+        summary = {
+            "processed": sum(result["processed"] for result in shard_results),
+            "skipped": sum(result["skipped"] for result in shard_results),
+            "duplicate_ids": sum(result["duplicate_ids"] for result in shard_results),
+            "total": sum(result["total"] for result in shard_results),
+            "results": written,
+            "elapsed_seconds": elapsed,
+            "shards": [
+                {key: result[key] for key in ("shard", "pid", "processed", "skipped", "duplicate_ids", "total")}
+                for result in shard_results
+            ],
+            "metrics": metrics,
+        }
+        self._write_json(self.output_dir / "metrics.json", summary)
+
+        logger.info(f"Sharded run complete in {elapsed:.1f}s: {summary['processed']} processed, "
+                   f"{summary['skipped']} skipped, {written} results in "
+                   f"{self.output_dir / 'results.jsonl'}")
+        return summary
+
+    def merge_metrics(self, shard_results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        """
+        Sum the shard counters and histograms into one metrics report.
+
+        Args:
+            shard_results: Per-shard results in shard order
+            elapsed: Wall time of the run in seconds, for token rates
+
+        Returns:
+            Metrics in the format of ThemeCategorizationPipeline.get_metrics()
+        """
+        return ThemeCategorizationPipeline.merge_raw_metrics(
+            ((result["metrics"], result["histograms"]) for result in shard_results), elapsed
+        )
+
+    def merge_results(self, order: List[Tuple[Any, int]]) -> int:
+        """
+        Write results.jsonl from the shard journals in input order.
+
+        Each row is written once, using the latest journaled record for its
+        (id, occurrence) key. Rows sharing an id all land in one shard in
+        input order, so their occurrences match those of the whole input.
+        The file is replaced atomically.
+
+        Args:
+            order: (normalized id, occurrence) keys in input order, as from ids.RowKeys
+
+        Returns:
+            Number of records written
+        """
+        records: Dict[Tuple[Any, int], Dict[str, Any]] = {}
+        for shard_index in range(self.num_shards):
+            path = self.shard_path(shard_index)
+            if path.exists():
+                with ResultsJournal(str(path)) as journal:
+                    records.update((record_key(record), record) for record in journal.records())
+
+        destination = self.output_dir / "results.jsonl"
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.output_dir), prefix=".results-", suffix=".tmp")
+        written = 0
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for key in order:
+                    record = records.pop(key, None)
+                    if record is not None:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        written += 1
+            os.replace(tmp_path, destination)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return written
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
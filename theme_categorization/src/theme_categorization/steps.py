@@ -0,0 +1,80 @@
+"""
+Run request logic written once for both the sync and async code paths.
+
+The decisions around a request (build it, pick an endpoint, classify an
+error, decide whether and how long to back off, cache the result) are
+written as a generator that yields each piece of I/O it needs as a step
+object and receives the step's result, or has the step's exception raised
+at the yield. run_steps performs the steps by blocking and arun_steps by
+awaiting, so only the waiting differs between the two paths. When a step
+is cancelled (asyncio.CancelledError, KeyboardInterrupt) the generator is
+closed before the cancellation propagates, so its finally blocks release
+whatever it holds.
+"""
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generator, TypeVar
+
+T = TypeVar("T")
+
+Steps = Generator[Any, Any, T]
+
+
+@dataclass
+class Sleep:
+    """Step: wait before continuing, e.g. a retry backoff."""
+
+    seconds: float
+
+
+def run_steps(steps: Steps[T], perform: Callable[[Any], Any]) -> T:
+    """
+    Drive a step generator, performing each step with a blocking call.
+
+    Args:
+        steps: Generator yielding steps and returning the final result
+        perform: Performs one step and returns its result
+
+    Returns:
+        Value returned by the generator
+    """
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.send(reply) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            reply, error = perform(step), None
+        except Exception as e:
+            reply, error = None, e
+        except BaseException:
+            # Cancelled or interrupted: close the generator so its cleanup runs now
+            steps.close()
+            raise
+
+
+async def arun_steps(steps: Steps[T], perform: Callable[[Any], Awaitable[Any]]) -> T:
+    """
+    Drive a step generator, awaiting each step.
+
+    Args:
+        steps: Generator yielding steps and returning the final result
+        perform: Coroutine function that performs one step and returns its result
+
+    Returns:
+        Value returned by the generator
+    """
+    reply, error = None, None
+    while True:
+        try:
+            step = steps.send(reply) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            reply, error = await perform(step), None
+        except Exception as e:
+            reply, error = None, e
+        except BaseException:
+            # Cancelled or interrupted: close the generator so its cleanup runs now
+            steps.close()
+            raise
@@ -0,0 +1,66 @@
+"""
+Incremental JSON detection for streamed LLM completions.
+
+Models often keep generating after the closing brace of the requested
+{"themes": [...]} object. JsonObjectScanner watches streamed text and
+reports as soon as a balanced top-level JSON object has arrived, so the
+stream can be closed early.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JsonObjectScanner:
+    """Tracks brace depth across streamed text chunks, ignoring braces inside strings."""
+
+    def __init__(self):
+        """Initialize an empty scanner."""
+        self._chunks = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    @property
+    def text(self) -> str:
+        """All text received so far, up to and including the closing brace once complete."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Consume the next piece of streamed text.
+
+        Args:
+            chunk: Text delta from the stream
+
+        Returns:
+            True once the first top-level JSON object has been closed
+        """
+        if self.complete:
+            return True
+
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Quotes before the opening brace are prose, not JSON strings
+                self._in_string = self._started
+            elif char == "{":
+                self._started = True
+                self._depth += 1
+            elif char == "}" and self._started:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._chunks.append(chunk[:i + 1])
+                    self.complete = True
+                    return True
+
+        self._chunks.append(chunk)
+        return False
@@ -0,0 +1,342 @@
+"""
+Lightweight nested timing spans for the pipeline stages.
+
+Spans record where a run spends its time (prompt construction, cache,
+rate limiting, the HTTP round trip, response parsing, evaluation). The
+current span is tracked in a contextvar, so nesting follows threads and
+asyncio tasks. When tracing is disabled, Tracer.span returns a shared
+no-op context manager, so instrumented code pays one attribute check.
+
+Finished spans can be written as Chrome trace-event JSON (open in
+chrome://tracing or https://ui.perfetto.dev for a flamegraph view) or as
+OpenTelemetry OTLP/JSON records.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Default cap on retained spans; later spans are dropped and counted
+MAX_SPANS = 1_000_000
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "theme_categorization_span", default=None
+)
+
+
+class Span:
+    """One timed operation; times are Unix epoch nanoseconds."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+        "attributes", "thread_id", "task_id", "_token",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.thread_id = threading.get_ident()
+        self.task_id = _current_task_id()
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (0 while the span is open)."""
+        return max(self.end_ns - self.start_ns, 0) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute, e.g. a status code known only at the end of the span."""
+        self.attributes[key] = value
+
+
+class _ActiveSpan:
+    """Context manager that opens a span on enter and records it on exit."""
+
+    __slots__ = ("_tracer", "_span")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self._span = Span(name, _current_span.get(), attributes)
+
+    def __enter__(self) -> Span:
+        span = self._span
+        span._token = _current_span.set(span)
+        span.start_ns = self._tracer._now_ns()
+        return span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        span = self._span
+        span.end_ns = self._tracer._now_ns()
+        if exc_type is not None:
+            span.attributes["error"] = exc_type.__name__
+        _current_span.reset(span._token)
+        self._tracer._record(span)
+
+
+class _NoopSpan:
+    """Shared context manager used while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _current_task_id() -> Optional[int]:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        return None
+    return id(task) if task is not None else None
+
+
+class Tracer:
+    """Collects finished spans in memory and exports them."""
+
+    def __init__(self, enabled: bool = False, max_spans: int = MAX_SPANS):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Whether spans are recorded
+            max_spans: Maximum number of spans kept in memory
+        """
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.dropped_spans = 0
+
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        # Anchor perf_counter to the wall clock once so span times are monotonic
+        self._epoch_ns = time.time_ns()
+        self._perf_ns = time.perf_counter_ns()
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Time a block as a span nested under the current span.
+
+        Usage:
+            with tracer.span("parse_response", chars=len(content)):
+                ...
+
+        Args:
+            name: Span name
+            **attributes: Attributes recorded with the span
+
+        Returns:
+            Context manager yielding the Span (None when tracing is disabled)
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def get_spans(self) -> List[Span]:
+        """Get the finished spans in completion order."""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        """Discard all recorded spans."""
+        with self._lock:
+            self._spans = []
+            self.dropped_spans = 0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregate span durations by name.
+
+        Returns:
+            Dict mapping span name to count, total and mean seconds
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for span in self.get_spans():
+            entry = totals.setdefault(span.name, {"count": 0, "total": 0.0})
+            entry["count"] += 1
+            entry["total"] += span.duration
+        for entry in totals.values():
+            entry["mean"] = entry["total"] / entry["count"]
+        return totals
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Convert spans to Chrome trace-event format.
+
+        Spans from asyncio tasks are placed on one track per task so
+        concurrent requests do not overlap on a single thread track.
+
+        Returns:
+            Dict with a traceEvents list of complete ("X") events
+        """
+        pid = os.getpid()
+        events = []
+        for span in self.get_spans():
+            events.append({
+                "name": span.name,
+                "cat": "theme_categorization",
+                "ph": "X",
+                "ts": span.start_ns / 1000.0,
+                "dur": (span.end_ns - span.start_ns) / 1000.0,
+                "pid": pid,
+                "tid": span.task_id if span.task_id is not None else span.thread_id,
+                "args": {key: _jsonable(value) for key, value in span.attributes.items()},
+            })
+        events.sort(key=lambda event: event["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otel(self, service_name: str = "theme_categorization") -> Dict[str, Any]:
+        """
+        Convert spans to OpenTelemetry OTLP/JSON (ExportTraceServiceRequest).
+
+        Args:
+            service_name: Value of the service.name resource attribute
+
+        Returns:
+            Dict with resourceSpans, ready to POST to an OTLP/HTTP collector
+        """
+        spans = []
+        for span in self.get_spans():
+            record = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_otel_attribute(key, value) for key, value in span.attributes.items()],
+            }
+            if span.parent_id is not None:
+                record["parentSpanId"] = span.parent_id
+            if "error" in span.attributes:
+                record["status"] = {"code": 2, "message": str(span.attributes["error"])}
+            spans.append(record)
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otel_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }]
+        }
+
+    def write_chrome_trace(self, path: str):
+        """
+        Write spans as Chrome trace-event JSON.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        logger.info(f"Wrote Chrome trace to {path}")
+
+    def write_otel(self, path: str, service_name: str = "theme_categorization"):
+        """
+        Write spans as OpenTelemetry OTLP/JSON.
+
+        Args:
+            path: Output file path
+            service_name: Value of the service.name resource attribute
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_otel(service_name), f)
+        logger.info(f"Wrote OpenTelemetry spans to {path}")
+
+    def _now_ns(self) -> int:
+        return self._epoch_ns + time.perf_counter_ns() - self._perf_ns
+
+    def _record(self, span: Span):
+        with self._lock:
+            if len(self._spans) < self.max_spans:
+                self._spans.append(span)
+                return
+            self.dropped_spans += 1
+            dropped = self.dropped_spans
+        if dropped == 1:
+            logger.warning(f"Tracer span limit ({self.max_spans}) reached; dropping further spans")
+
+
+def _jsonable(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer used by the pipeline instrumentation.
+
+    It is disabled until enable_tracing() is called (the pipeline does so when
+    Settings.trace_enabled is set).
+
+    Returns:
+        Tracer instance
+    """
+    return _tracer
+
+
+def enable_tracing(enabled: bool = True):
+    """
+    Turn span recording on or off for the process-wide tracer.
+
+    Args:
+        enabled: Whether to record spans
+    """
+    _tracer.enabled = enabled
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorate a function so each call is recorded as a span.
+
+    Args:
+        name: Span name (defaults to the function name)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: F) -> F:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
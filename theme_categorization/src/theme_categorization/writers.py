@@ -0,0 +1,596 @@
+"""
+Incremental result writers for long command-line runs.
+
+Results are written as they complete instead of being collected in
+memory. JSONL output uses ResultsJournal, which appends one record per
+review and fsyncs periodically, so it survives a crash mid-run.
+
+ColumnarResultWriter accumulates results in column buffers and flushes
+them as Parquet row groups or Arrow IPC record batches, so predictions
+can be analysed without re-parsing per-review JSON:
+
+    id            int64 (or string)  review Id
+    occurrence    uint32             earlier rows with the same Id (see ids.RowKeys)
+    theme_mask    uint32             bit i set if KEY_THEMES[i] was predicted
+    themes        list<dictionary>   predicted theme names, dictionary-encoded
+    descriptions  list<string>       theme descriptions, aligned with themes
+    latency       float64            seconds to process the review
+    model         dictionary         model that produced the result
+
+read_results() memory-maps the file; Arrow IPC files are read without
+copying or decoding.
+
+Parquet and Arrow IPC files are only readable once their footer is
+written, so rows are not appended to the output in place. Each flush
+writes a complete, fsynced part file to a hidden directory next to the
+output and records it in a manifest there; close() streams the part files,
+a record batch at a time, into the output and removes the directory. A
+run killed before close() loses at most the rows buffered since the last
+flush, and --resume picks up its part files the way ResultsJournal picks
+up a journal.
+
+Both writers expose the same interface (append, flush, close, records and
+completed_keys), so either can be passed to JournaledRunner.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from .constants import KEY_THEMES
+from .ids import normalize_id
+from .journal import ResultsJournal
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar output is optional
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Default number of rows buffered before a part file is written
+ROW_GROUP_SIZE = 10_000
+
+# Default maximum seconds rows stay buffered before a part file is written
+FLUSH_EVERY_SECONDS = 60.0
+
+# Manifest of the part files written so far, kept in the parts directory
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Name of the combined file written by close() before it replaces the output
+COMBINED_NAME = ".combined"
+
+# Output formats by file extension
+COLUMNAR_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+# theme_mask has one bit per key theme
+THEME_BITS = {theme: 1 << index for index, theme in enumerate(KEY_THEMES)}
+assert len(THEME_BITS) <= 32, "theme_mask is a uint32"
+
+
+def theme_mask(themes: Sequence[str]) -> int:
+    """
+    Encode theme names as a bitmask over KEY_THEMES; other names are ignored.
+
+    Args:
+        themes: Theme names
+
+    Returns:
+        Bitmask with bit i set if KEY_THEMES[i] is among themes
+    """
+    mask = 0
+    for theme in themes:
+        mask |= THEME_BITS.get(theme.strip(), 0)
+    return mask
+
+
+def themes_from_mask(mask: int) -> List[str]:
+    """
+    Decode a theme_mask value.
+
+    Args:
+        mask: Bitmask produced by theme_mask
+
+    Returns:
+        Key theme names in KEY_THEMES order
+    """
+    return [theme for theme, bit in THEME_BITS.items() if mask & bit]
+
+
+def read_results(path: str, columns: Optional[List[str]] = None) -> "pa.Table":
+    """
+    Memory-map a columnar results file as an Arrow table.
+
+    Args:
+        path: .parquet, .arrow, .feather or .ipc file written by ColumnarResultWriter
+        columns: Optional subset of columns to read
+
+    Returns:
+        pyarrow Table (call .to_pandas() for a DataFrame)
+    """
+    if pa is None:
+        raise ImportError("Columnar output requires pyarrow (pip install pyarrow)")
+
+    if _columnar_format(path) == "parquet":
+        return pq.read_table(path, columns=columns, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def _columnar_format(path: Union[str, Path]) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported columnar format '{suffix}' (use {', '.join(COLUMNAR_FORMATS)})")
+    return COLUMNAR_FORMATS[suffix]
+
+
+def _with_occurrence(table: "pa.Table") -> "pa.Table":
+    """Add an all-zero occurrence column to a table written before it existed."""
+    if "occurrence" in table.column_names:
+        return table
+    zeros = pa.array([0] * table.num_rows, pa.uint32())
+    return table.add_column(1, pa.field("occurrence", pa.uint32()), zeros)
+
+
+def _read_schema(path: Path) -> "pa.Schema":
+    """Read the schema of a columnar results file without reading its rows."""
+    if _columnar_format(path) == "parquet":
+        schema = pq.read_schema(str(path))
+    else:
+        with pa.memory_map(str(path), "r") as source:
+            schema = pa.ipc.open_file(source).schema
+    if "occurrence" not in schema.names:
+        schema = schema.insert(1, pa.field("occurrence", pa.uint32()))
+    return schema
+
+
+def _count_rows(path: Path) -> int:
+    """Count the rows of a columnar results file from its metadata."""
+    if _columnar_format(path) == "parquet":
+        return pq.read_metadata(str(path)).num_rows
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def _iter_batches(path: Path, batch_size: int) -> Iterator["pa.RecordBatch"]:
+    """
+    Read a columnar results file one record batch at a time.
+
+    Both formats are memory-mapped, so only the row group (Parquet) or
+    record batch (Arrow IPC) being used is decoded or paged in. Files
+    written before the occurrence column existed get an all-zero one.
+    """
+    with pa.memory_map(str(path), "r") as source:
+        if _columnar_format(path) == "parquet":
+            # iter_batches cannot decode the list<dictionary> themes column, so read whole row groups
+            parquet_file = pq.ParquetFile(source)
+            tables = (parquet_file.read_row_group(i) for i in range(parquet_file.num_row_groups))
+        else:
+            reader = pa.ipc.open_file(source)
+            tables = (pa.Table.from_batches([reader.get_batch(i)]) for i in range(reader.num_record_batches))
+        for table in tables:
+            yield from _with_occurrence(table).combine_chunks().to_batches(max_chunksize=batch_size)
+
+
+def parts_dir(path: str) -> Path:
+    """
+    Get the directory holding the part files of a columnar output while it is written.
+
+    Args:
+        path: Columnar output path
+
+    Returns:
+        Path of the hidden parts directory next to path
+    """
+    path = Path(path)
+    return path.with_name(f".{path.name}.parts")
+
+
+def result_output_exists(path: str) -> bool:
+    """
+    Check whether an output file, or the part files of an interrupted columnar run, exist.
+
+    Args:
+        path: Output path
+
+    Returns:
+        True if resuming from path would keep any rows
+    """
+    return Path(path).exists() or (parts_dir(path) / MANIFEST_NAME).exists()
+
+
+class _Dictionary:
+    """Append-only string dictionary, so theme indices stay the same across part files."""
+
+    def __init__(self, values: Sequence[str] = ()):
+        self.values: List[str] = []
+        self._indices: Dict[str, int] = {}
+        for value in values:
+            self.index(value)
+
+    def index(self, value: str) -> int:
+        index = self._indices.get(value)
+        if index is None:
+            index = self._indices[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def array(self, indices: Union[List[int], "pa.Array"]) -> "pa.DictionaryArray":
+        if not isinstance(indices, pa.Array):
+            indices = pa.array(indices, pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, pa.string()))
+
+    def recode(self, array: "pa.DictionaryArray") -> "pa.DictionaryArray":
+        """Re-encode a dictionary array against this dictionary, adding its values."""
+        mapping = pa.array([self.index(value) for value in array.dictionary.to_pylist()], pa.int32())
+        return self.array(pc.take(mapping, array.indices))
+
+
+class ColumnarResultWriter:
+    """Buffers results in columns and writes them to Parquet or Arrow IPC as durable part files."""
+
+    def __init__(
+        self,
+        path: str,
+        model: Optional[str] = None,
+        resume: bool = False,
+        row_group_size: int = ROW_GROUP_SIZE,
+        flush_interval: float = FLUSH_EVERY_SECONDS
+    ):
+        """
+        Open the writer.
+
+        Each flush writes a complete part file to the parts directory next to
+        path (see parts_dir) and records it in the manifest there. close()
+        combines the existing rows and the parts into path. With resume, the
+        parts of a run that crashed before close() are picked up again.
+
+        Args:
+            path: Destination file; the extension selects Parquet (.parquet)
+                or Arrow IPC (.arrow, .feather, .ipc)
+            model: Model name stored with every row
+            resume: Whether to keep the rows of an existing file at path and
+                of an interrupted run
+            row_group_size: Rows buffered before a part file is written
+            flush_interval: Seconds after which buffered rows are written
+                even if fewer than row_group_size
+        """
+        if pa is None:
+            raise ImportError("Columnar output requires pyarrow (pip install pyarrow)")
+
+        self.path = Path(path)
+        self.format = _columnar_format(path)
+        self.model = model
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self.parts_dir = parts_dir(path)
+        self.schema: Optional["pa.Schema"] = None
+
+        self._manifest_path = self.parts_dir / MANIFEST_NAME
+        self._parts: List[Dict[str, Any]] = []
+        self._base = False  # Whether the rows already at path are part of the output
+        self._theme_names = _Dictionary(KEY_THEMES)
+        self._models = _Dictionary()
+        self._closed = False
+        self._last_flush = time.monotonic()
+        self._reset_buffers()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._recover(resume)
+        if self._base or self._parts:
+            self.schema = _read_schema(self._sources()[0])
+            logger.info(f"Resuming {self.path} with {self.rows} existing rows "
+                       f"({len(self._parts)} part files from an interrupted run)")
+
+    def __enter__(self) -> "ColumnarResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        """Number of rows written so far, including the existing rows kept on resume."""
+        base_rows = _count_rows(self.path) if self._base else 0
+        return base_rows + sum(part["rows"] for part in self._parts)
+
+    def append(
+        self,
+        review_id: Any,
+        result: Dict[str, Any],
+        latency: Optional[float] = None,
+        occurrence: int = 0
+    ):
+        """
+        Buffer a completed result, writing a part file once the buffer is full
+        or flush_interval has passed.
+
+        Args:
+            review_id: Id of the review (e.g. the CSV Id column)
+            result: Result dict returned by the pipeline
+            latency: Optional processing time in seconds
+            occurrence: Number of earlier input rows with the same id
+        """
+        themes = result.get("themes", [])
+        names = [str(theme.get("theme", "")) for theme in themes]
+
+        self._ids.append(normalize_id(review_id))
+        self._occurrences.append(occurrence)
+        self._masks.append(theme_mask(names))
+        self._theme_offsets.append(self._theme_offsets[-1] + len(names))
+        self._theme_indices.extend(self._theme_names.index(name) for name in names)
+        self._descriptions.append([str(theme.get("description", "")) for theme in themes])
+        self._latencies.append(latency)
+        self._model_indices.append(None if self.model is None else self._models.index(self.model))
+
+        if (len(self._ids) >= self.row_group_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self._write_buffers()
+
+    def flush(self):
+        """Write buffered rows as a part file, durable once this returns."""
+        if self._ids:
+            self._write_buffers()
+
+    def close(self):
+        """Write outstanding rows and combine the existing rows and part files into path."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+        if self._base and not self._parts:
+            logger.info(f"No new rows for {self.path}")
+            return
+
+        # The manifest names the combined file before it replaces path, so a
+        # crash between the two is finished on the next open
+        self.parts_dir.mkdir(exist_ok=True)
+        combined = self.parts_dir / f"{COMBINED_NAME}{self.path.suffix}"
+        rows = self._write_combined(combined)
+        self._write_manifest(committing=combined.name)
+        os.replace(combined, self.path)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self._base, self._parts = True, []
+        logger.info(f"Wrote {rows} rows to {self.path}")
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the rows written so far, including unclosed part files.
+
+        Yields:
+            Dicts with id, result and latency, like ResultsJournal.records()
+        """
+        for source in self._sources():
+            for batch in _iter_batches(source, self.row_group_size):
+                for row in batch.select(["id", "occurrence", "themes", "descriptions", "latency"]).to_pylist():
+                    themes = [
+                        {"theme": theme, "description": description}
+                        for theme, description in zip(row["themes"], row["descriptions"])
+                    ]
+                    record = {"id": row["id"]}
+                    if row["occurrence"]:
+                        record["occurrence"] = row["occurrence"]
+                    record.update(result={"themes": themes}, latency=row["latency"])
+                    yield record
+
+    def completed_keys(self, include_failed: bool = False) -> Set[Tuple[Any, int]]:
+        """
+        Get the rows written so far, including unclosed part files.
+
+        Args:
+            include_failed: Whether rows whose result has no themes count as done
+
+        Returns:
+            Set of (normalized id, occurrence) keys
+        """
+        keys: Set[Tuple[Any, int]] = set()
+        for source in self._sources():
+            for batch in _iter_batches(source, self.row_group_size):
+                rows = zip(batch.column("id").to_pylist(), batch.column("occurrence").to_pylist())
+                if include_failed:
+                    keys.update(rows)
+                else:
+                    counts = pc.list_value_length(batch.column("themes")).to_pylist()
+                    keys.update(key for key, count in zip(rows, counts) if count)
+        return keys
+
+    @staticmethod
+    def _result_schema(id_type: "pa.DataType") -> "pa.Schema":
+        return pa.schema([
+            ("id", id_type),
+            ("occurrence", pa.uint32()),
+            ("theme_mask", pa.uint32()),
+            ("themes", pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+            ("descriptions", pa.list_(pa.string())),
+            ("latency", pa.float64()),
+            ("model", pa.dictionary(pa.int32(), pa.string())),
+        ])
+
+    def _sources(self) -> List[Path]:
+        """Files holding the rows written so far, in order."""
+        sources = [self.path] if self._base else []
+        return sources + [self.parts_dir / part["file"] for part in self._parts]
+
+    def _recover(self, resume: bool):
+        """Finish an interrupted close, then keep or discard the rows of an interrupted run."""
+        manifest = None
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self._manifest_path}: {e}")
+
+        if manifest is not None and manifest.get("committing"):
+            combined = self.parts_dir / manifest["committing"]
+            if combined.exists():
+                os.replace(combined, self.path)
+            logger.warning(f"Finished an interrupted close of {self.path}")
+            manifest = None
+
+        if (manifest is not None and resume and manifest.get("version") == MANIFEST_VERSION
+                and manifest.get("format") == self.format):
+            self._base = manifest["base"] and self.path.exists()
+            self._parts = [part for part in manifest["parts"] if (self.parts_dir / part["file"]).exists()]
+            if len(self._parts) < len(manifest["parts"]):
+                logger.warning(f"{len(manifest['parts']) - len(self._parts)} part files listed in "
+                              f"{self._manifest_path} are missing")
+            return
+
+        if self.parts_dir.exists():
+            if manifest is not None:
+                logger.warning(f"Discarding {len(manifest['parts'])} part files of an interrupted run "
+                              f"in {self.parts_dir}")
+            shutil.rmtree(self.parts_dir)
+        self._base = resume and self.path.exists()
+
+    def _reset_buffers(self):
+        self._ids: List[Any] = []
+        self._occurrences: List[int] = []
+        self._masks: List[int] = []
+        self._theme_offsets: List[int] = [0]
+        self._theme_indices: List[int] = []
+        self._descriptions: List[List[str]] = []
+        self._latencies: List[Optional[float]] = []
+        self._model_indices: List[Optional[int]] = []
+
+    def _write_file(self, table: "pa.Table", path: Path):
+        """Write a table to path and fsync it."""
+        if self.format == "parquet":
+            pq.write_table(table, path, row_group_size=self.row_group_size)
+        else:
+            with pa.ipc.new_file(str(path), table.schema) as writer:
+                writer.write_table(table, max_chunksize=self.row_group_size)
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+
+    def _write_combined(self, path: Path) -> int:
+        """
+        Stream the existing rows and part files into one file at path and fsync it.
+
+        Sources are copied a record batch at a time, so memory stays at about
+        one row group however large the output is. Dictionary columns are
+        re-encoded against the writer's append-only dictionaries, so each
+        batch only extends the previous dictionary (an Arrow IPC file cannot
+        replace one).
+
+        Returns:
+            Number of rows written
+        """
+        if self.schema is None:
+            self.schema = self._result_schema(pa.int64())
+        if self.format == "parquet":
+            writer = pq.ParquetWriter(str(path), self.schema)
+        else:
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            writer = pa.ipc.new_file(str(path), self.schema, options=options)
+
+        rows = 0
+        try:
+            for source in self._sources():
+                for batch in _iter_batches(source, self.row_group_size):
+                    themes = batch.column("themes")
+                    batch = pa.RecordBatch.from_arrays([
+                        batch.column("id").cast(self.schema.field("id").type),
+                        batch.column("occurrence").cast(pa.uint32()),
+                        batch.column("theme_mask"),
+                        pa.ListArray.from_arrays(themes.offsets, self._theme_names.recode(themes.values)),
+                        batch.column("descriptions"),
+                        batch.column("latency"),
+                        self._models.recode(batch.column("model")),
+                    ], schema=self.schema)
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        finally:
+            writer.close()
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+        return rows
+
+    def _write_manifest(self, committing: Optional[str] = None):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "format": self.format,
+            "base": self._base,
+            "parts": self._parts,
+            "committing": committing,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.parts_dir), prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._manifest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _write_buffers(self):
+        ids = pa.array(self._ids)
+        if self.schema is None:
+            self.schema = self._result_schema(ids.type)
+        themes = pa.ListArray.from_arrays(
+            pa.array(self._theme_offsets, pa.int32()), self._theme_names.array(self._theme_indices)
+        )
+        model_indices = pa.array(self._model_indices, pa.int32())
+        models = pa.DictionaryArray.from_arrays(model_indices, pa.array(self._models.values, pa.string()))
+
+        table = pa.Table.from_arrays([
+            ids.cast(self.schema.field("id").type),
+            pa.array(self._occurrences, pa.uint32()),
+            pa.array(self._masks, pa.uint32()),
+            themes,
+            pa.array(self._descriptions, pa.list_(pa.string())),
+            pa.array(self._latencies, pa.float64()),
+            models,
+        ], schema=self.schema)
+
+        # The part file is complete before the manifest lists it
+        self.parts_dir.mkdir(exist_ok=True)
+        name = f"part-{len(self._parts):06d}{self.path.suffix}"
+        tmp_path = self.parts_dir / f".{name}.tmp"
+        self._write_file(table, tmp_path)
+        os.replace(tmp_path, self.parts_dir / name)
+        self._parts.append({"file": name, "rows": table.num_rows})
+        self._write_manifest()
+        self._reset_buffers()
+        self._last_flush = time.monotonic()
+
+
+def open_result_writer(
+    path: str,
+    resume: bool = False,
+    model: Optional[str] = None
+) -> Union[ResultsJournal, ColumnarResultWriter]:
+    """
+    Open a result writer for the output format implied by the file extension.
+
+    Args:
+        path: Output path ending in .jsonl, .parquet, .arrow, .feather or .ipc
+        resume: Whether to keep results already in the file (JSONL output is
+            always appended to)
+        model: Model name stored with columnar results
+
+    Returns:
+        ResultsJournal for .jsonl, ColumnarResultWriter otherwise
+
+    Raises:
+        ValueError: If the extension is not supported
+    """
+    if Path(path).suffix.lower() == ".jsonl":
+        return ResultsJournal(path)
+    return ColumnarResultWriter(path, model=model, resume=resume)
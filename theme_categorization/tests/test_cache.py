@@ -0,0 +1,71 @@
+"""Tests for the SQLite response cache: hits, misses, expiry and eviction."""
+from types import SimpleNamespace
+
+import pytest
+
+from theme_categorization import cache as cache_module
+from theme_categorization.cache import ResponseCache
+
+RESULT = {"themes": [{"theme": "emergency", "description": "Long wait"}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_hit_and_miss_are_counted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    key = ResponseCache.make_key("m", "prompt", 0.0, 512)
+
+    assert cache.get(key) is None
+    cache.put(key, RESULT)
+    assert cache.get(key) == RESULT
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_key_covers_every_request_parameter():
+    key = ResponseCache.make_key("m", "prompt", 0.0, 512)
+    assert key == ResponseCache.make_key("m", "prompt", 0.0, 512)
+    assert len({
+        key,
+        ResponseCache.make_key("other", "prompt", 0.0, 512),
+        ResponseCache.make_key("m", "other prompt", 0.0, 512),
+        ResponseCache.make_key("m", "prompt", 0.7, 512),
+        ResponseCache.make_key("m", "prompt", 0.0, 256),
+    }) == 5
+
+
+def test_entries_persist_across_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put("key", RESULT)
+    cache.close()
+
+    assert ResponseCache(path).get("key") == RESULT
+
+
+def test_expired_entries_miss_and_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_age_seconds=60)
+    cache.put("old", RESULT)
+    clock.value += 30
+    cache.put("new", RESULT)
+    clock.value += 45
+
+    assert cache.get("old") is None, "75s old with a 60s limit"
+    assert cache.get("new") == RESULT
+    assert len(cache) == 2, "expired entries stay until evicted"
+    assert cache.evict() == 1
+    assert len(cache) == 1
+
+
+def test_eviction_keeps_the_newest_entries(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, RESULT)
+        clock.value += 1
+
+    assert cache.evict() == 1
+    assert [cache.get(key) is not None for key in ("a", "b", "c")] == [False, True, True]
@@ -0,0 +1,72 @@
+"""Tests for resuming and overwriting command-line runs against the fake server."""
+import json
+
+import pytest
+
+from theme_categorization import cli
+from theme_categorization.fake_server import FakeLLMServer, FakeServerConfig
+from theme_categorization.settings import Settings
+from theme_categorization.writers import read_results
+
+COMMENTS = ["The food was cold.", "Nurses were kind.", "Long wait in emergency.", "Clean room.", "Rude staff."]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=0.0)) as fake:
+        monkeypatch.setattr(cli, "Settings", lambda: Settings(
+            hf_token="dummy_token", vllm_base_url=fake.url, vllm_base_urls=[],
+            rate_limit_delay=0, cache_path=None, metrics_port=0, metrics_textfile=None,
+        ))
+        yield fake
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "reviews.csv"
+    # Id 2 repeats, so rows are told apart by occurrence
+    rows = [f'{review_id},"{comment}"' for review_id, comment in zip([1, 2, 3, 2, 4], COMMENTS)]
+    path.write_text("Id,Comment\n" + "\n".join(rows) + "\n")
+    return path
+
+
+def run(data, output, *flags):
+    metrics = output.parent / "metrics.json"
+    argv = [str(data), "--output", str(output), "--no-progress", "--metrics-output", str(metrics), *flags]
+    assert cli.main(argv) == 0
+    return json.loads(metrics.read_text())
+
+
+def keys(output):
+    if output.suffix == ".jsonl":
+        with open(output, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        return [(record["id"], record.get("occurrence", 0)) for record in records]
+    table = read_results(str(output))
+    return list(zip(table.column("id").to_pylist(), table.column("occurrence").to_pylist()))
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".parquet"])
+def test_resume_skips_rows_already_in_the_output(server, data, tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    output = tmp_path / f"results{suffix}"
+
+    first = run(data, output, "--limit", "3")
+    assert (first["processed"], first["skipped"]) == (3, 0)
+
+    with pytest.raises(SystemExit):
+        run(data, output)
+
+    resumed = run(data, output, "--resume")
+    assert (resumed["processed"], resumed["skipped"]) == (2, 3)
+    assert sorted(keys(output)) == [(1, 0), (2, 0), (2, 1), (3, 0), (4, 0)]
+
+
+def test_overwrite_replaces_the_output(server, data, tmp_path):
+    output = tmp_path / "results.jsonl"
+    run(data, output)
+
+    report = run(data, output, "--overwrite", "--start", "3")
+    assert (report["processed"], report["skipped"]) == (2, 0)
+    assert keys(output) == [(2, 1), (4, 0)], "occurrences count the rows before --start"
@@ -0,0 +1,78 @@
+"""Tests for the columnar CSV cache and its invalidation."""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from theme_categorization.csv_cache import cache_paths, read_csv_cached  # noqa: E402
+
+CSV = "Id,Hospital,Year,Comment\n1,Trillium,2019,Great nurses\n2,Bluewater,,Cold food\n3,Trillium,2020,Long wait\n"
+DTYPE = {"Hospital": "category", "Year": "Int16"}
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "reviews.csv"
+    path.write_text(CSV)
+    return path
+
+
+def cached_columns(source):
+    with open(cache_paths(str(source))["meta"], encoding="utf-8") as f:
+        return json.load(f)["columns"]
+
+
+def test_reads_like_read_csv(source):
+    expected = pd.read_csv(source).astype(DTYPE)
+    pd.testing.assert_frame_equal(read_csv_cached(str(source), dtype=DTYPE), expected)
+    pd.testing.assert_frame_equal(read_csv_cached(str(source), dtype=DTYPE), expected)
+
+    columns = ["Comment", "Year"]
+    pd.testing.assert_frame_equal(
+        read_csv_cached(str(source), usecols=columns, dtype=DTYPE), expected[columns]
+    )
+
+
+def test_caches_only_requested_columns_and_grows_to_the_union(source):
+    read_csv_cached(str(source), usecols=["Id", "Comment"])
+    assert cached_columns(source) == ["Id", "Comment"]
+
+    df = read_csv_cached(str(source), usecols=["Id", "Hospital"], dtype=DTYPE)
+    assert list(df.columns) == ["Id", "Hospital"]
+    assert cached_columns(source) == ["Id", "Hospital", "Comment"]
+
+    read_csv_cached(str(source))
+    assert cached_columns(source) is None
+
+
+def test_changed_contents_invalidate_the_cache(source):
+    read_csv_cached(str(source), usecols=["Id", "Comment"])
+    stat = source.stat()
+    # Same size, so only the hash can tell the files apart
+    source.write_text(CSV.replace("Great nurses", "Rude doctors"))
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    df = read_csv_cached(str(source), usecols=["Id", "Comment"])
+    assert df["Comment"].tolist()[0] == "Rude doctors"
+
+
+def test_touched_file_keeps_the_cache(source):
+    read_csv_cached(str(source), usecols=["Id", "Comment"])
+    data_path = cache_paths(str(source))["data"]
+    built = data_path.stat().st_mtime_ns
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert read_csv_cached(str(source), usecols=["Id", "Comment"])["Id"].tolist() == [1, 2, 3]
+    assert data_path.stat().st_mtime_ns == built, "an unchanged file is not re-parsed"
+
+
+def test_appended_rows_invalidate_the_cache(source):
+    read_csv_cached(str(source), usecols=["Id"])
+    with open(source, "a") as f:
+        f.write("4,Bluewater,2021,Clean rooms\n")
+
+    assert read_csv_cached(str(source), usecols=["Id"])["Id"].tolist() == [1, 2, 3, 4]
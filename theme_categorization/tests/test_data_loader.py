@@ -0,0 +1,86 @@
+"""Tests for DataLoader and its helpers."""
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from theme_categorization.data_loader import DataLoader, ReviewPairs, shard_for_id
+from theme_categorization.ids import is_missing_id, normalize_id
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=["Id", "Comment", "ProcessedCode"]).to_csv(path, index=False)
+    return str(path)
+
+
+def test_ground_truth_getter_returns_a_list_and_review_pairs_a_view(tmp_path):
+    path = write_csv(tmp_path / "reviews.csv", [
+        (1, "Kind nurses", "A1"),
+        (2, "Cold food", None),
+        (3, "   ", "B2"),
+        (4, "Long wait", "nan"),
+        (5, "Clean room", "C3"),
+    ])
+    loader = DataLoader(path, use_cache=False)
+
+    reviews = loader.get_reviews_with_ground_truth()
+    assert isinstance(reviews, list)
+    assert reviews == [("Kind nurses", "A1"), ("Clean room", "C3")]
+    assert loader.get_reviews_with_ground_truth(limit=1) == [("Kind nurses", "A1")]
+
+    pairs = loader.get_review_pairs()
+    assert isinstance(pairs, ReviewPairs)
+    assert pairs == reviews and pairs[1] == ("Clean room", "C3")
+    assert pairs.codes.tolist() == ["A1", "C3"]
+    assert len(loader.get_reviews_with_ground_truth(include_empty_ground_truth=True)) == 4
+
+
+def test_shard_for_id_is_pinned_and_ignores_the_hash_seed():
+    ids = [0, 1, 2, 3, "abc", 7]
+    # Changing these values moves rows between shards of existing runs
+    assert [shard_for_id(review_id, 4) for review_id in ids] == [1, 2, 0, 1, 1, 2]
+    assert shard_for_id(np.int64(7), 4) == shard_for_id(7, 4)
+
+    code = "from theme_categorization.data_loader import shard_for_id; print([shard_for_id(i, 4) for i in (0, 1, 2, 3, 'abc', 7)])"
+    for seed in ("1", "2"):
+        output = subprocess.run(
+            [sys.executable, "-c", code], env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        assert output.strip() == "[1, 2, 0, 1, 1, 2]"
+
+    with pytest.raises(ValueError):
+        shard_for_id(1, 0)
+
+
+def test_sharded_loaders_partition_the_rows(tmp_path):
+    path = write_csv(tmp_path / "reviews.csv", [(i % 7, f"review {i}", "A1") for i in range(50)])
+    shards = [
+        list(DataLoader(path, use_cache=False, shard_index=index, num_shards=3).iter_reviews())
+        for index in range(3)
+    ]
+
+    assert sorted(review for shard in shards for _, review, _ in shard) == sorted(f"review {i}" for i in range(50))
+    for index, shard in enumerate(shards):
+        assert all(shard_for_id(review_id, 3) == index for review_id, _, _ in shard)
+
+
+def test_appending_a_row_without_an_id_keeps_the_shards(tmp_path):
+    rows = [(i, f"review {i}", "A1") for i in range(40)]
+    path = write_csv(tmp_path / "reviews.csv", rows)
+    before = [review_id for review_id, _, _ in DataLoader(path, use_cache=False, shard_index=0, num_shards=4).iter_reviews()]
+
+    write_csv(tmp_path / "reviews.csv", rows + [(None, "no id", "A1")])
+    loader = DataLoader(path, use_cache=False, shard_index=0, num_shards=4)
+    after = [review_id for review_id, _, _ in loader.iter_reviews()]
+    assert after == before
+    assert loader.load_data(["Comment"]).shape[0] == len(before)
+
+    assert shard_for_id(106.0, 8) == shard_for_id(106, 8) == shard_for_id(np.float64(106), 8)
+    assert type(normalize_id(np.float64(106))) is int and normalize_id(1.5) == "1.5"
+    assert is_missing_id(None) and is_missing_id(np.nan) and not is_missing_id(0)
+    with pytest.raises(ValueError):
+        shard_for_id(float("nan"), 8)
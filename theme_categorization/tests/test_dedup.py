@@ -0,0 +1,23 @@
+"""Tests for duplicate review detection."""
+from theme_categorization.dedup import ReviewDeduplicator, normalize_review
+
+
+def test_redaction_runs_of_any_length_normalize_alike():
+    assert normalize_review("Dr. XXXXX was  great") == normalize_review("dr. xxxxxxxxx was great")
+    assert normalize_review("Seen by XX, then XXXX.") == "seen by xx, then xx."
+
+
+def test_words_containing_x_runs_are_untouched():
+    assert normalize_review("Staff were vaxxed") == "staff were vaxxed"
+    assert normalize_review("Unvaxxed visitors, Exxon lot") == "unvaxxed visitors, exxon lot"
+    assert normalize_review("staff were vaxxed") != normalize_review("staff were vaxx")
+
+
+def test_deduplicate_and_expand():
+    dedup = ReviewDeduplicator()
+    unique, index_map = dedup.deduplicate(["Great care", "great  care ", "Nurse XXXX was kind", "Nurse XX was kind"])
+    assert unique == ["Great care", "Nurse XXXX was kind"]
+    assert index_map == [0, 0, 1, 1]
+
+    results = dedup.expand([{"themes": ["a"]}, {"themes": []}], index_map)
+    assert results[1] == {"themes": ["a"]} and results[1] is not results[0]
@@ -0,0 +1,89 @@
+"""Tests for the OpenMetrics and Prometheus text rendering of pipeline metrics."""
+import urllib.request
+from types import SimpleNamespace
+
+from theme_categorization.exporter import OPENMETRICS_CONTENT_TYPE, MetricsExporter
+
+METRICS = {
+    "total_reviews": 3,
+    "cache_hit_rate": 0.25,
+    "api_errors": 2,
+    "histograms": {
+        "latency": {"p50": 0.5, "p95": 1.5, "p99": float("inf"), "sum": 2.75, "count": 3},
+    },
+}
+
+
+def exporter():
+    return MetricsExporter(SimpleNamespace(get_metrics=lambda: METRICS), prefix="test")
+
+
+def families(text):
+    """Map each declared metric family to its type and sample lines."""
+    declared = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ")
+            declared[name] = {"type": metric_type, "samples": []}
+        elif line and not line.startswith("#"):
+            sample_name = line.split("{")[0].split(" ")[0]
+            family = max((name for name in declared if sample_name.startswith(name)), key=len)
+            declared[family]["samples"].append(line)
+    return declared
+
+
+def test_openmetrics_names_counter_families_without_the_total_suffix():
+    text = exporter().render()
+    lines = text.splitlines()
+
+    assert lines[-1] == "# EOF" and text.endswith("\n")
+    assert lines[lines.index("# TYPE test_total_reviews counter") - 1] == "# HELP test_total_reviews Reviews processed"
+    declared = families(text)
+    assert declared["test_total_reviews"]["samples"] == ["test_total_reviews_total 3"]
+    assert 'test_request_errors_total{class="api"} 2' in declared["test_request_errors"]["samples"]
+    assert declared["test_cache_hit_rate"] == {"type": "gauge", "samples": ["test_cache_hit_rate 0.25"]}
+
+
+def test_prometheus_format_names_counters_with_the_total_suffix():
+    text = exporter().render(openmetrics=False)
+
+    assert "# EOF" not in text
+    assert "# TYPE test_total_reviews_total counter" in text
+    assert "test_total_reviews_total 3" in text
+
+
+def test_histograms_are_exported_as_summaries():
+    samples = families(exporter().render())["test_request_latency_seconds"]
+    assert samples["type"] == "summary"
+    assert samples["samples"] == [
+        'test_request_latency_seconds{quantile="0.5"} 0.5',
+        'test_request_latency_seconds{quantile="0.95"} 1.5',
+        'test_request_latency_seconds{quantile="0.99"} +Inf',
+        "test_request_latency_seconds_sum 2.75",
+        "test_request_latency_seconds_count 3",
+    ]
+    assert "test_request_retries_per_request" not in families(exporter().render()), "absent histograms are skipped"
+
+
+def test_http_server_negotiates_the_format():
+    metrics = exporter()
+    port = metrics.start_http_server(0, host="127.0.0.1")
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/metrics", headers={"Accept": "application/openmetrics-text"}
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.headers["Content-Type"] == OPENMETRICS_CONTENT_TYPE
+            assert response.read().decode().endswith("# EOF\n")
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    finally:
+        metrics.stop()
+
+
+def test_textfile_uses_the_prometheus_format(tmp_path):
+    path = tmp_path / "metrics" / "pipeline.prom"
+    exporter().write_textfile(str(path))
+
+    assert path.read_text() == exporter().render(openmetrics=False)
+    assert [p.name for p in path.parent.iterdir()] == ["pipeline.prom"]
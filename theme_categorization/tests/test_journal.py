@@ -0,0 +1,114 @@
+"""Tests for the write-ahead results journal and JournaledRunner."""
+import json
+
+import pytest
+
+from theme_categorization.journal import JournaledRunner, ResultsJournal, record_key
+
+
+class FakePipeline:
+    """Stands in for ThemeCategorizationPipeline.process_batch and records what it was given."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.seen = []
+
+    def process_batch(self, reviews, on_result=None, **kwargs):
+        results = []
+        for index, review in enumerate(reviews):
+            self.seen.append(review)
+            themes = [] if review in self.fail else [{"theme": "Staff", "description": review}]
+            result = {"themes": themes}
+            on_result(index, result, 0.01)
+            results.append(result)
+        return results
+
+
+def themes(review):
+    return {"themes": [{"theme": "Staff", "description": review}]}
+
+
+def test_append_and_read_back(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultsJournal(str(path)) as journal:
+        journal.append(1, themes("a"), latency=0.5)
+        journal.append(1, themes("b"), occurrence=1)
+
+    records = list(ResultsJournal(str(path)).records())
+    assert [record_key(record) for record in records] == [(1, 0), (1, 1)]
+    assert "occurrence" not in records[0]
+    assert records[0]["latency"] == 0.5
+
+
+def test_torn_final_line_is_truncated(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultsJournal(str(path)) as journal:
+        journal.append(1, themes("a"))
+        journal.append(2, themes("b"))
+    complete = path.read_bytes()
+    with open(path, "ab") as f:
+        f.write(b'{"id": 3, "result": {"the')
+
+    with ResultsJournal(str(path)) as journal:
+        assert path.read_bytes() == complete
+        journal.append(3, themes("c"))
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+
+def test_torn_line_without_any_newline(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_bytes(b'{"id": 1, "res')
+    ResultsJournal(str(path)).close()
+    assert path.read_bytes() == b""
+
+
+def test_resume_skips_journaled_rows_and_retries_failures(tmp_path):
+    path = tmp_path / "results.jsonl"
+    records = [(1, "a"), (2, "b"), (3, "c")]
+
+    with ResultsJournal(str(path)) as journal:
+        counts = JournaledRunner(FakePipeline(fail={"b"}), journal).run(records[:2])
+    assert counts == {"processed": 2, "skipped": 0, "duplicate_ids": 0, "total": 2}
+
+    pipeline = FakePipeline()
+    with ResultsJournal(str(path)) as journal:
+        counts = JournaledRunner(pipeline, journal).run(records)
+        results = journal.load_results()
+    assert pipeline.seen == ["b", "c"]
+    assert counts["skipped"] == 1
+    assert results[(2, 0)]["themes"], "the retried result replaces the failed one"
+
+
+def test_resume_keeps_failures_without_retry_failed(tmp_path):
+    path = tmp_path / "results.jsonl"
+    with ResultsJournal(str(path)) as journal:
+        JournaledRunner(FakePipeline(fail={"b"}), journal).run([(1, "a"), (2, "b")])
+
+    pipeline = FakePipeline()
+    with ResultsJournal(str(path)) as journal:
+        counts = JournaledRunner(pipeline, journal, retry_failed=False).run([(1, "a"), (2, "b")])
+    assert pipeline.seen == []
+    assert counts["skipped"] == 2
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_rows_sharing_an_id_are_all_processed(tmp_path, chunk_size):
+    path = tmp_path / "results.jsonl"
+    records = [(0, "first"), (7, "other"), (0, "second"), (0, "third")]
+
+    pipeline = FakePipeline()
+    with ResultsJournal(str(path)) as journal:
+        counts = JournaledRunner(pipeline, journal).run(records, chunk_size=chunk_size)
+        results = journal.load_results()
+    assert pipeline.seen == ["first", "other", "second", "third"]
+    assert counts == {"processed": 4, "skipped": 0, "duplicate_ids": 2, "total": 4}
+    assert results[(0, 2)]["themes"][0]["description"] == "third"
+
+    # Resuming with the same rows processes nothing again
+    pipeline = FakePipeline()
+    with ResultsJournal(str(path)) as journal:
+        counts = JournaledRunner(pipeline, journal).run(records + [(0, "fourth")])
+    assert pipeline.seen == ["fourth"]
+    assert counts["skipped"] == 4
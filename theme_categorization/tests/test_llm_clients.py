@@ -0,0 +1,136 @@
+"""Tests for streamed completions, token usage and the shared retry loop."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from theme_categorization.fake_server import FakeLLMServer, FakeServerConfig
+from theme_categorization.llm_clients import AsyncHuggingFaceClient, HuggingFaceClient, RequestStats
+from theme_categorization.settings import Settings
+
+
+def settings(url="http://localhost:1/v1", **overrides):
+    return Settings(hf_token="dummy_token", vllm_base_url=url, vllm_base_urls=[],
+                    rate_limit_delay=0, stream=True, **overrides)
+
+
+def chunk(content=None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStream:
+    """Iterable stand-in for an OpenAI chunk stream that remembers how far it was read."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for item in self.chunks:
+            self.read += 1
+            yield item
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, stream):
+        self.stream = stream
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        return self.stream
+
+
+def stream_completion(chunks):
+    stream = FakeStream(chunks)
+    completions = FakeCompletions(stream)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    stats = RequestStats(model="m", endpoint="e", prompt_tokens=99, completion_tokens=99)
+    text = HuggingFaceClient(settings())._stream_completion(client, {"model": "m"}, stats)
+    return text, stats, stream, completions.kwargs
+
+
+def test_stream_requests_usage_and_reads_it_after_the_object():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=5)
+    text, stats, stream, kwargs = stream_completion([
+        chunk('{"themes":'), chunk(" []}"), chunk("\n"), chunk(""), chunk(usage=usage),
+    ])
+
+    assert kwargs["stream_options"] == {"include_usage": True}
+    assert text == '{"themes": []}'
+    assert (stats.prompt_tokens, stats.completion_tokens) == (12, 5)
+    assert stream.closed
+
+
+def test_stream_closed_early_reports_usage_as_unavailable():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=500)
+    text, stats, stream, _ = stream_completion([
+        chunk('{"themes": []}'), chunk(" Note: the review"), chunk(" is short."), chunk(usage=usage),
+    ])
+
+    assert text == '{"themes": []}'
+    assert stream.read == 2, "the stream is closed at the first content after the object"
+    assert (stats.prompt_tokens, stats.completion_tokens) == (None, None)
+
+
+def test_streamed_requests_against_the_fake_server_report_tokens():
+    requests = []
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=0.0)) as server:
+        client = HuggingFaceClient(settings(server.url))
+        client.add_request_listener(requests.append)
+        result = client.extract_themes("The nurses were kind and the food was cold.")
+
+    assert "themes" in result
+    assert requests[0].streamed
+    assert requests[0].prompt_tokens > 0 and requests[0].completion_tokens > 0
+
+
+def extract(mode, client_settings, review):
+    """Extract themes through the sync or the async client, returning (result, request stats)."""
+    requests = []
+    if mode == "sync":
+        client = HuggingFaceClient(client_settings)
+        client.add_request_listener(requests.append)
+        result = client.extract_themes(review)
+    else:
+        client = AsyncHuggingFaceClient(client_settings)
+        client.add_request_listener(requests.append)
+        result = asyncio.run(client.aextract_themes(review))
+    return result, requests[0]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_sync_and_async_clients_share_the_retry_loop(mode):
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=0.0, server_error_rate=1.0)) as server:
+        result, stats = extract(mode, settings(server.url, retry_base_delay=0.0), "The food was cold.")
+    assert result == {"themes": []}
+    assert (stats.attempts, stats.success, stats.errors) == (3, False, {"api": 3})
+
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=0.0)) as server:
+        result, stats = extract(mode, settings(server.url), "The food was cold.")
+    assert result["themes"]
+    assert (stats.attempts, stats.success, stats.errors) == (1, True, {})
+
+
+@pytest.mark.parametrize("probe", [False, True])
+def test_cancelled_request_releases_the_endpoint_and_probe(probe):
+    async def cancel(client):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.aextract_themes("The food was cold."), timeout=0.2)
+
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=1.0, latency_distribution="constant")) as server:
+        client = AsyncHuggingFaceClient(
+            settings(server.url, circuit_failure_threshold=1, circuit_reset_timeout=0.0)
+        )
+        endpoint = client.endpoint_pool.endpoints[0]
+        if probe:
+            endpoint.circuit_breaker.record_failure()  # Open; with no reset timeout the next request probes
+        asyncio.run(cancel(client))
+
+        assert endpoint.outstanding == 0
+        assert endpoint.circuit_breaker.allow_request(), "another request may probe or be sent"
@@ -0,0 +1,91 @@
+"""Tests for least-outstanding load balancing and ejection of failing endpoints."""
+from types import SimpleNamespace
+
+import pytest
+
+from theme_categorization import retry
+from theme_categorization.load_balancer import Endpoint, EndpointPool
+from theme_categorization.retry import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=100.0)
+    monkeypatch.setattr(retry, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def pool(*urls):
+    return EndpointPool([
+        Endpoint(url, client=None, circuit_breaker=CircuitBreaker(url, failure_threshold=2, reset_timeout=10.0))
+        for url in urls
+    ])
+
+
+def fail(endpoint_pool, endpoint):
+    endpoint_pool.release(endpoint, 0.0, error=True)
+    endpoint.circuit_breaker.record_failure()
+
+
+def test_prefers_the_endpoint_with_fewest_requests_in_flight():
+    endpoint_pool = pool("a", "b")
+    first = endpoint_pool.acquire()
+    second = endpoint_pool.acquire()
+    assert {first.url, second.url} == {"a", "b"}
+
+    endpoint_pool.release(first, 0.5)
+    assert endpoint_pool.acquire() is first
+    assert endpoint_pool.get_stats()[first.url]["ewma_latency"] == 0.5
+
+
+def test_failing_endpoint_is_ejected_and_readmitted_after_a_probe(clock):
+    endpoint_pool = pool("a", "b")
+    a, b = endpoint_pool.endpoints
+    for _ in range(2):
+        fail(endpoint_pool, endpoint_pool.acquire(avoid=b))
+    assert a.circuit_breaker.state == CircuitBreaker.OPEN
+
+    assert {endpoint_pool.acquire().url for _ in range(4)} == {"b"}, "ejected while its circuit is open"
+    assert endpoint_pool.remaining_open_time() == 0.0, "b can still take requests"
+
+    clock.value += 10
+    probe = endpoint_pool.acquire()
+    assert probe is a, "a half-open endpoint gets a probe before healthy ones"
+    assert endpoint_pool.acquire() is b, "only one probe at a time"
+
+    endpoint_pool.release(probe, 0.1)
+    probe.circuit_breaker.record_success()
+    assert a.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert endpoint_pool.acquire() is a, "re-admitted with the fewest requests in flight"
+
+
+def test_failed_probe_ejects_the_endpoint_again(clock):
+    endpoint_pool = pool("a", "b")
+    a, b = endpoint_pool.endpoints
+    a.circuit_breaker.record_failure()
+    a.circuit_breaker.record_failure()
+    clock.value += 10
+
+    fail(endpoint_pool, endpoint_pool.acquire())
+    assert a.circuit_breaker.state == CircuitBreaker.OPEN
+    assert endpoint_pool.acquire() is b
+
+
+def test_no_endpoint_while_every_circuit_is_open(clock):
+    endpoint_pool = pool("a", "b")
+    for endpoint in endpoint_pool.endpoints:
+        endpoint.circuit_breaker.record_failure()
+        endpoint.circuit_breaker.record_failure()
+
+    assert endpoint_pool.acquire() is None
+    clock.value += 4
+    assert endpoint_pool.remaining_open_time() == pytest.approx(6.0)
+
+
+def test_retry_avoids_the_endpoint_that_just_failed():
+    endpoint_pool = pool("a", "b")
+    a, b = endpoint_pool.endpoints
+    assert all(endpoint_pool.acquire(avoid=a) is b for _ in range(3))
+
+    single = pool("a")
+    assert single.acquire(avoid=single.endpoints[0]) is single.endpoints[0], "unless it is the only one"
@@ -0,0 +1,97 @@
+"""Tests for packed processing and re-queueing of reviews missing from a packed response."""
+from theme_categorization.cache import ResponseCache
+from theme_categorization.llm_clients import HuggingFaceClient
+from theme_categorization.pipeline import ThemeCategorizationPipeline
+from theme_categorization.prompt_engineer import ThemeCategorizationPrompt
+from theme_categorization.settings import Settings
+
+
+def settings():
+    return Settings(hf_token="dummy_token", vllm_base_url="http://localhost:1/v1", vllm_base_urls=[],
+                    rate_limit_delay=0, cache_path=None)
+
+
+def themes(review):
+    return {"themes": [{"theme": "emergency", "description": review}]}
+
+
+class FakeClient:
+    """Answers packed prompts for only some of the reviews, and single prompts always."""
+
+    def __init__(self, answer_ids=(), fail=False):
+        self.answer_ids = set(answer_ids)
+        self.fail = fail
+        self.packed_calls = []
+        self.single_calls = []
+
+    def add_request_listener(self, listener):
+        pass
+
+    def extract_themes_packed(self, prompt, num_reviews):
+        self.packed_calls.append(num_reviews)
+        if self.fail:
+            raise RuntimeError("backend went away")
+        return {review_id: themes(f"packed {review_id}") for review_id in self.answer_ids}
+
+    def extract_themes(self, prompt):
+        self.single_calls.append(prompt)
+        return themes("single")
+
+
+def test_reviews_missing_from_a_packed_response_are_requeued():
+    client = FakeClient(answer_ids={1, 3})
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings())
+
+    results = pipeline.process_packed(["first", "second", "third"])
+
+    assert [result["themes"][0]["description"] for result in results] == ["packed 1", "single", "packed 3"]
+    assert client.packed_calls == [3]
+    assert len(client.single_calls) == 1 and "second" in client.single_calls[0]
+    metrics = pipeline.get_metrics()
+    assert (metrics["packed_requests"], metrics["requeued_reviews"], metrics["total_reviews"]) == (1, 1, 3)
+
+
+def test_failed_packed_request_requeues_every_review():
+    client = FakeClient(fail=True)
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings())
+
+    results = pipeline.process_packed(["first", "second"])
+
+    assert all(result["themes"] for result in results)
+    assert len(client.single_calls) == 2
+    assert pipeline.get_metrics()["requeued_reviews"] == 2
+
+
+def test_only_individually_sent_reviews_are_cached(tmp_path):
+    client = FakeClient(answer_ids={1})
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings(), cache=cache)
+
+    pipeline.process_packed(["first", "second"])
+    assert len(cache) == 1, "the packed answer for 'first' is not stored under its single-review key"
+
+    results = pipeline.process_packed(["first", "second"])
+    assert [result["themes"][0]["description"] for result in results] == ["single", "single"]
+    assert client.packed_calls == [2], "'second' is served from the cache, so 'first' is sent on its own"
+    assert len(client.single_calls) == 2
+
+
+def test_batch_in_packs_keeps_input_order():
+    client = FakeClient(answer_ids={2})
+    pipeline = ThemeCategorizationPipeline(client, ThemeCategorizationPrompt(), settings())
+
+    results = pipeline.process_batch(["a", "b", "c", "d", "e"], show_progress=False, rate_limit=False, pack_size=2)
+
+    descriptions = [result["themes"][0]["description"] for result in results]
+    assert descriptions == ["single", "packed 2", "single", "packed 2", "single"]
+    assert client.packed_calls == [2, 2]
+
+
+def test_packed_parser_drops_invalid_and_out_of_range_ids():
+    client = HuggingFaceClient(settings())
+    content = (
+        '{"results": [{"id": 1, "themes": []}, {"id": "2", "themes": []}, {"id": 9, "themes": []},'
+        ' {"id": "x", "themes": []}, {"id": 3}]}'
+    )
+    assert sorted(client._parse_packed_response(content, 3)) == [1, 2]
+    assert client._parse_packed_response("not json", 3) == {}
@@ -0,0 +1,31 @@
+"""Tests for building the rate limiter from settings."""
+import pytest
+
+from theme_categorization.rate_limiter import RateLimiter
+from theme_categorization.settings import Settings
+
+
+def settings(**overrides):
+    return Settings(hf_token="dummy_token", vllm_base_url="http://localhost:1/v1", vllm_base_urls=[], **overrides)
+
+
+def test_delay_is_the_fallback_rate_and_burst_follows_max_workers():
+    limiter = RateLimiter.from_settings(settings(rate_limit_delay=0.5, rate_limit_rps=0, max_workers=8))
+    assert limiter.request_bucket.rate == 2.0
+    assert limiter.request_bucket.capacity == 8
+
+
+def test_explicit_rps_and_burst_win():
+    limiter = RateLimiter.from_settings(
+        settings(rate_limit_delay=1.0, rate_limit_rps=20, rate_limit_burst=3, max_workers=8)
+    )
+    assert (limiter.request_bucket.rate, limiter.request_bucket.capacity) == (20, 3)
+
+
+def test_zero_delay_without_rps_disables_pacing():
+    assert not RateLimiter.from_settings(settings(rate_limit_delay=0, rate_limit_rps=0)).enabled
+
+
+def test_negative_burst_is_rejected():
+    with pytest.raises(ValueError):
+        settings(rate_limit_burst=-1)
@@ -0,0 +1,59 @@
+"""Tests for the retry policy's backoff and Retry-After handling."""
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from theme_categorization.retry import RetryPolicy, get_status_code, parse_retry_after
+
+
+def error(status_code=429, **headers):
+    # Header lookups are lowercase, as httpx headers are case-insensitive
+    headers = {name.lower(): value for name, value in headers.items()}
+    response = SimpleNamespace(status_code=status_code, headers=headers)
+    return SimpleNamespace(response=response)
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Retry-After": "7"}, 7.0),
+    ({"Retry-After": "1.5"}, 1.5),
+    ({"Retry-After": "-3"}, 0.0),
+    ({"retry-after-ms": "250", "Retry-After": "9"}, 0.25),
+    ({"retry-after-ms": "soon", "Retry-After": "2"}, 2.0),
+    ({"Retry-After": "not a date"}, None),
+    ({}, None),
+])
+def test_parse_retry_after(headers, expected):
+    assert parse_retry_after(error(**headers)) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= parse_retry_after(error(**{"Retry-After": retry_at})) <= 30
+    past = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert parse_retry_after(error(**{"Retry-After": past})) == 0.0
+
+
+def test_parse_retry_after_without_a_response():
+    assert parse_retry_after(ValueError("connection reset")) is None
+
+
+def test_compute_delay_prefers_retry_after_capped_at_max_delay():
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0, jitter=False)
+    assert policy.compute_delay(0, error(**{"Retry-After": "4"})) == 4.0
+    assert policy.compute_delay(0, error(**{"Retry-After": "120"})) == 10.0
+    assert [policy.compute_delay(attempt, error()) for attempt in range(5)] == [1.0, 2.0, 4.0, 8.0, 10.0]
+
+
+def test_jittered_backoff_stays_within_the_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    assert all(0.0 <= policy.compute_delay(attempt) <= min(4.0, 2 ** attempt) for attempt in range(6))
+
+
+def test_client_errors_are_not_retried():
+    policy = RetryPolicy()
+    assert get_status_code(error(503)) == 503
+    assert policy.is_retryable(error(429)) and policy.is_retryable(error(503))
+    assert not policy.is_retryable(error(400)) and not policy.is_retryable(error(401))
+    assert policy.is_retryable(ValueError("connection reset"))
@@ -0,0 +1,92 @@
+"""Tests for the CSV byte-offset row index."""
+import io
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from theme_categorization import row_index
+from theme_categorization.row_index import RowIndex, scan_record_ends
+
+CSV = (
+    b'Id,Comment\n'
+    b'1,"Line one\nline two"\n'
+    b'2,"She said ""leave\n"" and left"\n'
+    b'3,"ends with a quote """\n'
+    b'4,plain\n'
+)
+
+
+def as_array(data):
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def expected_ends(data):
+    """Record-terminating newlines, found by walking the bytes one at a time."""
+    ends, quoted = [], False
+    for offset, byte in enumerate(data):
+        if byte == ord('"'):
+            quoted = not quoted
+        elif byte == ord("\n") and not quoted:
+            ends.append(offset)
+    return ends
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 1 << 20])
+def test_scan_record_ends_skips_quoted_newlines_across_blocks(monkeypatch, block_size):
+    monkeypatch.setattr(row_index, "SCAN_BLOCK_SIZE", block_size)
+    ends = scan_record_ends(as_array(CSV))
+
+    assert ends.tolist() == expected_ends(CSV)
+    assert len(ends) == 5, "one header and four records, despite two quoted newlines"
+
+
+def test_scan_record_ends_from_a_record_boundary():
+    start = CSV.index(b"3,")
+    assert scan_record_ends(as_array(CSV), start).tolist() == [end for end in expected_ends(CSV) if end >= start]
+    assert scan_record_ends(as_array(b"")).tolist() == []
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def read_ids(index, ids):
+    data = index.header() + index.read_records(ids)
+    return pd.read_csv(io.BytesIO(data))
+
+
+def test_index_finds_records_with_quoted_newlines(tmp_path):
+    index = RowIndex(str(write(tmp_path / "reviews.csv", CSV)))
+
+    assert index.load()["id"].tolist() == [1, 2, 3, 4]
+    rows = read_ids(index, [2, 3])
+    assert rows["Comment"].tolist() == ['She said "leave\n" and left', 'ends with a quote "']
+
+
+def test_appended_rows_are_scanned_incrementally(tmp_path, caplog):
+    path = write(tmp_path / "reviews.csv", CSV)
+    RowIndex(str(path)).load()
+    with open(path, "ab") as f:
+        f.write(b'5,"new\nrow"\n\n6,last')
+
+    caplog.set_level(logging.INFO, logger="theme_categorization.row_index")
+    index = RowIndex(str(path))
+    assert index.load()["id"].tolist() == [1, 2, 3, 4, 5, 6]
+    assert "Extended row index" in caplog.text
+    assert read_ids(index, [5, 6])["Comment"].tolist() == ["new\nrow", "last"]
+
+
+def test_rewritten_file_is_rebuilt(tmp_path, caplog):
+    path = write(tmp_path / "reviews.csv", CSV)
+    RowIndex(str(path)).load()
+    # Longer than before, but the indexed bytes changed: not an append
+    write(path, CSV.replace(b"1,", b"10,").replace(b"4,plain", b"40,plain text") + b"7,x\n")
+
+    caplog.set_level(logging.INFO, logger="theme_categorization.row_index")
+    index = RowIndex(str(path))
+    assert index.load()["id"].tolist() == [10, 2, 3, 40, 7]
+    assert "Built row index" in caplog.text
+    assert read_ids(index, [40])["Comment"].tolist() == ["plain text"]
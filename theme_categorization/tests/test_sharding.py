@@ -0,0 +1,64 @@
+"""Tests for per-shard settings and merging shard journals in input order."""
+import json
+
+from theme_categorization.data_loader import shard_for_id
+from theme_categorization.fake_server import FakeLLMServer, FakeServerConfig
+from theme_categorization.journal import ResultsJournal
+from theme_categorization.settings import Settings
+from theme_categorization.sharding import ShardedRunner, shard_settings
+
+
+def settings(url="http://localhost:1/v1", **overrides):
+    return Settings(hf_token="dummy_token", vllm_base_url=url, vllm_base_urls=[], cache_path=None, **overrides)
+
+
+def result(text):
+    return {"themes": [{"theme": "emergency", "description": text}]}
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_shard_settings_divide_the_rate_limits():
+    shared = shard_settings(settings(rate_limit_rps=8.0, rate_limit_tpm=40000, rate_limit_delay=0.5), 4)
+    assert (shared.rate_limit_rps, shared.rate_limit_tpm) == (2.0, 10000)
+    assert shared.rate_limit_delay == 0.5, "the delay only applies without an RPS limit"
+
+    spaced = shard_settings(settings(rate_limit_rps=0, rate_limit_tpm=0, rate_limit_delay=0.5), 4)
+    assert (spaced.rate_limit_delay, spaced.rate_limit_tpm) == (2.0, 0)
+
+
+def test_merge_follows_input_order_not_shard_order(tmp_path):
+    runner = ShardedRunner(str(tmp_path), num_shards=3)
+    order = [(7, 0), (1, 0), (7, 1), (4, 0), (2, 0), (1, 1)]
+    by_shard = {}
+    for review_id, occurrence in reversed(order):
+        by_shard.setdefault(shard_for_id(review_id, 3), []).append((review_id, occurrence))
+    for shard_index, keys in by_shard.items():
+        with ResultsJournal(str(runner.shard_path(shard_index))) as journal:
+            for review_id, occurrence in keys:
+                journal.append(review_id, result("first try"), occurrence=occurrence)
+            if (4, 0) in keys:
+                journal.append(4, result("retried"))  # The latest record for a key wins
+
+    assert runner.merge_results(order + [(99, 0)]) == len(order)
+
+    records = read_results(tmp_path / "results.jsonl")
+    assert [(record["id"], record.get("occurrence", 0)) for record in records] == order
+    assert records[3]["result"] == result("retried")
+
+
+def test_sharded_run_against_the_fake_server(tmp_path):
+    records = [(review_id, f"Review {review_id}: the food was cold.") for review_id in (5, 3, 5, 8, 1.0, None)]
+    with FakeLLMServer(FakeServerConfig(seed=0, latency=0.0)) as server:
+        runner = ShardedRunner(str(tmp_path), num_shards=2, settings=settings(server.url, rate_limit_delay=0))
+        summary = runner.run(records, show_progress=False)
+
+    assert (summary["processed"], summary["results"]) == (5, 5), "the review without an Id is skipped"
+    assert sorted(shard["shard"] for shard in summary["shards"]) == [0, 1]
+    assert summary["metrics"]["total_reviews"] == 5
+    keys = [(record["id"], record.get("occurrence", 0)) for record in read_results(tmp_path / "results.jsonl")]
+    assert keys == [(5, 0), (3, 0), (5, 1), (8, 0), (1, 0)]
+    assert json.loads((tmp_path / "metrics.json").read_text())["results"] == 5
@@ -0,0 +1,117 @@
+"""Tests for span nesting across threads and asyncio tasks, and the trace exports."""
+import asyncio
+import threading
+
+import pytest
+
+from theme_categorization.tracing import Tracer
+
+
+def by_name(tracer):
+    return {span.name: span for span in tracer.get_spans()}
+
+
+def test_spans_nest_under_the_current_span():
+    tracer = Tracer(enabled=True)
+    with tracer.span("process_review") as outer:
+        with tracer.span("create_prompt"):
+            pass
+        with tracer.span("extract_themes") as request:
+            with tracer.span("parse_response", chars=10):
+                pass
+    with tracer.span("next_review"):
+        pass
+
+    spans = by_name(tracer)
+    assert [span.name for span in tracer.get_spans()] == [
+        "create_prompt", "parse_response", "extract_themes", "process_review", "next_review",
+    ]
+    assert spans["create_prompt"].parent_id == outer.span_id
+    assert spans["parse_response"].parent_id == request.span_id
+    assert spans["process_review"].parent_id is None
+    assert spans["next_review"].parent_id is None
+    assert spans["next_review"].trace_id != outer.trace_id, "a root span starts a new trace"
+    assert {span.trace_id for name, span in spans.items() if name != "next_review"} == {outer.trace_id}
+    assert outer.start_ns <= request.start_ns <= request.end_ns <= outer.end_ns
+
+
+def test_exception_is_recorded_and_nesting_restored():
+    tracer = Tracer(enabled=True)
+    with tracer.span("outer") as outer:
+        with pytest.raises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("bad response")
+        with tracer.span("after"):
+            pass
+
+    spans = by_name(tracer)
+    assert spans["failing"].attributes == {"error": "ValueError"}
+    assert spans["after"].parent_id == outer.span_id
+
+
+def test_threads_and_tasks_nest_independently():
+    tracer = Tracer(enabled=True)
+
+    def worker(name):
+        with tracer.span(name):
+            with tracer.span(f"{name}.child"):
+                pass
+
+    threads = [threading.Thread(target=worker, args=(f"thread{i}",)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def task(name):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+            with tracer.span(f"{name}.child"):
+                await asyncio.sleep(0)
+
+    async def run():
+        with tracer.span("batch"):
+            await asyncio.gather(task("task0"), task("task1"))
+
+    asyncio.run(run())
+
+    spans = by_name(tracer)
+    for name in ("thread0", "thread1", "task0", "task1"):
+        assert spans[f"{name}.child"].parent_id == spans[name].span_id
+    assert spans["thread0"].parent_id is None
+    assert spans["task0"].parent_id == spans["task1"].parent_id == spans["batch"].span_id
+    assert spans["task0"].task_id != spans["task1"].task_id
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("process_review") as span:
+        assert span is None
+    assert tracer.get_spans() == []
+
+
+def test_span_limit_drops_later_spans():
+    tracer = Tracer(enabled=True, max_spans=2)
+    for _ in range(3):
+        with tracer.span("request"):
+            pass
+    assert len(tracer.get_spans()) == 2 and tracer.dropped_spans == 1
+
+
+def test_exports_keep_the_parent_links():
+    tracer = Tracer(enabled=True)
+    with tracer.span("outer") as outer:
+        with tracer.span("inner", status=200, retried=False):
+            pass
+
+    otel = {span["name"]: span for span in tracer.to_otel()["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert otel["inner"]["parentSpanId"] == outer.span_id
+    assert "parentSpanId" not in otel["outer"]
+    assert otel["inner"]["attributes"] == [
+        {"key": "status", "value": {"intValue": "200"}},
+        {"key": "retried", "value": {"boolValue": False}},
+    ]
+
+    events = tracer.to_chrome_trace()["traceEvents"]
+    assert [event["name"] for event in events] == ["outer", "inner"], "sorted by start time"
+    assert all(event["ph"] == "X" for event in events)
@@ -0,0 +1,181 @@
+"""Tests for the columnar result writer and its crash recovery."""
+import json
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from theme_categorization.journal import ResultsJournal  # noqa: E402
+from theme_categorization.writers import (  # noqa: E402
+    ColumnarResultWriter,
+    open_result_writer,
+    parts_dir,
+    read_results,
+    result_output_exists,
+    theme_mask,
+    themes_from_mask,
+)
+
+
+def result(*themes):
+    return {"themes": [{"theme": theme, "description": f"about {theme}"} for theme in themes]}
+
+
+@pytest.fixture(params=["parquet", "arrow"])
+def output(tmp_path, request):
+    return tmp_path / f"results.{request.param}"
+
+
+def keys(path):
+    table = read_results(str(path), columns=["id", "occurrence"])
+    return list(zip(table.column("id").to_pylist(), table.column("occurrence").to_pylist()))
+
+
+def test_theme_mask_round_trip():
+    mask = theme_mask(["emergency", " discharge", "not a key theme"])
+    assert themes_from_mask(mask) == ["discharge", "emergency"]
+    assert theme_mask(["not a key theme"]) == 0
+
+
+def test_writes_rows_and_reads_them_back(output):
+    with ColumnarResultWriter(str(output), model="m", row_group_size=2) as writer:
+        writer.append(1, result("dietary/service"), latency=0.5)
+        writer.append(0, result(), latency=0.25)
+        writer.append(0, result("dietary/service", "housekeeping/room"), occurrence=1)
+
+    assert keys(output) == [(1, 0), (0, 0), (0, 1)]
+    assert not parts_dir(str(output)).exists()
+
+    reader = ColumnarResultWriter(str(output), resume=True)
+    records = list(reader.records())
+    assert records[0] == {"id": 1, "result": result("dietary/service"), "latency": 0.5}
+    assert records[2]["occurrence"] == 1
+    assert reader.completed_keys() == {(1, 0), (0, 1)}
+    assert reader.completed_keys(include_failed=True) == {(1, 0), (0, 0), (0, 1)}
+
+
+def test_resume_after_close_keeps_existing_rows(output):
+    with ColumnarResultWriter(str(output)) as writer:
+        writer.append(1, result("dietary/service"))
+    with ColumnarResultWriter(str(output), resume=True) as writer:
+        assert writer.completed_keys() == {(1, 0)}
+        writer.append(2, result("dietary/service"))
+
+    assert keys(output) == [(1, 0), (2, 0)]
+
+
+def test_close_combines_sources_with_different_dictionaries(output):
+    with ColumnarResultWriter(str(output), model="a", row_group_size=2) as writer:
+        writer.append(1, result("dietary/service", "emergency"))
+        writer.append(2, result("emergency"))
+        writer.append(3, result())
+    # A resumed run with another model sees new theme names first, so its part files
+    # number their dictionaries differently from the existing rows
+    with ColumnarResultWriter(str(output), model="b", row_group_size=1, resume=True) as writer:
+        assert writer.rows == 3
+        writer.append(4, result("discharge", "dietary/service"))
+        writer.append(5, result("emergency"))
+        assert writer.rows == 5
+
+    table = read_results(str(output))
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("model").to_pylist() == ["a", "a", "a", "b", "b"]
+    assert table.column("themes").to_pylist() == [
+        ["dietary/service", "emergency"], ["emergency"], [], ["discharge", "dietary/service"], ["emergency"],
+    ]
+    assert ColumnarResultWriter(str(output), resume=True).rows == 5
+
+
+def test_part_files_survive_a_crash(output):
+    with ColumnarResultWriter(str(output)) as writer:
+        writer.append(1, result("dietary/service"))
+
+    # Killed before close(): flushed parts are durable, buffered rows are lost
+    crashed = ColumnarResultWriter(str(output), resume=True, row_group_size=2)
+    crashed.append(2, result("dietary/service"))
+    crashed.append(3, result("dietary/service"))
+    crashed.append(4, result("dietary/service"))
+    del crashed
+
+    assert keys(output) == [(1, 0)], "the output is untouched until close"
+    assert result_output_exists(str(output))
+
+    with ColumnarResultWriter(str(output), resume=True) as writer:
+        assert writer.completed_keys() == {(1, 0), (2, 0), (3, 0)}
+        writer.append(4, result("dietary/service"))
+
+    assert keys(output) == [(1, 0), (2, 0), (3, 0), (4, 0)]
+    assert not parts_dir(str(output)).exists()
+
+
+def test_crash_in_first_run_is_resumable(output):
+    crashed = ColumnarResultWriter(str(output), row_group_size=1)
+    crashed.append(1, result("dietary/service"))
+    del crashed
+
+    assert not output.exists()
+    assert result_output_exists(str(output))
+    with ColumnarResultWriter(str(output), resume=True) as writer:
+        assert writer.completed_keys() == {(1, 0)}
+    assert keys(output) == [(1, 0)]
+
+
+def test_interrupted_close_is_finished_on_open(output):
+    with ColumnarResultWriter(str(output)) as writer:
+        writer.append(1, result("dietary/service"))
+    crashed = ColumnarResultWriter(str(output), resume=True, row_group_size=1)
+    crashed.append(2, result("dietary/service"))
+
+    # Crash after the manifest names the combined file but before it replaces the output
+    combined = crashed.parts_dir / f".combined{output.suffix}"
+    crashed._write_file(pa.concat_tables([
+        read_results(str(output)), read_results(str(crashed.parts_dir / f"part-000000{output.suffix}"))
+    ]).unify_dictionaries(), combined)
+    crashed._write_manifest(committing=combined.name)
+    del crashed
+
+    with ColumnarResultWriter(str(output), resume=True) as writer:
+        assert writer.completed_keys() == {(1, 0), (2, 0)}
+    assert keys(output) == [(1, 0), (2, 0)]
+
+
+def test_without_resume_parts_of_an_interrupted_run_are_discarded(output):
+    crashed = ColumnarResultWriter(str(output), row_group_size=1)
+    crashed.append(1, result("dietary/service"))
+    del crashed
+
+    with ColumnarResultWriter(str(output)) as writer:
+        assert writer.completed_keys() == set()
+        writer.append(2, result("dietary/service"))
+    assert keys(output) == [(2, 0)]
+
+
+def test_manifest_lists_only_complete_parts(output):
+    writer = ColumnarResultWriter(str(output), row_group_size=1)
+    writer.append(1, result("dietary/service"))
+    with open(writer.parts_dir / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert [part["rows"] for part in manifest["parts"]] == [1]
+    assert all(os.path.exists(writer.parts_dir / part["file"]) for part in manifest["parts"])
+    writer.close()
+
+
+def test_reads_files_written_before_the_occurrence_column(output):
+    table = ColumnarResultWriter._result_schema(pa.int64()).empty_table().drop_columns(["occurrence"])
+    writer = ColumnarResultWriter(str(output))
+    writer._write_file(table, output)
+    writer._closed = True
+
+    with ColumnarResultWriter(str(output), resume=True) as writer:
+        writer.append(5, result("dietary/service"))
+    assert keys(output) == [(5, 0)]
+
+
+def test_open_result_writer_picks_format_by_extension(tmp_path):
+    with open_result_writer(str(tmp_path / "r.jsonl")) as writer:
+        assert isinstance(writer, ResultsJournal)
+    with open_result_writer(str(tmp_path / "r.parquet")) as writer:
+        assert isinstance(writer, ColumnarResultWriter)
+    with pytest.raises(ValueError):
+        open_result_writer(str(tmp_path / "r.csv"))